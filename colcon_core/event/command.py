@@ -89,9 +89,12 @@ class Command:
 class CommandEnded(Command):
     """An event containing a finished command."""
 
-    __slots__ = ('returncode', )
+    __slots__ = ('returncode', 'resource_usage')
 
-    def __init__(self, cmd, *, cwd, returncode, env=None, shell=False):
+    def __init__(
+        self, cmd, *, cwd, returncode, env=None, shell=False,
+        resource_usage=None
+    ):
         """
         Construct a CommandEnded.
 
@@ -100,9 +103,13 @@ class CommandEnded(Command):
         :param returncode: the returncode of the command
         :param env: a dictionary with environment variables
         :param shell: whether to use the shell as the program to execute
+        :param resource_usage: the
+          :py:data:`colcon_core.subprocess.ResourceUsage` of the command if
+          available
         """
         super().__init__(cmd, cwd=cwd, env=env, shell=shell)
         self.returncode = returncode
+        self.resource_usage = resource_usage
 
     def to_string(self):
         """Get a string describing the invoked command and its return code."""
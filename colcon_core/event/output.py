@@ -36,3 +36,77 @@ class StderrLine:
         :param bytes|str line: The line of text
         """
         self.line = line
+
+
+class StdoutChunk:
+    """
+    An event containing multiple lines of text intended for `stdout`.
+
+    Each line has a trailing newline except the last line of the output if
+    it isn't terminated.
+    Event handlers which don't declare this event type in their
+    `EVENT_TYPES` receive a :class:`StdoutLine` event for each line instead.
+    """
+
+    __slots__ = ('data', )
+
+    """The event type for the individual lines"""
+    LINE_TYPE = StdoutLine
+
+    def __init__(self, data):
+        """
+        Construct a StdoutChunk.
+
+        :param bytes|str data: The lines of text
+        """
+        self.data = data
+
+    def get_lines(self):
+        """
+        Get an event for each line of the chunk.
+
+        :rtype: list
+        """
+        return [StdoutLine(line) for line in _split_lines(self.data)]
+
+
+class StderrChunk:
+    """
+    An event containing multiple lines of text intended for `stderr`.
+
+    Each line has a trailing newline except the last line of the output if
+    it isn't terminated.
+    Event handlers which don't declare this event type in their
+    `EVENT_TYPES` receive a :class:`StderrLine` event for each line instead.
+    """
+
+    __slots__ = ('data', )
+
+    """The event type for the individual lines"""
+    LINE_TYPE = StderrLine
+
+    def __init__(self, data):
+        """
+        Construct a StderrChunk.
+
+        :param bytes|str data: The lines of text
+        """
+        self.data = data
+
+    def get_lines(self):
+        """
+        Get an event for each line of the chunk.
+
+        :rtype: list
+        """
+        return [StderrLine(line) for line in _split_lines(self.data)]
+
+
+def _split_lines(data):
+    newline = b'\n' if isinstance(data, bytes) else '\n'
+    lines = data.split(newline)
+    last = lines.pop()
+    lines = [line + newline for line in lines]
+    if last:
+        lines.append(last)
+    return lines
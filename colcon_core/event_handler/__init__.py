@@ -20,14 +20,34 @@ class EventHandlerExtensionPoint:
     They are being registered as observers at an
     :py:class:`colcon_core.EventReactor` instance.
     The handler should check the type of the event and only act on known types.
+
+    Handlers processing many events can additionally provide a method
+    `handle_events(events)` which is then being called with a list of events
+    instead of calling the handler for each event.
     """
 
     """The version of the event handler extension interface."""
-    EXTENSION_POINT_VERSION = '1.0'
+    EXTENSION_POINT_VERSION = '1.2'
 
     """The default priority of event handler extensions."""
     PRIORITY = 100
 
+    """
+    The types of events the handler is interested in.
+
+    If None the handler is being notified about all events.
+    """
+    EVENT_TYPES = None
+
+    """
+    The interval in seconds in which the handler receives timer events.
+
+    If None the interval of the event reactor is being used.
+    The handler only receives timer events if it is interested in events of
+    the type :py:class:`colcon_core.event.timer.TimerEvent`.
+    """
+    TIMER_INTERVAL = None
+
     def __init__(self):  # noqa: D107
         super().__init__()
         self.context = None
@@ -97,6 +117,12 @@ def add_event_handler_arguments(parser):
 
     argument.completer = choices_completer
 
+    group.add_argument(
+        '--event-handler-process',
+        action='store_true',
+        help='Run the event handlers in a separate process to not slow down '
+             'the execution of the jobs when processing a lot of output')
+
 
 def apply_event_handler_arguments(extensions, args):
     """
@@ -3,9 +3,14 @@
 
 import sys
 
+from colcon_core.event.job import JobEnded
+from colcon_core.event.output import StderrChunk
 from colcon_core.event.output import StderrLine
+from colcon_core.event.output import StdoutChunk
 from colcon_core.event.output import StdoutLine
+from colcon_core.event.timer import TimerEvent
 from colcon_core.event_handler import EventHandlerExtensionPoint
+from colcon_core.event_reactor import EventReactorShutdown
 from colcon_core.plugin_system import satisfies_version
 
 
@@ -16,34 +21,114 @@ class ConsoleDirectEventHandler(EventHandlerExtensionPoint):
     The extension handles events of the following types:
     - :py:class:`colcon_core.event.output.StdoutLine`
     - :py:class:`colcon_core.event.output.StderrLine`
+    - :py:class:`colcon_core.event.output.StdoutChunk`
+    - :py:class:`colcon_core.event.output.StderrChunk`
+
+    Unless stdout is an interactive terminal the output is being buffered
+    and only flushed periodically, when a job has ended or when the buffered
+    output exceeds a threshold.
     """
 
     # this handler is enabled by default
     # but other handlers might choose to change that presetting
     ENABLED_BY_DEFAULT = True
 
+    EVENT_TYPES = (StdoutLine, StderrLine, StdoutChunk, StderrChunk)
+
+    """The number of buffered bytes which triggers flushing the output."""
+    FLUSH_THRESHOLD = 64 * 1024
+
     def __init__(self):  # noqa: D107
         super().__init__()
         satisfies_version(
-            EventHandlerExtensionPoint.EXTENSION_POINT_VERSION, '^1.0')
+            EventHandlerExtensionPoint.EXTENSION_POINT_VERSION, '^1.1')
         self.enabled = ConsoleDirectEventHandler.ENABLED_BY_DEFAULT
         self._handlers = {
             StdoutLine: sys.stdout,
             StderrLine: sys.stderr,
+            StdoutChunk: sys.stdout,
+            StderrChunk: sys.stderr,
         }
+        self._buffered = not _isatty(sys.stdout)
+        if self._buffered:
+            # the events triggering to flush the buffered output
+            self.EVENT_TYPES = ConsoleDirectEventHandler.EVENT_TYPES + (
+                TimerEvent, JobEnded, EventReactorShutdown)
+        # the number of bytes written to each stream since the last flush
+        self._pending = {}
+        # the streams with text which might not have reached their buffer
+        self._pending_text = set()
 
     def __call__(self, event):  # noqa: D102
         data = event[0]
 
         for event_type, writable in self._handlers.items():
             if isinstance(data, event_type):
+                output = data.data \
+                    if isinstance(data, (StdoutChunk, StderrChunk)) \
+                    else data.line
                 try:
-                    if isinstance(data.line, bytes):
-                        writable.buffer.write(data.line)
+                    if not self._buffered:
+                        if isinstance(output, bytes):
+                            writable.buffer.write(output)
+                        else:
+                            writable.write(output)
+                        writable.flush()
                     else:
-                        writable.write(data.line)
-                    writable.flush()
+                        self._write(writable, output)
                 except BrokenPipeError:
-                    self._handlers.pop(event_type)
+                    self._remove_handlers(writable)
+                    self._pending.pop(writable, None)
+                    self._pending_text.discard(writable)
                     raise
                 return
+
+        if isinstance(data, (TimerEvent, JobEnded, EventReactorShutdown)):
+            self._flush_all()
+
+    def _write(self, writable, line):
+        # flush the other stream first to maintain the order of the output
+        # in case both streams are being redirected to the same file
+        for other in list(self._pending.keys()):
+            if other is not writable:
+                self._flush(other)
+
+        if isinstance(line, bytes):
+            if writable in self._pending_text:
+                # pass the text to the buffer before writing bytes to it
+                self._flush(writable)
+            writable.buffer.write(line)
+            size = len(line)
+        else:
+            writable.write(line)
+            self._pending_text.add(writable)
+            size = len(line.encode(errors='replace'))
+
+        self._pending[writable] = self._pending.get(writable, 0) + size
+        if self._pending[writable] >= self.FLUSH_THRESHOLD:
+            self._flush(writable)
+
+    def _flush(self, writable):
+        self._pending.pop(writable, None)
+        self._pending_text.discard(writable)
+        writable.flush()
+
+    def _flush_all(self):
+        for writable in list(self._pending.keys()):
+            try:
+                self._flush(writable)
+            except BrokenPipeError:
+                self._remove_handlers(writable)
+                raise
+
+    def _remove_handlers(self, writable):
+        for event_type, w in list(self._handlers.items()):
+            if w is writable:
+                self._handlers.pop(event_type)
+
+
+def _isatty(writable):
+    try:
+        return writable.isatty()
+    except (AttributeError, ValueError):
+        return False
@@ -12,6 +12,7 @@ from colcon_core.event_handler import format_duration
 from colcon_core.output_style import Style
 from colcon_core.plugin_system import satisfies_version
 from colcon_core.subprocess import SIGINT_RESULT
+from colcon_core.subprocess import TIMEOUT_RESULT
 
 
 class ConsoleStartEndEventHandler(EventHandlerExtensionPoint):
@@ -24,6 +25,8 @@ class ConsoleStartEndEventHandler(EventHandlerExtensionPoint):
     - :py:class:`colcon_core.event.test.TestFailure`
     """
 
+    EVENT_TYPES = (JobStarted, JobEnded, TestFailure)
+
     def __init__(self):  # noqa: D107
         super().__init__()
         satisfies_version(
@@ -62,6 +65,11 @@ class ConsoleStartEndEventHandler(EventHandlerExtensionPoint):
                     Style.Pictogram('<<<') + f' {job_id} [{duration_string}]'
                 writable = sys.stdout
 
+            elif data.rc == TIMEOUT_RESULT:
+                msg = Style.Critical('Timeout') + '  ' + \
+                    Style.Pictogram('<<<') + f' {job_id} [{duration_string}]'
+                writable = sys.stderr
+
             else:
                 msg = Style.Critical('Failed') + '   ' + \
                     Style.Pictogram('<<<') + f' {job_id} ' \
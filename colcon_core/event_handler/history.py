@@ -0,0 +1,127 @@
+# Copyright 2016-2018 Dirk Thomas
+# Licensed under the Apache License, Version 2.0
+
+import sqlite3
+import time
+
+from colcon_core.event.command import CommandEnded
+from colcon_core.event.job import JobEnded
+from colcon_core.event.job import JobStarted
+from colcon_core.event.output import StderrChunk
+from colcon_core.event.output import StderrLine
+from colcon_core.event.output import StdoutChunk
+from colcon_core.event.output import StdoutLine
+from colcon_core.event_handler import EventHandlerExtensionPoint
+from colcon_core.event_reactor import EventReactorShutdown
+from colcon_core.history import BuildHistory
+from colcon_core.history import create_job_record
+from colcon_core.history import get_history_path
+from colcon_core.logging import colcon_logger
+from colcon_core.plugin_system import satisfies_version
+
+logger = colcon_logger.getChild(__name__)
+
+
+class HistoryEventHandler(EventHandlerExtensionPoint):
+    """
+    Record the duration, output size and peak memory of each job.
+
+    The records of the build history are stored in the log base path and are
+    available to future invocations, e.g. to schedule jobs based on their
+    expected duration.
+    The peak memory is only being recorded if the resource usage of the
+    invoked commands is being reported, e.g. when the `resource_usage` event
+    handler is enabled.
+
+    The extension handles events of the following types:
+    - :py:class:`colcon_core.event.job.JobStarted`
+    - :py:class:`colcon_core.event.output.StdoutLine`
+    - :py:class:`colcon_core.event.output.StderrLine`
+    - :py:class:`colcon_core.event.output.StdoutChunk`
+    - :py:class:`colcon_core.event.output.StderrChunk`
+    - :py:class:`colcon_core.event.command.CommandEnded`
+    - :py:class:`colcon_core.event.job.JobEnded`
+    """
+
+    EVENT_TYPES = (
+        JobStarted, StdoutLine, StderrLine, StdoutChunk, StderrChunk,
+        CommandEnded, JobEnded, EventReactorShutdown)
+
+    def __init__(self):  # noqa: D107
+        super().__init__()
+        satisfies_version(
+            EventHandlerExtensionPoint.EXTENSION_POINT_VERSION, '^1.0')
+        self._start_times = {}
+        self._output_bytes = {}
+        self._peak_rss = {}
+        self._history = None
+        self._failed = False
+
+    def __call__(self, event):  # noqa: D102
+        data = event[0]
+
+        if isinstance(
+            data, (StdoutLine, StderrLine, StdoutChunk, StderrChunk)
+        ):
+            job = event[1]
+            if job is None:
+                return
+            identifier = getattr(job, 'identifier', None)
+            if identifier in self._output_bytes:
+                output = data.data \
+                    if isinstance(data, (StdoutChunk, StderrChunk)) \
+                    else data.line
+                if isinstance(output, str):
+                    output = output.encode()
+                self._output_bytes[identifier] += len(output)
+
+        elif isinstance(data, CommandEnded):
+            identifier = getattr(event[1], 'identifier', None)
+            usage = getattr(data, 'resource_usage', None)
+            if (
+                identifier in self._peak_rss and
+                usage is not None and usage.max_rss is not None
+            ):
+                self._peak_rss[identifier] = max(
+                    self._peak_rss[identifier] or 0, usage.max_rss)
+
+        elif isinstance(data, JobStarted):
+            self._start_times[data.identifier] = time.monotonic()
+            self._output_bytes[data.identifier] = 0
+            self._peak_rss[data.identifier] = None
+
+        elif isinstance(data, JobEnded):
+            if data.identifier not in self._start_times:
+                return
+            duration = \
+                time.monotonic() - self._start_times.pop(data.identifier)
+            output_bytes = self._output_bytes.pop(data.identifier)
+            peak_rss = self._peak_rss.pop(data.identifier)
+            record = create_job_record(
+                data.identifier, duration=duration, returncode=data.rc,
+                verb_name=getattr(self.context.args, 'verb_name', None),
+                output_bytes=output_bytes, peak_rss=peak_rss)
+            self._add_record(record)
+
+        elif isinstance(data, EventReactorShutdown):
+            if self._history is not None:
+                self._history.close()
+                self._history = None
+
+    def _add_record(self, record):
+        if self._failed:
+            return
+        try:
+            if self._history is None:
+                path = get_history_path()
+                if path is None:
+                    # logging is disabled
+                    return
+                self._history = BuildHistory(path)
+            self._history.add_record(record)
+        except sqlite3.Error as e:
+            # e.g. the database is locked by another invocation
+            logger.warning(
+                f'Failed to record the job in the build history: {e}')
+            # avoid blocking on every following job
+            self._failed = True
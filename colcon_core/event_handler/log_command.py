@@ -20,6 +20,8 @@ class LogCommandEventHandler(EventHandlerExtensionPoint):
     - :py:class:`colcon_core.event.command.Command`
     """
 
+    EVENT_TYPES = (Command, )
+
     def __init__(self):  # noqa: D107
         super().__init__()
         satisfies_version(
@@ -0,0 +1,339 @@
+# Copyright 2016-2018 Dirk Thomas
+# Licensed under the Apache License, Version 2.0
+
+from http.server import BaseHTTPRequestHandler
+from http.server import HTTPServer
+import os
+from threading import Lock
+from threading import Thread
+import time
+
+from colcon_core.environment_variable import EnvironmentVariable
+from colcon_core.event.command import Command
+from colcon_core.event.command import CommandEnded
+from colcon_core.event.job import JobEnded
+from colcon_core.event.job import JobQueued
+from colcon_core.event.job import JobSkipped
+from colcon_core.event.job import JobStarted
+from colcon_core.event.output import StderrChunk
+from colcon_core.event.output import StderrLine
+from colcon_core.event.output import StdoutChunk
+from colcon_core.event.output import StdoutLine
+from colcon_core.event.test import TestFailure
+from colcon_core.event_handler import EventHandlerExtensionPoint
+from colcon_core.event_reactor import EventReactorShutdown
+from colcon_core.location import get_log_path
+from colcon_core.logging import colcon_logger
+from colcon_core.plugin_system import satisfies_version
+from colcon_core.subprocess import SIGINT_RESULT
+from colcon_core.subprocess import TIMEOUT_RESULT
+
+logger = colcon_logger.getChild(__name__)
+
+"""Environment variable to serve the metrics on a local port"""
+METRICS_PORT_ENVIRONMENT_VARIABLE = EnvironmentVariable(
+    'COLCON_METRICS_PORT',
+    'Serve the metrics of the running invocation on this port of the '
+    'loopback interface (requires the metrics event handler to be enabled)')
+
+"""The filename of the metrics within the log path"""
+METRICS_FILENAME = 'metrics.prom'
+
+"""The upper bounds in seconds of the job duration histogram buckets"""
+DURATION_BUCKETS = (1, 5, 10, 30, 60, 120, 300, 600, 1800, 3600)
+
+
+class MetricsEventHandler(EventHandlerExtensionPoint):
+    """
+    Export metrics about the jobs in the Prometheus text format.
+
+    The metrics are written to a file in the log directory whenever a job
+    has ended.
+    If the environment variable `COLCON_METRICS_PORT` is set the metrics are
+    also served over HTTP on that port of the loopback interface while the
+    invocation is running.
+
+    The extension handles events of the following types:
+    - :py:class:`colcon_core.event.job.JobQueued`
+    - :py:class:`colcon_core.event.job.JobStarted`
+    - :py:class:`colcon_core.event.job.JobSkipped`
+    - :py:class:`colcon_core.event.job.JobEnded`
+    - :py:class:`colcon_core.event.command.Command`
+    - :py:class:`colcon_core.event.command.CommandEnded`
+    - :py:class:`colcon_core.event.output.StdoutLine`
+    - :py:class:`colcon_core.event.output.StderrLine`
+    - :py:class:`colcon_core.event.output.StdoutChunk`
+    - :py:class:`colcon_core.event.output.StderrChunk`
+    - :py:class:`colcon_core.event.test.TestFailure`
+    """
+
+    EVENT_TYPES = (
+        JobQueued, JobStarted, JobSkipped, JobEnded, Command, CommandEnded,
+        StdoutLine, StderrLine, StdoutChunk, StderrChunk, TestFailure,
+        EventReactorShutdown)
+
+    def __init__(self):  # noqa: D107
+        super().__init__()
+        satisfies_version(
+            EventHandlerExtensionPoint.EXTENSION_POINT_VERSION, '^1.1')
+        # the metrics are opt-in since they need to process all output
+        self.enabled = False
+        self._lock = Lock()
+        self._queued = set()
+        self._start_times = {}
+        self._durations = {}
+        self._finished = {}
+        self._skipped = 0
+        self._commands = {}
+        self._failed_commands = {}
+        self._output_bytes = {}
+        self._test_failures = {}
+        self._server = None
+        self._server_started = False
+
+    def __call__(self, event):  # noqa: D102
+        self.handle_events([event])
+
+    def handle_events(self, events):
+        """
+        Update the metrics for a batch of events.
+
+        :param list events: The events
+        """
+        if not self._server_started:
+            self._server_started = True
+            self._start_server()
+
+        job_ended = False
+        shutdown = False
+        with self._lock:
+            for data, job in events:
+                if isinstance(
+                    data, (StdoutLine, StderrLine, StdoutChunk, StderrChunk)
+                ):
+                    identifier = getattr(job, 'identifier', None)
+                    if identifier is None:
+                        continue
+                    output = data.data \
+                        if isinstance(data, (StdoutChunk, StderrChunk)) \
+                        else data.line
+                    if isinstance(output, str):
+                        output = output.encode()
+                    self._output_bytes[identifier] = \
+                        self._output_bytes.get(identifier, 0) + len(output)
+
+                elif isinstance(data, JobQueued):
+                    self._queued.add(data.identifier)
+
+                elif isinstance(data, JobStarted):
+                    self._queued.discard(data.identifier)
+                    self._start_times[data.identifier] = time.monotonic()
+
+                elif isinstance(data, JobSkipped):
+                    self._queued.discard(data.identifier)
+                    self._skipped += 1
+
+                elif isinstance(data, JobEnded):
+                    start_time = self._start_times.pop(data.identifier, None)
+                    if start_time is not None:
+                        self._durations[data.identifier] = \
+                            time.monotonic() - start_time
+                    result = _get_result(data.rc)
+                    self._finished[result] = \
+                        self._finished.get(result, 0) + 1
+                    job_ended = True
+
+                elif isinstance(data, Command):
+                    identifier = getattr(job, 'identifier', None)
+                    if identifier is None:
+                        continue
+                    if not isinstance(data, CommandEnded):
+                        self._commands[identifier] = \
+                            self._commands.get(identifier, 0) + 1
+                    elif data.returncode:
+                        self._failed_commands[identifier] = \
+                            self._failed_commands.get(identifier, 0) + 1
+
+                elif isinstance(data, TestFailure):
+                    self._test_failures[data.identifier] = \
+                        self._test_failures.get(data.identifier, 0) + 1
+
+                elif isinstance(data, EventReactorShutdown):
+                    shutdown = True
+
+            if job_ended or shutdown:
+                content = self._format()
+
+        if job_ended or shutdown:
+            self._write_file(content)
+        if shutdown:
+            self._stop_server()
+
+    def get_metrics(self):
+        """
+        Get the current metrics.
+
+        :returns: The metrics in the Prometheus text format
+        :rtype: str
+        """
+        with self._lock:
+            return self._format()
+
+    def _format(self):
+        # invoked while holding the lock
+        now = time.monotonic()
+        lines = []
+
+        def add(name, metric_type, help_text, samples):
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {metric_type}')
+            for labels, value in samples:
+                lines.append(f'{name}{_format_labels(labels)} {value}')
+
+        add(
+            'colcon_jobs_queued', 'gauge',
+            'Number of jobs waiting to be started',
+            [({}, len(self._queued))])
+        add(
+            'colcon_jobs_running', 'gauge',
+            'Number of jobs currently running',
+            [({}, len(self._start_times))])
+        add(
+            'colcon_jobs_finished_total', 'counter',
+            'Number of finished jobs by result',
+            [
+                ({'result': result}, count)
+                for result, count in sorted(self._finished.items())])
+        add(
+            'colcon_jobs_skipped_total', 'counter',
+            'Number of skipped jobs',
+            [({}, self._skipped)])
+
+        durations = sorted(self._durations.values())
+        samples = []
+        for bucket in DURATION_BUCKETS:
+            count = sum(1 for d in durations if d <= bucket)
+            samples.append(({'le': str(bucket)}, count))
+        samples.append(({'le': '+Inf'}, len(durations)))
+        lines.append(
+            '# HELP colcon_job_duration_seconds Duration of the finished '
+            'jobs')
+        lines.append('# TYPE colcon_job_duration_seconds histogram')
+        for labels, value in samples:
+            lines.append(
+                'colcon_job_duration_seconds_bucket'
+                f'{_format_labels(labels)} {value}')
+        lines.append(f'colcon_job_duration_seconds_sum {sum(durations)}')
+        lines.append(f'colcon_job_duration_seconds_count {len(durations)}')
+
+        elapsed = dict(self._durations)
+        for identifier, start_time in self._start_times.items():
+            elapsed[identifier] = now - start_time
+        add(
+            'colcon_job_elapsed_seconds', 'gauge',
+            'Duration of each finished or running job',
+            [
+                ({'job': identifier}, value)
+                for identifier, value in sorted(elapsed.items())])
+        add(
+            'colcon_job_commands_total', 'counter',
+            'Number of commands invoked by each job',
+            [
+                ({'job': identifier}, count)
+                for identifier, count in sorted(self._commands.items())])
+        add(
+            'colcon_job_failed_commands_total', 'counter',
+            'Number of commands of each job which returned a non-zero code',
+            [
+                ({'job': identifier}, count)
+                for identifier, count
+                in sorted(self._failed_commands.items())])
+        add(
+            'colcon_job_output_bytes_total', 'counter',
+            'Number of bytes written to stdout and stderr by each job',
+            [
+                ({'job': identifier}, count)
+                for identifier, count in sorted(self._output_bytes.items())])
+        add(
+            'colcon_job_test_failures_total', 'counter',
+            'Number of test failures reported by each job',
+            [
+                ({'job': identifier}, count)
+                for identifier, count in sorted(self._test_failures.items())])
+        return '\n'.join(lines) + '\n'
+
+    def _write_file(self, content):
+        log_path = get_log_path()
+        if log_path is None:
+            # logging is disabled
+            return
+        log_path.mkdir(parents=True, exist_ok=True)
+        path = log_path / METRICS_FILENAME
+        # replace the file atomically for concurrent readers
+        temp_path = path.with_name(path.name + '.tmp')
+        temp_path.write_text(content)
+        os.replace(str(temp_path), str(path))
+
+    def _start_server(self):
+        port = os.environ.get(METRICS_PORT_ENVIRONMENT_VARIABLE.name)
+        if not port:
+            return
+        try:
+            port = int(port)
+            self._server = HTTPServer(
+                ('127.0.0.1', port), _create_request_handler(self))
+        except (ValueError, OSError) as e:
+            logger.warning(
+                'Failed to serve the metrics on port '
+                f"'{port}': {e}")
+            return
+        port = self._server.server_address[1]
+        logger.info(f'Serving metrics on http://127.0.0.1:{port}/metrics')
+        thread = Thread(target=self._server.serve_forever, daemon=True)
+        thread.start()
+
+    def _stop_server(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+def _get_result(rc):
+    if rc == SIGINT_RESULT:
+        return 'interrupted'
+    if rc == TIMEOUT_RESULT:
+        return 'timeout'
+    return 'failed' if rc else 'succeeded'
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(
+        f'{key}="{_escape_label_value(value)}"'
+        for key, value in labels.items()) + '}'
+
+
+def _escape_label_value(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"') \
+        .replace('\n', '\\n')
+
+
+def _create_request_handler(extension):
+    class MetricsRequestHandler(BaseHTTPRequestHandler):
+
+        def do_GET(self):  # noqa: N802
+            content = extension.get_metrics().encode()
+            self.send_response(200)
+            self.send_header(
+                'Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(content)))
+            self.end_headers()
+            self.wfile.write(content)
+
+        def log_message(self, format, *args):  # noqa: A002
+            # don't print the requests to stderr
+            pass
+
+    return MetricsRequestHandler
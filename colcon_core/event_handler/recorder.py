@@ -0,0 +1,98 @@
+# Copyright 2016-2018 Dirk Thomas
+# Licensed under the Apache License, Version 2.0
+
+from colcon_core.event.command import Command
+from colcon_core.event.command import CommandEnded
+from colcon_core.event.job import JobEnded
+from colcon_core.event.job import JobProgress
+from colcon_core.event.job import JobQueued
+from colcon_core.event.job import JobSkipped
+from colcon_core.event.job import JobStarted
+from colcon_core.event.job import JobUnselected
+from colcon_core.event.output import StderrChunk
+from colcon_core.event.output import StderrLine
+from colcon_core.event.output import StdoutChunk
+from colcon_core.event.output import StdoutLine
+from colcon_core.event.test import TestFailure
+from colcon_core.event_handler import EventHandlerExtensionPoint
+from colcon_core.event_reactor import EventReactorShutdown
+from colcon_core.event_recording import EventRecorder
+from colcon_core.location import get_log_path
+from colcon_core.plugin_system import satisfies_version
+
+"""The filename of the event recording within the log path"""
+RECORDING_FILENAME = 'events.bin'
+
+
+class EventRecorderEventHandler(EventHandlerExtensionPoint):
+    """
+    Record all job, command, output and test events in the log directory.
+
+    The recording can be passed to
+    :function:`colcon_core.event_recording.replay_recording` to feed the
+    events to any set of event handlers.
+
+    The extension handles events of the following types:
+    - :py:class:`colcon_core.event.job.JobUnselected`
+    - :py:class:`colcon_core.event.job.JobQueued`
+    - :py:class:`colcon_core.event.job.JobStarted`
+    - :py:class:`colcon_core.event.job.JobProgress`
+    - :py:class:`colcon_core.event.job.JobSkipped`
+    - :py:class:`colcon_core.event.job.JobEnded`
+    - :py:class:`colcon_core.event.command.Command`
+    - :py:class:`colcon_core.event.command.CommandEnded`
+    - :py:class:`colcon_core.event.output.StdoutLine`
+    - :py:class:`colcon_core.event.output.StderrLine`
+    - :py:class:`colcon_core.event.output.StdoutChunk`
+    - :py:class:`colcon_core.event.output.StderrChunk`
+    - :py:class:`colcon_core.event.test.TestFailure`
+    """
+
+    EVENT_TYPES = (
+        JobUnselected, JobQueued, JobStarted, JobProgress, JobSkipped,
+        JobEnded, Command, CommandEnded, StdoutLine, StderrLine, StdoutChunk,
+        StderrChunk, TestFailure, EventReactorShutdown)
+
+    def __init__(self):  # noqa: D107
+        super().__init__()
+        satisfies_version(
+            EventHandlerExtensionPoint.EXTENSION_POINT_VERSION, '^1.1')
+        # the recording is opt-in since it duplicates all output
+        self.enabled = False
+        self._recorder = None
+        self._closed = False
+
+    def __call__(self, event):  # noqa: D102
+        self.handle_events([event])
+
+    def handle_events(self, events):
+        """
+        Record a batch of events.
+
+        :param list events: The events
+        """
+        if self._closed:
+            return
+        for event in events:
+            if isinstance(event[0], EventReactorShutdown):
+                if self._recorder is not None:
+                    self._recorder.close()
+                self._closed = True
+                return
+            recorder = self._get_recorder()
+            if recorder is None:
+                return
+            recorder.write(event)
+        if self._recorder is not None:
+            # keep the recording complete in case the process is killed
+            self._recorder.flush()
+
+    def _get_recorder(self):
+        if self._recorder is None:
+            log_path = get_log_path()
+            if log_path is None:
+                # logging is disabled
+                return None
+            log_path.mkdir(parents=True, exist_ok=True)
+            self._recorder = EventRecorder(log_path / RECORDING_FILENAME)
+        return self._recorder
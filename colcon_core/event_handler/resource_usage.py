@@ -0,0 +1,86 @@
+# Copyright 2016-2018 Dirk Thomas
+# Licensed under the Apache License, Version 2.0
+
+from colcon_core.event.command import CommandEnded
+from colcon_core.event_handler import EventHandlerExtensionPoint
+from colcon_core.event_handler import format_duration
+from colcon_core.event_reactor import EventReactorShutdown
+from colcon_core.output_style import Style
+from colcon_core.plugin_system import satisfies_version
+
+"""The number of commands listed in each ranking"""
+SUMMARY_COUNT = 5
+
+
+class ResourceUsageEventHandler(EventHandlerExtensionPoint):
+    """
+    Output the commands which used the most resources at the end.
+
+    The commands are ranked by the CPU time as well as the peak memory of
+    the command and its descendants.
+    The values are only available on platforms supporting `getrusage`.
+
+    The extension handles events of the following types:
+    - :py:class:`colcon_core.event.command.CommandEnded`
+    """
+
+    EVENT_TYPES = (CommandEnded, EventReactorShutdown)
+
+    # the commands only report their resource usage if requested
+    REQUIRES_RESOURCE_USAGE = True
+
+    def __init__(self):  # noqa: D107
+        super().__init__()
+        satisfies_version(
+            EventHandlerExtensionPoint.EXTENSION_POINT_VERSION, '^1.0')
+        # the summary is opt-in since it extends the output of every run
+        self.enabled = False
+        self._commands = []
+
+    def __call__(self, event):  # noqa: D102
+        data = event[0]
+
+        if isinstance(data, CommandEnded):
+            usage = getattr(data, 'resource_usage', None)
+            if usage is None:
+                return
+            identifier = getattr(event[1], 'identifier', None)
+            self._commands.append((identifier, data.cmd, usage))
+
+        elif isinstance(data, EventReactorShutdown):
+            if not self._commands:
+                return
+            for line in self._get_summary():
+                print(line, flush=True)
+
+    def _get_summary(self):
+        lines = []
+        by_cpu_time = sorted(
+            self._commands, key=lambda c: c[2].user_time + c[2].system_time,
+            reverse=True)
+        lines.append(Style.SectionStart('Commands with the most CPU time:'))
+        for identifier, cmd, usage in by_cpu_time[:SUMMARY_COUNT]:
+            cpu_time = format_duration(usage.user_time + usage.system_time)
+            lines.append(
+                f'  {Style.Measurement(cpu_time)} ' +
+                _format_command(identifier, cmd))
+
+        by_peak_memory = sorted(
+            (c for c in self._commands if c[2].max_rss is not None),
+            key=lambda c: c[2].max_rss, reverse=True)
+        if by_peak_memory:
+            lines.append(
+                Style.SectionStart('Commands with the most peak memory:'))
+            for identifier, cmd, usage in by_peak_memory[:SUMMARY_COUNT]:
+                peak_memory = f'{usage.max_rss / 1024 / 1024:.1f} MiB'
+                lines.append(
+                    f'  {Style.Measurement(peak_memory)} ' +
+                    _format_command(identifier, cmd))
+        return lines
+
+
+def _format_command(identifier, cmd):
+    string = ' '.join(str(c) for c in cmd)
+    if identifier is not None:
+        string = f'{Style.PackageOrJobName(identifier)}: {string}'
+    return string
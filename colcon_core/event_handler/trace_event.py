@@ -0,0 +1,194 @@
+# Copyright 2016-2018 Dirk Thomas
+# Licensed under the Apache License, Version 2.0
+
+import json
+import os
+import time
+
+from colcon_core.event.command import Command
+from colcon_core.event.command import CommandEnded
+from colcon_core.event.job import JobEnded
+from colcon_core.event.job import JobProgress
+from colcon_core.event.job import JobQueued
+from colcon_core.event.job import JobStarted
+from colcon_core.event_handler import EventHandlerExtensionPoint
+from colcon_core.event_reactor import EventReactorShutdown
+from colcon_core.location import get_log_path
+from colcon_core.plugin_system import satisfies_version
+
+"""The filename of the trace within the log path"""
+TRACE_FILENAME = 'trace.json'
+
+
+class TraceEventHandler(EventHandlerExtensionPoint):
+    """
+    Write a timeline of the jobs and commands in the trace event format.
+
+    The trace in the log directory can be opened with Perfetto or
+    `chrome://tracing`.
+    The extension is disabled by default, enable it with
+    `--event-handlers trace+`.
+    Each concurrently running job gets its own lane and the commands invoked
+    by a job are shown nested within the job.
+
+    The trace is written in the JSON array format which doesn't require the
+    array to be terminated, so a trace remains usable if the invocation is
+    interrupted.
+
+    The extension handles events of the following types:
+    - :py:class:`colcon_core.event.job.JobQueued`
+    - :py:class:`colcon_core.event.job.JobStarted`
+    - :py:class:`colcon_core.event.job.JobProgress`
+    - :py:class:`colcon_core.event.job.JobEnded`
+    - :py:class:`colcon_core.event.command.Command`
+    - :py:class:`colcon_core.event.command.CommandEnded`
+    """
+
+    EVENT_TYPES = (
+        JobQueued, JobStarted, JobProgress, JobEnded, Command, CommandEnded,
+        EventReactorShutdown)
+
+    def __init__(self):  # noqa: D107
+        super().__init__()
+        satisfies_version(
+            EventHandlerExtensionPoint.EXTENSION_POINT_VERSION, '^1.1')
+        # the trace is opt-in since it writes an additional file every run
+        self.enabled = False
+        self._file = None
+        self._closed = False
+        self._start_time = time.monotonic()
+        self._pid = os.getpid()
+        # the time each job has been queued and its dependencies
+        self._queued = {}
+        # the lane, start time and queued duration of each running job
+        self._running = {}
+        # the lanes which have been named so far
+        self._lanes = set()
+        # the start times and invoked commands of each running job
+        self._commands = {}
+
+    def __call__(self, event):  # noqa: D102
+        data = event[0]
+
+        if isinstance(data, JobQueued):
+            self._queued[data.identifier] = (
+                self._now(), data.dependencies)
+
+        elif isinstance(data, JobStarted):
+            now = self._now()
+            queued_time, _ = self._queued.get(data.identifier, (now, None))
+            lane = self._get_free_lane()
+            self._running[data.identifier] = (lane, now, now - queued_time)
+            self._commands[data.identifier] = []
+
+        elif isinstance(data, JobProgress):
+            if data.identifier not in self._running:
+                return
+            lane, _, _ = self._running[data.identifier]
+            self._write({
+                'name': data.progress, 'cat': 'progress', 'ph': 'i',
+                's': 't', 'ts': self._now(), 'pid': self._pid, 'tid': lane,
+                'args': {'job': data.identifier}})
+
+        elif isinstance(data, (Command, CommandEnded)):
+            identifier = getattr(event[1], 'identifier', None)
+            if identifier not in self._running:
+                return
+            commands = self._commands[identifier]
+            if not isinstance(data, CommandEnded):
+                commands.append((self._now(), data))
+            elif commands:
+                start_time, command = commands.pop()
+                lane, _, _ = self._running[identifier]
+                self._write_command(
+                    lane, start_time, self._now(), command, data.returncode)
+
+        elif isinstance(data, JobEnded):
+            if data.identifier not in self._running:
+                return
+            now = self._now()
+            lane, start_time, queued_duration = self._running.pop(
+                data.identifier)
+            # commands without a reported end, e.g. due to an exception
+            for command_start_time, command in reversed(
+                self._commands.pop(data.identifier)
+            ):
+                self._write_command(
+                    lane, command_start_time, now, command, None)
+            _, dependencies = self._queued.pop(data.identifier, (None, None))
+            self._write({
+                'name': data.identifier, 'cat': 'job', 'ph': 'X',
+                'ts': start_time, 'dur': now - start_time,
+                'pid': self._pid, 'tid': lane,
+                'args': {
+                    'returncode': _to_json(data.rc),
+                    'queued_duration_us': queued_duration,
+                    'dependencies': sorted(dependencies or ()),
+                }})
+            if self._file is not None:
+                self._file.flush()
+
+        elif isinstance(data, EventReactorShutdown):
+            if self._file is not None:
+                self._file.write(']\n')
+                self._file.close()
+                self._file = None
+            self._closed = True
+
+    def _now(self):
+        # the trace event format uses microseconds
+        return (time.monotonic() - self._start_time) * 1e6
+
+    def _get_free_lane(self):
+        used_lanes = {lane for lane, _, _ in self._running.values()}
+        lane = 1
+        while lane in used_lanes:
+            lane += 1
+        if lane not in self._lanes:
+            self._lanes.add(lane)
+            self._write({
+                'name': 'thread_name', 'ph': 'M', 'pid': self._pid,
+                'tid': lane, 'args': {'name': f'job slot {lane}'}})
+            self._write({
+                'name': 'thread_sort_index', 'ph': 'M', 'pid': self._pid,
+                'tid': lane, 'args': {'sort_index': lane}})
+        return lane
+
+    def _write_command(self, lane, start_time, end_time, command, returncode):
+        name = 'command'
+        if command.cmd:
+            name = os.path.basename(str(command.cmd[0]))
+        self._write({
+            'name': name, 'cat': 'command', 'ph': 'X',
+            'ts': start_time, 'dur': end_time - start_time,
+            'pid': self._pid, 'tid': lane,
+            'args': {
+                'cmd': command.to_string(),
+                'cwd': _to_json(command.cwd),
+                'returncode': _to_json(returncode),
+            }})
+
+    def _write(self, trace_event):
+        if self._file is None:
+            if self._closed:
+                return
+            log_path = get_log_path()
+            if log_path is None:
+                # logging is disabled
+                self._closed = True
+                return
+            log_path.mkdir(parents=True, exist_ok=True)
+            self._file = (log_path / TRACE_FILENAME).open(
+                mode='w', encoding='utf-8')
+            self._file.write('[\n')
+            self._file.write(json.dumps({
+                'name': 'process_name', 'ph': 'M', 'pid': self._pid,
+                'args': {'name': 'colcon'}}))
+        self._file.write(',\n' + json.dumps(trace_event))
+
+
+def _to_json(value):
+    # return codes might be strings like 'SIGINT' or other objects
+    if value is None or isinstance(value, (int, float, str)):
+        return value
+    return str(value)
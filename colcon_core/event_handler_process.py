@@ -0,0 +1,249 @@
+# Copyright 2016-2018 Dirk Thomas
+# Licensed under the Apache License, Version 2.0
+
+"""
+Run the event handlers in a separate process.
+
+The event reactor of the invoking process forwards batches of events through
+the standard input of the event handler process which dispatches them to
+the event handler extensions.
+The console output and log files are then being rendered without competing
+with the executor for the interpreter lock.
+
+The messages are pickled tuples which are prefixed with their length.
+The first message contains the context, the location of the log
+directory and the console log level, all following messages contain a list
+of events.
+Log messages of the event handler process are being written to the console
+based on the same level as in the invoking process and with all levels to
+the log file of the invoking process.
+
+Run the event handler process with
+`python -m colcon_core.event_handler_process`.
+"""
+
+import copy
+import os
+import pickle
+import signal
+import struct
+import subprocess
+import sys
+
+from colcon_core.command import CommandContext
+from colcon_core.event.timer import TimerEvent
+from colcon_core.event_reactor import create_event_reactor
+from colcon_core.event_reactor import EventReactorShutdown
+from colcon_core.location import get_log_path
+from colcon_core.location import set_default_log_path
+from colcon_core.logging import add_file_handler
+from colcon_core.logging import colcon_logger
+from colcon_core.logging import get_effective_console_level
+
+logger = colcon_logger.getChild(__name__)
+
+_HEADER = struct.Struct('!I')
+
+
+class ForwardedJob:
+    """The stand-in for the job of a forwarded event."""
+
+    __slots__ = ('identifier', )
+
+    def __init__(self, identifier):
+        """
+        Construct a ForwardedJob.
+
+        :param str identifier: The job identifier
+        """
+        self.identifier = identifier
+
+    def __str__(self):
+        """Use the identifier as the string representation of a job."""
+        return self.identifier
+
+
+class EventHandlerProcess:
+    """
+    Forward events to the event handlers running in a separate process.
+
+    The instance is being registered as the only observer of the event
+    reactor.
+    Chunks of output lines are being forwarded as is and only split into
+    line events for the event handlers which need them.
+    Timer events are not being forwarded since the event handler process
+    generates its own.
+    The jobs of the events are being replaced with
+    :py:class:`ForwardedJob` instances and events which can't be pickled
+    are being skipped.
+
+    Flushing the event reactor only ensures that the events have been
+    forwarded, not that the event handlers have processed them.
+    """
+
+    # receive all events including the chunk events without splitting them
+    EVENT_TYPES = (object, )
+
+    def __init__(self, context):
+        """
+        Start the event handler process.
+
+        :param context: The context passed to the event handlers
+        """
+        self._process = subprocess.Popen(
+            [sys.executable, '-m', __name__], stdin=subprocess.PIPE)
+        self._jobs = {}
+        self._write(
+            (getattr(context, 'command_name', None),
+             _get_picklable_args(context.args),
+             get_log_path(), get_effective_console_level(colcon_logger)))
+
+    def __call__(self, event):
+        """
+        Forward a single event.
+
+        :param event: The event
+        """
+        self.handle_events([event])
+
+    def handle_events(self, events):
+        """
+        Forward a batch of events.
+
+        When the event reactor is shutting down the call blocks until the
+        event handler process has finished.
+
+        :param list events: The events
+        """
+        if self._process.stdin is None:
+            return
+        forwarded = []
+        shutdown = False
+        for data, job in events:
+            if isinstance(data, TimerEvent):
+                continue
+            forwarded.append((data, self._get_forwarded_job(job)))
+            if isinstance(data, EventReactorShutdown):
+                shutdown = True
+                break
+        if forwarded:
+            self._write(forwarded)
+        if shutdown:
+            self.close()
+
+    def close(self):
+        """Close the connection and wait for the process to finish."""
+        if self._process.stdin is not None:
+            try:
+                self._process.stdin.close()
+            except BrokenPipeError:
+                pass
+            self._process.stdin = None
+        self._process.wait()
+
+    def _get_forwarded_job(self, job):
+        if job is None:
+            return None
+        identifier = getattr(job, 'identifier', None)
+        if identifier is None:
+            return None
+        forwarded_job = self._jobs.get(identifier)
+        if forwarded_job is None:
+            forwarded_job = ForwardedJob(str(identifier))
+            self._jobs[identifier] = forwarded_job
+        return forwarded_job
+
+    def _write(self, message):
+        try:
+            data = pickle.dumps(message, protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception:  # noqa: B902
+            if not isinstance(message, list):
+                raise
+            # only skip the events which can't be pickled
+            message = [e for e in message if _is_picklable(e)]
+            data = pickle.dumps(message, protocol=pickle.HIGHEST_PROTOCOL)
+        try:
+            self._process.stdin.write(_HEADER.pack(len(data)) + data)
+            self._process.stdin.flush()
+        except BrokenPipeError:
+            logger.error(
+                'The event handler process has terminated unexpectedly')
+            self._process.stdin = None
+
+
+def _get_picklable_args(args):
+    args = copy.copy(args)
+    for key, value in list(getattr(args, '__dict__', {}).items()):
+        if not _is_picklable(value):
+            delattr(args, key)
+    # the event handler process must not start another one
+    args.event_handler_process = False
+    return args
+
+
+def _is_picklable(value):
+    try:
+        pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+    except Exception as e:  # noqa: B902
+        logger.debug(
+            f"Skipping '{type(value).__name__}' which can't be passed to "
+            f'the event handler process: {e}')
+        return False
+    return True
+
+
+def _read_message(stream):
+    header = stream.read(_HEADER.size)
+    if len(header) != _HEADER.size:
+        return None
+    length = _HEADER.unpack(header)[0]
+    data = stream.read(length)
+    if len(data) != length:
+        return None
+    return pickle.loads(data)
+
+
+def main(stream=None):
+    """
+    Dispatch the forwarded events to the event handlers.
+
+    :param stream: The binary stream to read the messages from, if None the
+      standard input
+    :returns: The return code
+    """
+    if stream is None:
+        stream = sys.stdin.buffer
+    message = _read_message(stream)
+    if message is None:
+        return 1
+    command_name, args, log_path, console_level = message
+    colcon_logger.setLevel(console_level)
+    if log_path is None:
+        set_default_log_path(base_path=os.devnull)
+    else:
+        set_default_log_path(
+            base_path=log_path.parent, subdirectory=log_path.name)
+        # append to the log file of the invoking process
+        add_file_handler(colcon_logger, log_path / 'logger_all.log')
+    context = CommandContext(command_name=command_name, args=args)
+
+    event_reactor = create_event_reactor(context)
+    queue = event_reactor.get_queue()
+    with event_reactor:
+        while True:
+            events = _read_message(stream)
+            if events is None:
+                break
+            for event in events:
+                # the event reactor posts its own shutdown event
+                if isinstance(event[0], EventReactorShutdown):
+                    return 0
+                queue.put(event)
+    return 0
+
+
+if __name__ == '__main__':
+    # the invoking process closes the pipe when being interrupted, until
+    # then the remaining events should still be rendered
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    sys.exit(main())
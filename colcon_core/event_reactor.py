@@ -1,8 +1,10 @@
 # Copyright 2016-2018 Dirk Thomas
 # Licensed under the Apache License, Version 2.0
 
-from queue import Empty
+import asyncio
 from queue import Queue
+from threading import Condition
+from threading import current_thread
 from threading import Thread
 import time
 import traceback
@@ -11,20 +13,258 @@ from colcon_core.event.timer import TimerEvent
 from colcon_core.event_handler import apply_event_handler_arguments
 from colcon_core.event_handler import get_event_handler_extensions
 from colcon_core.logging import colcon_logger
+from colcon_core.subprocess import set_resource_usage_reporting
 
 logger = colcon_logger.getChild(__name__)
 
 
+class EventQueue(Queue):
+    """
+    A queue which allows retrieving all available events at once.
+
+    Retrieving and acknowledging a batch of events only acquires the lock of
+    the queue once instead of once per event.
+    The queue also counts the events which have been put into it.
+
+    Optionally the queue has a high-water mark for the number of events as
+    well as for the size of the queued output (see :func:`get_output_size`).
+    Putting events into the queue never blocks, but producers can wait for
+    the queue to drain below half the high-water marks once one of them has
+    been reached.
+    """
+
+    def __init__(
+        self, maxsize=0, *, high_water_mark=None, high_water_mark_bytes=None
+    ):
+        """
+        Construct an EventQueue.
+
+        :param int maxsize: The maximum number of events in the queue
+        :param int high_water_mark: The number of queued events at which
+          producers waiting for capacity are being paused, if None they are
+          not paused based on the number of events
+        :param int high_water_mark_bytes: The size of the queued output in
+          bytes at which producers waiting for capacity are being paused, if
+          None they are not paused based on the size of the output
+        """
+        super().__init__(maxsize)
+        self.put_count = 0
+        self.high_water_mark = high_water_mark
+        self.high_water_mark_bytes = high_water_mark_bytes
+        self.queued_bytes = 0
+        # the event loops and futures of the paused producers
+        self._capacity_waiters = []
+
+    def _put(self, item):
+        # invoked while holding the mutex
+        super()._put(item)
+        self.put_count += 1
+        self.queued_bytes += get_output_size(item)
+
+    def _get(self):
+        # invoked while holding the mutex
+        item = super()._get()
+        self.queued_bytes -= get_output_size(item)
+        return item
+
+    def get_put_count(self):
+        """
+        Get the number of events which have been put into the queue so far.
+
+        :rtype: int
+        """
+        with self.mutex:
+            return self.put_count
+
+    def get_all(self, *, timeout=None, max_count=None):
+        """
+        Remove and return all available events.
+
+        The call blocks until at least one event is available.
+
+        :param float timeout: The maximum duration in seconds to wait for an
+          event, if None wait indefinitely
+        :param int max_count: The maximum number of events to return
+        :returns: The events, an empty list if the timeout has elapsed
+        :rtype: list
+        """
+        with self.not_empty:
+            if timeout is not None:
+                end_time = time.monotonic() + timeout
+            while not self._qsize():
+                if timeout is None:
+                    self.not_empty.wait()
+                    continue
+                remaining = end_time - time.monotonic()
+                if remaining <= 0:
+                    return []
+                self.not_empty.wait(remaining)
+            count = self._qsize()
+            if max_count is not None:
+                count = min(count, max_count)
+            events = [self._get() for _ in range(count)]
+            self.not_full.notify(count)
+            if self._capacity_waiters and self._is_drained():
+                self._release_capacity_waiters()
+            return events
+
+    def set_high_water_mark(self, high_water_mark, high_water_mark_bytes=None):
+        """
+        Change the high-water marks of the queue.
+
+        Paused producers are being resumed if the queue has enough capacity
+        for the new high-water marks.
+
+        :param int high_water_mark: The number of queued events at which
+          producers are being paused, if None they are not paused based on
+          the number of events
+        :param int high_water_mark_bytes: The size of the queued output in
+          bytes at which producers are being paused, if None they are not
+          paused based on the size of the output
+        """
+        with self.mutex:
+            self.high_water_mark = high_water_mark
+            self.high_water_mark_bytes = high_water_mark_bytes
+            if self._is_drained():
+                self._release_capacity_waiters()
+
+    async def wait_for_capacity(self):
+        """
+        Wait until the queue has capacity for more events.
+
+        The coroutine returns immediately unless the number of queued events
+        or the size of the queued output has reached its high-water mark.
+        In that case it only returns once the queue has been drained to half
+        the high-water marks.
+        """
+        with self.mutex:
+            if not self._is_at_capacity():
+                return
+            loop = asyncio.get_event_loop()
+            future = loop.create_future()
+            self._capacity_waiters.append((loop, future))
+        await future
+
+    def _is_at_capacity(self):
+        # invoked while holding the mutex
+        return (
+            (
+                self.high_water_mark is not None and
+                self._qsize() >= self.high_water_mark
+            ) or (
+                self.high_water_mark_bytes is not None and
+                self.queued_bytes >= self.high_water_mark_bytes
+            )
+        )
+
+    def _is_drained(self):
+        # invoked while holding the mutex
+        return (
+            (
+                self.high_water_mark is None or
+                self._qsize() <= self.high_water_mark // 2
+            ) and (
+                self.high_water_mark_bytes is None or
+                self.queued_bytes <= self.high_water_mark_bytes // 2
+            )
+        )
+
+    def _release_capacity_waiters(self):
+        # invoked while holding the mutex
+        for loop, future in self._capacity_waiters:
+            try:
+                loop.call_soon_threadsafe(_resolve_future, future)
+            except RuntimeError:
+                # the event loop has been closed
+                pass
+        self._capacity_waiters = []
+
+    def task_done(self, count=1):
+        """
+        Indicate that previously retrieved events have been processed.
+
+        :param int count: The number of processed events
+        :raises ValueError: if called more times than there were events
+        """
+        with self.all_tasks_done:
+            unfinished = self.unfinished_tasks - count
+            if unfinished <= 0:
+                if unfinished < 0:
+                    raise ValueError('task_done() called too many times')
+                self.all_tasks_done.notify_all()
+            self.unfinished_tasks = unfinished
+
+
 class EventReactor:
-    """Notify registered observers for events posted to the queue."""
+    """
+    Notify registered observers for events posted to the queue.
+
+    All events available in the queue are being retrieved at once and
+    dispatched as a batch.
+    Observers providing a `handle_events` method receive the whole batch as
+    a list, all other observers are being called for each event.
+    The order in which observers are being notified is preserved for each
+    event unless batch observers are registered between other observers.
+
+    Observers declaring the event types they are interested in are only
+    being notified about events of those types.
+    The observers interested in each type of event are being looked up once
+    per type.
+    Event types with an attribute `LINE_TYPE`, e.g.
+    :py:class:`colcon_core.event.output.StdoutChunk`, combine multiple lines.
+    Observers which don't explicitly declare such an event type receive the
+    events returned by its `get_lines()` method instead.
+
+    Timer events are only being generated for observers interested in them.
+
+    Producers like the readers of subprocess output can wait for the queue to
+    drain once it has reached :attr:`HIGH_WATER_MARK` events or
+    :attr:`HIGH_WATER_MARK_BYTES` of output in order to bound the memory used
+    by the queued events.
+    """
+
+    """
+    The default interval in seconds of the timer events.
 
+    Observers can provide an attribute `TIMER_INTERVAL` to use a different
+    interval.
+    """
     TIMER_INTERVAL = 0.1
 
+    """The maximum number of events being dispatched as one batch."""
+    MAX_BATCH_SIZE = 1000
+
+    """
+    The number of queued events at which the producers are being paused.
+
+    If None the producers are never paused.
+    """
+    HIGH_WATER_MARK = 10000
+
+    """
+    The size of the queued output in bytes at which the producers are being
+    paused.
+
+    Since a single chunk event can contain many lines this bounds the memory
+    used by the queued events more tightly than the number of events.
+    If None the producers are not paused based on the size of the output.
+    """
+    HIGH_WATER_MARK_BYTES = 4 * 1024 * 1024
+
     def __init__(self):  # noqa: D107
         self._thread = Thread(target=self._run)
-        self._queue = Queue()
+        self._queue = EventQueue(
+            high_water_mark=self.HIGH_WATER_MARK,
+            high_water_mark_bytes=self.HIGH_WATER_MARK_BYTES)
         self._observers = []
-        self._last_timer_event = 0
+        self._segments = None
+        # the observers interested in each event type
+        self._dispatch_table = {}
+        self._timers = None
+        # the number of events taken from the queue and dispatched
+        self._processed_count = 0
+        self._processed_condition = Condition()
+        self._stopped = False
 
     def get_queue(self):
         """Get the event queue."""
@@ -34,64 +274,215 @@ class EventReactor:
         """
         Register an observer which gets called for each event.
 
+        If the observer has a `handle_events` method it is being called with
+        a list of events instead.
+        If the observer has an attribute `EVENT_TYPES` it is only being
+        notified about events of these types.
+        Observers interested in timer events receive them in the interval
+        given by their attribute `TIMER_INTERVAL` if available, otherwise in
+        the interval of the event reactor.
+
         :param callable observer: The callback
         """
         self._observers.append(observer)
+        self._segments = None
+        self._dispatch_table = {}
+        self._timers = None
 
     def _run(self):
         """
         Process events and notify all observers.
 
-        If no events are being process for :attr:`TIMER_INTERVAL`
-        seconds a :class:`TimerEvent` is being generated and processed.
+        Each observer interested in timer events receives a
+        :class:`TimerEvent` when its interval has elapsed.
+        In between the thread only wakes up when events are being posted.
 
         An :class:`EventReactorShutdown` event will stop the loop.
         """
+        try:
+            self._process_events()
+        finally:
+            # producers must not wait for events which are never processed
+            self._queue.set_high_water_mark(None)
+            with self._processed_condition:
+                self._stopped = True
+                self._processed_condition.notify_all()
+
+    def _process_events(self):
         while True:
-            # send timer events in regular interval
-            now = time.monotonic()
-            time_since_last_timer_event = now - self._last_timer_event
-            if time_since_last_timer_event >= self.TIMER_INTERVAL:
-                self._notify_observers((TimerEvent(), None))
-                self._last_timer_event = now
-                timeout = self.TIMER_INTERVAL
-            else:
-                timeout = self.TIMER_INTERVAL - time_since_last_timer_event
-
-            # wait for next event or timeout
-            try:
-                event = self._queue.get(timeout=timeout)
-            except Empty:
-                continue
+            # send timer events to the observers whose interval has elapsed
+            timeout = self._notify_timer_observers()
 
-            # publish event
-            self._notify_observers(event)
-            self._queue.task_done()
+            # wait for the next events or the next timer deadline
+            events = self._queue.get_all(
+                timeout=timeout, max_count=self.MAX_BATCH_SIZE)
+            if not events:
+                continue
 
             # the signal to end the processing thread
-            if len(event) > 1 and isinstance(event[0], EventReactorShutdown):
+            count = len(events)
+            shutdown = False
+            for i, event in enumerate(events):
+                if len(event) > 1 and isinstance(
+                    event[0], EventReactorShutdown
+                ):
+                    # events posted after the shutdown are not being processed
+                    events = events[:i + 1]
+                    shutdown = True
+                    break
+
+            # publish events
+            self._notify_observers_batch(events)
+            self._queue.task_done(count)
+            with self._processed_condition:
+                self._processed_count += count
+                self._processed_condition.notify_all()
+
+            if shutdown:
                 break
 
-    def _notify_observers(self, event):
-        for observer in self._observers:
-            try:
-                retval = observer(event)
-                assert retval is None, 'event handler should return None'
-            except Exception as e:  # noqa: F841
-                # catch exceptions raised in event handler extension
-                msg = 'Exception in event handler extension ' \
-                    f"'{observer.EVENT_HANDLER_NAME}': {e}"
-                if not isinstance(e, RuntimeError):
-                    msg += '\n' + traceback.format_exc()
-                logger.error(msg)
-                # skip failing extension, continue with next one
+    def _notify_timer_observers(self):
+        # returns the duration until the next timer deadline or None
+        now = time.monotonic()
+        due = []
+        next_deadline = None
+        for timer in self._get_timers():
+            observer, interval, last_time = timer
+            interval = interval or self.TIMER_INTERVAL
+            if last_time is None or last_time + interval <= now:
+                due.append(observer)
+                timer[2] = last_time = now
+            deadline = last_time + interval
+            if next_deadline is None or deadline < next_deadline:
+                next_deadline = deadline
+
+        if due:
+            event = (TimerEvent(), None)
+            for observer in due:
+                handle_events = getattr(observer, 'handle_events', None)
+                if handle_events is not None:
+                    self._call_observer(observer, [event], handle_events)
+                else:
+                    self._call_observer(observer, event)
+
+        if next_deadline is None:
+            return None
+        return max(0.0, next_deadline - time.monotonic())
+
+    def _get_timers(self):
+        # the observers interested in timer events, their custom interval
+        # and the time of their last timer event
+        if self._timers is None:
+            self._timers = [
+                [observer, getattr(observer, 'TIMER_INTERVAL', None), None]
+                for observer in self._observers
+                if _is_interested(observer, TimerEvent)]
+        return self._timers
+
+    def _notify_observers_batch(self, events):
+        segments = self._get_segments()
+        # the interested observers in each segment for each event
+        dispatch = [self._get_dispatch(type(event[0])) for event in events]
+        # the line events of chunk events, only created when needed
+        lines = {}
+
+        def get_lines(i):
+            if i not in lines:
+                data, job = events[i]
+                lines[i] = [(line, job) for line in data.get_lines()]
+            return lines[i]
+
+        for index, (handle_events, observers) in enumerate(segments):
+            if handle_events is not None:
+                interesting_events = []
+                for i, interested in enumerate(dispatch):
+                    if interested[index]:
+                        if interested[index][0][1]:
+                            interesting_events += get_lines(i)
+                        else:
+                            interesting_events.append(events[i])
+                if interesting_events:
+                    self._call_observer(
+                        observers[0], interesting_events, handle_events)
+                continue
+            # consecutive observers handling single events are being
+            # notified for each event in turn to maintain the order of their
+            # output
+            for i, interested in enumerate(dispatch):
+                for observer, split in interested[index]:
+                    if not split:
+                        self._call_observer(observer, events[i])
+                        continue
+                    for line in get_lines(i):
+                        self._call_observer(observer, line)
+
+    def _get_segments(self):
+        # group consecutive observers by the way they are being notified
+        if self._segments is None:
+            self._segments = []
+            for observer in self._observers:
+                handle_events = getattr(observer, 'handle_events', None)
+                if (
+                    handle_events is None and self._segments and
+                    self._segments[-1][0] is None
+                ):
+                    self._segments[-1][1].append(observer)
+                else:
+                    self._segments.append((handle_events, [observer]))
+        return self._segments
+
+    def _get_dispatch(self, event_type):
+        # look up the observers interested in events of a specific type and
+        # if they need chunk events to be split into line events
+        dispatch = self._dispatch_table.get(event_type)
+        if dispatch is None:
+            line_type = getattr(event_type, 'LINE_TYPE', None)
+            dispatch = []
+            for _, observers in self._get_segments():
+                entries = []
+                for observer in observers:
+                    if line_type is not None and not _is_declared(
+                        observer, event_type
+                    ):
+                        if _is_interested(observer, line_type):
+                            entries.append((observer, True))
+                    elif _is_interested(observer, event_type):
+                        entries.append((observer, False))
+                dispatch.append(entries)
+            self._dispatch_table[event_type] = dispatch
+        return dispatch
+
+    def _call_observer(self, observer, event, callback=None):
+        try:
+            retval = (callback or observer)(event)
+            assert retval is None, 'event handler should return None'
+        except Exception as e:  # noqa: F841
+            # catch exceptions raised in event handler extension
+            name = getattr(observer, 'EVENT_HANDLER_NAME', observer)
+            msg = f"Exception in event handler extension '{name}': {e}"
+            if not isinstance(e, RuntimeError):
+                msg += '\n' + traceback.format_exc()
+            logger.error(msg)
+            # skip failing extension, continue with next one
 
     def flush(self):
-        """Wait until the queue is empty."""
-        while self._thread.is_alive():
-            if self._queue.empty():
-                return
-            time.sleep(0.01)
+        """
+        Wait until all events posted before have been dispatched.
+
+        The call returns when all observers have been notified about every
+        event which has been put into the queue before calling this function
+        or when the event reactor is not running.
+        """
+        if not self._thread.is_alive():
+            return
+        # an observer waiting for its own notification would never return
+        if current_thread() is self._thread:
+            return
+        target_count = self._queue.get_put_count()
+        with self._processed_condition:
+            self._processed_condition.wait_for(
+                lambda: self._stopped or
+                self._processed_count >= target_count)
 
     def start(self):
         """Start the event reactor."""
@@ -123,6 +514,46 @@ class EventReactor:
         self.stop()
 
 
+def get_output_size(event):
+    """
+    Get the size of the output contained in an event.
+
+    The size is the length of the `data` of chunk events like
+    :py:class:`colcon_core.event.output.StdoutChunk` or of the `line` of line
+    events like :py:class:`colcon_core.event.output.StdoutLine`.
+
+    :param event: The tuple of the event data and the job
+    :returns: The size in bytes, zero for events without output
+    :rtype: int
+    """
+    data = event[0] if isinstance(event, tuple) and event else event
+    for name in ('data', 'line'):
+        value = getattr(data, name, None)
+        if isinstance(value, (bytes, bytearray, str)):
+            return len(value)
+    return 0
+
+
+def _resolve_future(future):
+    # the waiting coroutine might have been cancelled in the meantime
+    if not future.done():
+        future.set_result(None)
+
+
+def _is_interested(observer, event_type):
+    event_types = getattr(observer, 'EVENT_TYPES', None)
+    if event_types is None:
+        return True
+    return issubclass(event_type, tuple(event_types))
+
+
+def _is_declared(observer, event_type):
+    event_types = getattr(observer, 'EVENT_TYPES', None)
+    if event_types is None:
+        return False
+    return issubclass(event_type, tuple(event_types))
+
+
 class EventReactorShutdown:
     """An event generated before the event reactor is shut down."""
 
@@ -133,17 +564,33 @@ def create_event_reactor(context):
     """
     Create an event reactor and add all event handlers as observers.
 
+    If the argument `event_handler_process` is set the event handlers are
+    being run in a separate process instead and the events are being
+    forwarded to it.
+
+    The resource usage of invoked commands is only being reported if any
+    enabled event handler has the attribute `REQUIRES_RESOURCE_USAGE` set.
+
     :param context: The context is passed to all event handlers
     :returns: The event reactor
     """
-    event_reactor = EventReactor()
     event_handlers = get_event_handler_extensions(context=context)
     apply_event_handler_arguments(event_handlers, context.args)
+    enabled_event_handlers = [
+        e for e in event_handlers.values() if e.enabled]
+    set_resource_usage_reporting(any(
+        getattr(e, 'REQUIRES_RESOURCE_USAGE', False)
+        for e in enabled_event_handlers))
+
+    event_reactor = EventReactor()
+    if getattr(context.args, 'event_handler_process', None) is True:
+        # avoid a circular import since the process uses this function
+        from colcon_core.event_handler_process import EventHandlerProcess
+        event_reactor.register_observer(EventHandlerProcess(context))
+        return event_reactor
 
     # register enabled event handlers
-    for event_handler in event_handlers.values():
-        if not event_handler.enabled:
-            continue
+    for event_handler in enabled_event_handlers:
         event_reactor.register_observer(event_handler)
 
     return event_reactor
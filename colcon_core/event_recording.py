@@ -0,0 +1,273 @@
+# Copyright 2016-2018 Dirk Thomas
+# Licensed under the Apache License, Version 2.0
+
+"""
+Record a stream of events into a compact binary file and replay it.
+
+A recording starts with a header containing the wall-clock time of its
+start.
+It is followed by records which are prefixed with their kind, the number of
+seconds since the start of the recording and the length of their payload.
+
+To keep the recording compact the module path of each event type and each
+job identifier is only written once and subsequently referred to by its
+index.
+The payload of an event record is the index of its type and of its job
+followed by the pickled attribute values of the event.
+"""
+
+from functools import lru_cache
+import importlib
+import pickle
+import struct
+import time
+
+from colcon_core.event_reactor import EventReactor
+from colcon_core.logging import colcon_logger
+
+logger = colcon_logger.getChild(__name__)
+
+"""The magic bytes at the beginning of a recording"""
+RECORDING_MAGIC = b'COLCON-EVENTS'
+"""The version of the recording format"""
+RECORDING_VERSION = 1
+
+# the header contains the format version and the start time
+_HEADER = struct.Struct('!Bd')
+# each record starts with its kind, the time offset and the payload length
+_RECORD_HEADER = struct.Struct('!BdI')
+# an event payload starts with the index of the event type and the job
+_EVENT_HEADER = struct.Struct('!HI')
+
+# the kinds of records
+_EVENT_TYPE = 0
+_JOB = 1
+_EVENT = 2
+
+# the job index of events without a job
+_NO_JOB = 0
+
+
+class EventRecorder:
+    """Write events into a recording."""
+
+    def __init__(self, path):
+        """
+        Construct an EventRecorder.
+
+        The recording is being created lazily when the first event is being
+        written.
+
+        :param path: The path of the recording
+        """
+        self.path = path
+        self._file = None
+        self._start = None
+        self._event_types = {}
+        self._jobs = {}
+
+    def write(self, event, *, timestamp=None):
+        """
+        Append an event to the recording.
+
+        Events which can't be pickled are being skipped.
+
+        :param tuple event: The event and the job
+        :param float timestamp: The monotonic time of the event, if None the
+          current time
+        :returns: True if the event has been recorded
+        :rtype: bool
+        """
+        data, job = event
+        if timestamp is None:
+            timestamp = time.monotonic()
+        if self._file is None:
+            self._open(timestamp)
+        offset = timestamp - self._start
+
+        event_type = type(data)
+        try:
+            state = pickle.dumps(
+                _get_state(data), protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception as e:  # noqa: B902
+            logger.debug(
+                f"Skipping event of type '{event_type.__name__}' which "
+                f"can't be recorded: {e}")
+            return False
+
+        type_index = self._event_types.get(event_type)
+        if type_index is None:
+            type_index = len(self._event_types)
+            self._event_types[event_type] = type_index
+            self._write_record(
+                _EVENT_TYPE, offset,
+                f'{event_type.__module__}:{event_type.__qualname__}'.encode())
+
+        identifier = getattr(job, 'identifier', None)
+        job_index = _NO_JOB
+        if identifier is not None:
+            job_index = self._jobs.get(identifier)
+            if job_index is None:
+                # the index 0 is reserved for events without a job
+                job_index = len(self._jobs) + 1
+                self._jobs[identifier] = job_index
+                self._write_record(_JOB, offset, str(identifier).encode())
+
+        self._write_record(
+            _EVENT, offset, _EVENT_HEADER.pack(type_index, job_index) + state)
+        return True
+
+    def flush(self):
+        """Flush the written events to the file."""
+        if self._file is not None:
+            self._file.flush()
+
+    def close(self):
+        """Close the recording."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _open(self, timestamp):
+        self._file = open(str(self.path), 'wb')
+        self._start = timestamp
+        self._file.write(
+            RECORDING_MAGIC + _HEADER.pack(RECORDING_VERSION, time.time()))
+
+    def _write_record(self, kind, offset, payload):
+        self._file.write(
+            _RECORD_HEADER.pack(kind, offset, len(payload)) + payload)
+
+
+class RecordedJob:
+    """The stand-in for the job of a recorded event."""
+
+    __slots__ = ('identifier', )
+
+    def __init__(self, identifier):
+        """
+        Construct a RecordedJob.
+
+        :param str identifier: The job identifier
+        """
+        self.identifier = identifier
+
+    def __str__(self):
+        """Use the identifier as the string representation of a job."""
+        return self.identifier
+
+
+def read_recording(path):
+    """
+    Read the events of a recording.
+
+    The job of each event is being represented by a :class:`RecordedJob`
+    and all events of the same job share the same instance.
+    A truncated record at the end, e.g. from an interrupted invocation, is
+    being ignored.
+
+    :param path: The path of the recording
+    :returns: A generator yielding the number of seconds since the start of
+      the recording and the event for each recorded event
+    :raises ValueError: if the file is not a recording
+    """
+    with open(str(path), 'rb') as h:
+        magic = h.read(len(RECORDING_MAGIC))
+        header = h.read(_HEADER.size)
+        if magic != RECORDING_MAGIC or len(header) != _HEADER.size:
+            raise ValueError(f"The file '{path}' is not an event recording")
+        version, _ = _HEADER.unpack(header)
+        if version != RECORDING_VERSION:
+            raise ValueError(
+                f"The recording '{path}' has the unsupported version "
+                f"'{version}'")
+
+        event_types = []
+        jobs = [None]
+        while True:
+            record_header = h.read(_RECORD_HEADER.size)
+            if len(record_header) != _RECORD_HEADER.size:
+                break
+            kind, offset, length = _RECORD_HEADER.unpack(record_header)
+            payload = h.read(length)
+            if len(payload) != length:
+                break
+
+            if kind == _EVENT_TYPE:
+                event_types.append(_import_type(payload.decode()))
+            elif kind == _JOB:
+                jobs.append(RecordedJob(payload.decode()))
+            elif kind == _EVENT:
+                type_index, job_index = _EVENT_HEADER.unpack_from(payload)
+                if event_types[type_index] is None:
+                    continue
+                state = pickle.loads(payload[_EVENT_HEADER.size:])
+                data = _create_event(event_types[type_index], state)
+                yield offset, (data, jobs[job_index])
+
+
+def replay_recording(path, observers, *, real_time=False):
+    """
+    Pass the events of a recording to a set of observers.
+
+    The events are being dispatched by an
+    :py:class:`colcon_core.event_reactor.EventReactor` which also generates
+    the timer events as well as the final shutdown event.
+
+    :param path: The path of the recording
+    :param observers: The observers, e.g. event handler extensions
+    :param bool real_time: The flag if the events should be posted with the
+      recorded timing, otherwise they are being posted as fast as possible
+    """
+    event_reactor = EventReactor()
+    for observer in observers:
+        event_reactor.register_observer(observer)
+    queue = event_reactor.get_queue()
+    with event_reactor:
+        start = time.monotonic()
+        for offset, event in read_recording(path):
+            if real_time:
+                delay = start + offset - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+            queue.put(event)
+
+
+@lru_cache(maxsize=None)
+def _get_slots(event_type):
+    slots = ()
+    for cls in reversed(event_type.__mro__):
+        cls_slots = cls.__dict__.get('__slots__', ())
+        if isinstance(cls_slots, str):
+            cls_slots = (cls_slots, )
+        slots += tuple(
+            s for s in cls_slots if s not in ('__dict__', '__weakref__'))
+    return slots
+
+
+def _get_state(data):
+    # the values of the slots followed by the instance dictionary if any
+    values = [getattr(data, s, None) for s in _get_slots(type(data))]
+    return (values, getattr(data, '__dict__', None))
+
+
+def _create_event(event_type, state):
+    values, dictionary = state
+    data = event_type.__new__(event_type)
+    for slot, value in zip(_get_slots(event_type), values):
+        setattr(data, slot, value)
+    if dictionary:
+        data.__dict__.update(dictionary)
+    return data
+
+
+def _import_type(path):
+    module_name, qualname = path.split(':', 1)
+    try:
+        obj = importlib.import_module(module_name)
+        for name in qualname.split('.'):
+            obj = getattr(obj, name)
+    except (ImportError, AttributeError) as e:
+        logger.warning(f"Skipping recorded events of type '{path}': {e}")
+        return None
+    return obj
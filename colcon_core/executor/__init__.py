@@ -2,6 +2,7 @@
 # Licensed under the Apache License, Version 2.0
 
 from asyncio import CancelledError
+from collections import OrderedDict
 from enum import Enum
 import inspect
 import os
@@ -15,6 +16,8 @@ from colcon_core.event.job import JobSkipped
 from colcon_core.event.job import JobStarted
 from colcon_core.event.output import StderrLine
 from colcon_core.event_reactor import create_event_reactor
+from colcon_core.executor.timeout import add_timeout_arguments
+from colcon_core.executor.timeout import has_timeout_arguments
 from colcon_core.logging import colcon_logger
 from colcon_core.plugin_system import get_first_line_doc
 from colcon_core.plugin_system import instantiate_extensions
@@ -42,6 +45,7 @@ class Job:
         :param task_context: The task context
         """
         self._event_queue = None
+        self._journal = None
         self.identifier = identifier
         self.dependencies = dependencies
         self.task = task
@@ -63,6 +67,15 @@ class Job:
         self.put_event_into_queue(JobQueued(
             self.identifier, self.task_context.dependencies))
 
+    def set_journal(self, journal):
+        """
+        Set the journal recording the outcome of the job.
+
+        :param journal: The
+          :py:class:`colcon_core.executor.journal.CheckpointJournal`
+        """
+        self._journal = journal
+
     async def __call__(self, *args, **kwargs):
         """
         Perform the unit of work.
@@ -75,6 +88,8 @@ class Job:
           code
         * In case of an exception within the task put a :class:`StderrLine`
           event into the queue and re-raise the exception
+        * If the task succeeded update the fingerprint of the job in the
+          journal if set
         * Put a :class:`JobEnded` event into the queue
 
         :returns: The return code of the invoked task
@@ -84,6 +99,8 @@ class Job:
 
         # replace function to use this job as the event context
         self.task_context.put_event_into_queue = self.put_event_into_queue
+        self.task_context.wait_for_event_queue_capacity = \
+            self.wait_for_event_queue_capacity
         self.task.set_context(context=self.task_context)
 
         rc = 0
@@ -99,8 +116,14 @@ class Job:
         finally:
             if self.returncode is None:
                 self.returncode = rc or 0
-            self.put_event_into_queue(
-                JobEnded(self.identifier, self.returncode))
+            try:
+                if not self.returncode and self._journal is not None:
+                    # before the event which makes the journal record it
+                    await self._journal.update_fingerprint(self.identifier)
+            finally:
+                # even if being cancelled while updating the fingerprint
+                self.put_event_into_queue(
+                    JobEnded(self.identifier, self.returncode))
         return self.returncode
 
     def put_event_into_queue(self, event):
@@ -111,11 +134,214 @@ class Job:
         """
         self._event_queue.put((event, self))
 
+    async def wait_for_event_queue_capacity(self):
+        """Wait until the event queue can take more events."""
+        wait_for_capacity = getattr(
+            self._event_queue, 'wait_for_capacity', None)
+        if wait_for_capacity is not None:
+            await wait_for_capacity()
+
     def __str__(self):
         """Use the identifier as the string representation of a job."""
         return self.identifier
 
 
+class JobGraph:
+    """
+    The dependency graph of a set of jobs.
+
+    The graph contains the forward and reverse adjacency of the jobs.
+    Dependencies on identifiers which are not part of the jobs as well as
+    dependencies of a job on itself are being ignored.
+
+    For each pending job the number of unfinished upstream jobs is being
+    tracked which allows to maintain the set of ready jobs with an effort
+    proportional to the degree of a finished job.
+    """
+
+    def __init__(self, jobs):
+        """
+        Construct a JobGraph.
+
+        :param jobs: The ordered dictionary of jobs, the keys are being used
+          to identify the jobs within the graph
+        """
+        self.identifiers = list(jobs.keys())
+        self._positions = {
+            identifier: i for i, identifier in enumerate(self.identifiers)}
+        # the dependencies refer to the job identifiers
+        keys = {job.identifier: key for key, job in jobs.items()}
+        self.upstream = {}
+        self.downstream = {
+            identifier: set() for identifier in self.identifiers}
+        for identifier, job in jobs.items():
+            upstream = {
+                keys[d] for d in job.dependencies if d in keys} - {identifier}
+            self.upstream[identifier] = upstream
+            for dependency in upstream:
+                self.downstream[dependency].add(identifier)
+        self._in_degrees = {
+            identifier: len(upstream)
+            for identifier, upstream in self.upstream.items()}
+
+    def copy(self):
+        """
+        Get a copy of the graph with separate in-degree counters.
+
+        The adjacency is shared with the copy and must not be modified.
+
+        :rtype: JobGraph
+        """
+        graph = JobGraph.__new__(JobGraph)
+        graph.identifiers = self.identifiers
+        graph._positions = self._positions
+        graph.upstream = self.upstream
+        graph.downstream = self.downstream
+        graph._in_degrees = dict(self._in_degrees)
+        return graph
+
+    def is_pending(self, identifier):
+        """
+        Check if a job has neither finished nor been removed.
+
+        :param str identifier: The job identifier
+        :rtype: bool
+        """
+        return identifier in self._in_degrees
+
+    def get_pending_jobs(self):
+        """
+        Get the pending jobs.
+
+        :returns: The identifiers in the order of the jobs
+        :rtype: list
+        """
+        return [i for i in self.identifiers if i in self._in_degrees]
+
+    def get_ready_jobs(self):
+        """
+        Get the pending jobs which don't wait for any other job.
+
+        :returns: The identifiers in the order of the jobs
+        :rtype: list
+        """
+        return [
+            i for i in self.identifiers if self._in_degrees.get(i) == 0]
+
+    def finish(self, identifier):
+        """
+        Mark a pending job as finished.
+
+        :param str identifier: The job identifier
+        :returns: The identifiers of the pending jobs which became ready
+        :rtype: list
+        """
+        del self._in_degrees[identifier]
+        ready = []
+        for dependent in self.downstream[identifier]:
+            if dependent not in self._in_degrees:
+                continue
+            self._in_degrees[dependent] -= 1
+            if not self._in_degrees[dependent]:
+                ready.append(dependent)
+        return ready
+
+    def remove(self, identifier):
+        """
+        Remove a pending job without unblocking its downstream jobs.
+
+        :param str identifier: The job identifier
+        """
+        del self._in_degrees[identifier]
+
+    def clear(self):
+        """Remove all pending jobs."""
+        self._in_degrees.clear()
+
+    def get_recursive_downstream(self, identifier):
+        """
+        Get all jobs (recursively) depending on a job.
+
+        :param str identifier: The job identifier
+        :returns: The set of identifiers
+        :rtype: set
+        """
+        recursive = set()
+        queue = [identifier]
+        while queue:
+            for dependent in self.downstream[queue.pop()]:
+                if dependent not in recursive:
+                    recursive.add(dependent)
+                    queue.append(dependent)
+        return recursive
+
+    def skip_downstream(self, identifier):
+        """
+        Remove all pending jobs (recursively) depending on a job.
+
+        :param str identifier: The job identifier
+        :returns: The set of identifiers of the removed jobs
+        :rtype: set
+        """
+        skipped = set()
+        queue = [identifier]
+        while queue:
+            for dependent in self.downstream[queue.pop()]:
+                if dependent in self._in_degrees:
+                    del self._in_degrees[dependent]
+                    skipped.add(dependent)
+                    queue.append(dependent)
+        return skipped
+
+    def get_topological_order(self):
+        """
+        Get the jobs ordered topologically.
+
+        Jobs becoming ready at the same time are ordered by the order of the
+        jobs.
+
+        :returns: The identifiers, jobs which are part of a cycle are missing
+        :rtype: list
+        """
+        in_degrees = {
+            identifier: len(upstream)
+            for identifier, upstream in self.upstream.items()}
+        order = [i for i in self.identifiers if not in_degrees[i]]
+        for identifier in order:
+            for dependent in sorted(
+                self.downstream[identifier], key=self._positions.get
+            ):
+                in_degrees[dependent] -= 1
+                if not in_degrees[dependent]:
+                    order.append(dependent)
+        return order
+
+    def find_cycle(self):
+        """
+        Find a cycle in the dependencies of the jobs.
+
+        :returns: The identifiers of the jobs forming a cycle with the first
+          identifier being repeated at the end, or None if there is no cycle
+        :rtype: list
+        """
+        order = self.get_topological_order()
+        if len(order) == len(self.identifiers):
+            return None
+        # every remaining job has at least one remaining upstream job
+        remaining = set(self.identifiers) - set(order)
+        path = [next(i for i in self.identifiers if i in remaining)]
+        positions = {path[0]: 0}
+        while True:
+            identifier = min(
+                self.upstream[path[-1]] & remaining,
+                key=self._positions.get)
+            if identifier in positions:
+                cycle = path[positions[identifier]:] + [identifier]
+                return list(reversed(cycle))
+            positions[identifier] = len(path)
+            path.append(identifier)
+
+
 class OnError(Enum):
     """Decision how to proceed when one job fails."""
 
@@ -141,14 +367,18 @@ class ExecutorExtensionPoint:
     """
 
     """The version of the executor extension interface."""
-    EXTENSION_POINT_VERSION = '1.1'
+    EXTENSION_POINT_VERSION = '1.2'
 
     """The default priority of executor extensions."""
     PRIORITY = 100
 
+    """The flag if the executor enforces the timeout arguments."""
+    SUPPORTS_TIMEOUTS = False
+
     def __init__(self):  # noqa: D107
         super().__init__()
         self._event_controller = None
+        self._job_graph = None
 
     def add_arguments(self, *, parser):
         """
@@ -169,6 +399,14 @@ class ExecutorExtensionPoint:
         """
         self._event_controller = event_controller
 
+    def set_job_graph(self, job_graph):
+        """
+        Set the graph of the jobs which will be passed to `execute()`.
+
+        :param JobGraph job_graph: The job graph
+        """
+        self._job_graph = job_graph
+
     def execute(
         self, args, jobs, *, on_error: OnError = None, abort_on_error=None
     ):
@@ -205,6 +443,15 @@ class ExecutorExtensionPoint:
             return
         self._event_controller.flush()
 
+    def _get_job_graph(self, jobs):
+        # use a copy of the graph passed by the caller if it matches the jobs
+        if (
+            self._job_graph is not None and
+            self._job_graph.identifiers == list(jobs.keys())
+        ):
+            return self._job_graph.copy()
+        return JobGraph(jobs)
+
 
 def get_executor_extensions(*, group_name=None):
     """
@@ -256,6 +503,8 @@ def add_executor_arguments(parser):
         '--executor', type=str, choices=keys, default=default,
         help=f'The executor to process all packages (default: {default})'
              f'{descriptions}')  # noqa: E131
+    # the timeouts are only being enforced by executors which declare it
+    add_timeout_arguments(group)
 
     for priority in extensions.keys():
         extensions_same_prio = extensions[priority]
@@ -274,7 +523,7 @@ def add_executor_arguments(parser):
 
 def execute_jobs(
     context, jobs, *, on_error: OnError = None, abort_on_error=None,
-    pre_execution_callback=None
+    pre_execution_callback=None, journal=None, resume=False
 ):
     """
     Execute jobs.
@@ -282,11 +531,16 @@ def execute_jobs(
     The overview of the process:
       * One executor extension is being chosen based on the command line
         arguments.
+      * If resuming skip the jobs which have succeeded before according to
+        the journal.
+      * Build the dependency graph of the jobs and pass it to the executor
+        extension.
       * Create an event controller.
       * Pass the event controller to the executor extension.
       * Pass the event queue to all jobs.
       * Start the event controller.
-      * Invoke the executor extension to execute the jobs.
+      * Invoke the executor extension to execute the jobs unless their
+        dependencies are circular.
       * Join the event controller.
 
     :param jobs: The ordered dictionary of jobs
@@ -296,6 +550,11 @@ def execute_jobs(
     :param pre_execution_callback: An optional callable taking a keyword
       argument `event_queue` which will be invoked before the executors
       `execute()` method
+    :param journal: An optional
+      :py:class:`colcon_core.executor.journal.CheckpointJournal` recording
+      the outcome of the jobs
+    :param bool resume: The flag if jobs which have succeeded before with
+      unchanged inputs according to the journal should be skipped
     :returns: The return code
     """
     assert on_error is None or abort_on_error is None, \
@@ -313,10 +572,41 @@ def execute_jobs(
     assert executor
 
     logger.info("Executing jobs using '%s' executor", executor.EXECUTOR_NAME)
+    if (
+        has_timeout_arguments(context.args) and
+        not getattr(executor, 'SUPPORTS_TIMEOUTS', False)
+    ):
+        logger.warning(
+            f"The '{executor.EXECUTOR_NAME}' executor doesn't support "
+            'timeouts, the passed timeout arguments are being ignored')
+
+    executed_jobs = jobs
+    if journal is not None:
+        journal.set_jobs(jobs)
+        journal.compact()
+        if resume:
+            resumed = journal.get_resumable_jobs()
+            if resumed:
+                logger.info(
+                    f'Skipping {len(resumed)} jobs which have succeeded in a '
+                    'previous invocation with unchanged inputs')
+                executed_jobs = OrderedDict(
+                    (key, job) for key, job in jobs.items()
+                    if job.identifier not in resumed)
+    elif resume:
+        logger.warning('Unable to resume without a journal')
+
+    # build the dependency graph once to be shared with the executor
+    job_graph = JobGraph(executed_jobs)
+    executor.set_job_graph(job_graph)
 
     # create event reactor with handlers specified by the args
     with create_event_reactor(context) as event_controller:
         executor.set_event_controller(event_controller)
+        if journal is not None:
+            event_controller.register_observer(journal)
+            for job in executed_jobs.values():
+                job.set_journal(journal)
 
         # allow the caller to post additional events
         if pre_execution_callback is not None:
@@ -340,7 +630,14 @@ def execute_jobs(
             kwargs['abort_on_error'] = on_error == OnError.interrupt
 
         try:
-            rc = func(context.args, jobs, **kwargs)
+            cycle = job_graph.find_cycle()
+            if cycle is not None:
+                logger.error(
+                    'Unable to execute jobs with circular dependencies: ' +
+                    ' -> '.join(cycle))
+                rc = 1
+            else:
+                rc = func(context.args, executed_jobs, **kwargs)
         except Exception as e:  # noqa: F841
             # catch exceptions raised in executor extension
             exc = traceback.format_exc()
@@ -349,7 +646,8 @@ def execute_jobs(
                 f'{e}\n{exc}')
             rc = 1
         finally:
-            # generate an event for every skipped job
+            # generate an event for every skipped job including the ones
+            # which have been resumed
             for job in jobs.values():
                 if job.returncode is not None:
                     continue
@@ -0,0 +1,199 @@
+# Copyright 2016-2018 Dirk Thomas
+# Licensed under the Apache License, Version 2.0
+
+"""Decide if the system has enough resources to start another job."""
+
+import os
+import re
+
+from colcon_core.logging import colcon_logger
+
+logger = colcon_logger.getChild(__name__)
+
+"""The package metadata key declaring the expected memory usage of a job"""
+EXPECTED_MEMORY_METADATA_KEY = 'expected_memory'
+
+_SIZE_UNITS = {
+    '': 1,
+    'K': 1024,
+    'M': 1024 ** 2,
+    'G': 1024 ** 3,
+    'T': 1024 ** 4,
+}
+
+
+def parse_memory_size(value):
+    """
+    Parse a memory size.
+
+    :param value: Either a number of bytes or a string with an optional unit
+      suffix `K`, `M`, `G` or `T` (optionally followed by `B` or `iB`), e.g.
+      `512M` or `1.5GiB`
+    :returns: The number of bytes
+    :rtype: int
+    :raises ValueError: if the value can't be parsed
+    """
+    if isinstance(value, (int, float)):
+        size = value
+    else:
+        match = re.fullmatch(
+            r'\s*(\d+(?:\.\d*)?)\s*([' + ''.join(_SIZE_UNITS.keys()) +
+            r']?)(?:i?B)?\s*', str(value),
+            flags=re.IGNORECASE)
+        if not match:
+            raise ValueError(f"Invalid memory size '{value}'")
+        size = float(match.group(1)) * _SIZE_UNITS[match.group(2).upper()]
+    if size < 0:
+        raise ValueError(f"Invalid memory size '{value}'")
+    return int(size)
+
+
+def get_load_average():
+    """
+    Get the 1-minute load average of the system.
+
+    :returns: The load average or None if it is not available
+    :rtype: float
+    """
+    try:
+        with open('/proc/loadavg', 'r') as h:
+            return float(h.read().split()[0])
+    except (OSError, IndexError, ValueError):
+        pass
+    try:
+        return os.getloadavg()[0]
+    except (AttributeError, OSError):
+        return None
+
+
+def get_available_memory():
+    """
+    Get the memory available for starting new applications.
+
+    :returns: The number of bytes or None if it is not available
+    :rtype: int
+    """
+    try:
+        with open('/proc/meminfo', 'r') as h:
+            for line in h:
+                if line.startswith('MemAvailable:'):
+                    # the value is always in kB
+                    return int(line.split()[1]) * 1024
+    except (OSError, IndexError, ValueError):
+        pass
+    return None
+
+
+def get_expected_memory(job):
+    """
+    Get the expected memory usage of a job from the package metadata.
+
+    :param job: The job
+    :returns: The number of bytes or None if not declared
+    :rtype: int
+    """
+    pkg = getattr(job.task_context, 'pkg', None)
+    metadata = getattr(pkg, 'metadata', None) or {}
+    value = metadata.get(EXPECTED_MEMORY_METADATA_KEY)
+    if value is None:
+        return None
+    try:
+        return parse_memory_size(value)
+    except ValueError as e:
+        logger.warning(
+            f"Ignoring metadata '{EXPECTED_MEMORY_METADATA_KEY}' of job "
+            f"'{job.identifier}': {e}")
+        return None
+
+
+def add_admission_arguments(parser):
+    """
+    Add the command line arguments for the admission control.
+
+    :param parser: The argument parser
+    """
+    parser.add_argument(
+        '--max-load-average',
+        type=float,
+        metavar='LOAD',
+        help='Only start another job while the 1-minute load average of the '
+             'system is below this threshold')
+    parser.add_argument(
+        '--min-available-memory',
+        type=parse_memory_size,
+        metavar='SIZE',
+        help='Only start another job while the available memory of the '
+             'system stays above this threshold, taking the '
+             f"'{EXPECTED_MEMORY_METADATA_KEY}' declared in the metadata of "
+             'the running and the next package into account (e.g. 2G)')
+
+
+class AdmissionControl:
+    """
+    Admit new jobs based on the load and the available memory of the system.
+
+    A job declaring its expected memory usage is only admitted if the
+    available memory minus the expected memory usage of all running jobs
+    which declared it and of the job itself stays above the threshold.
+    Since the memory of recently started jobs is usually not allocated yet
+    the expected memory usage of running jobs is considered conservatively.
+    """
+
+    def __init__(self, *, max_load_average=None, min_available_memory=None):
+        """
+        Construct an AdmissionControl.
+
+        :param float max_load_average: The maximum 1-minute load average
+        :param int min_available_memory: The minimum available memory in
+          bytes
+        """
+        self.max_load_average = max_load_average
+        self.min_available_memory = min_available_memory
+        self._running = {}
+
+    def admit(self, job):
+        """
+        Check if the job can be started now.
+
+        :param job: The job
+        :rtype: bool
+        """
+        if self.max_load_average is not None:
+            load = get_load_average()
+            if load is not None and load >= self.max_load_average:
+                logger.debug(
+                    f"Delaying job '{job.identifier}' since the load average "
+                    f'{load} exceeds {self.max_load_average}')
+                return False
+
+        if self.min_available_memory is not None:
+            available = get_available_memory()
+            if available is not None:
+                expected = sum(
+                    memory for memory in self._running.values()
+                    if memory is not None)
+                expected += get_expected_memory(job) or 0
+                if available - expected < self.min_available_memory:
+                    logger.debug(
+                        f"Delaying job '{job.identifier}' since the available "
+                        f'memory {available} minus the expected memory '
+                        f'{expected} is below {self.min_available_memory}')
+                    return False
+
+        return True
+
+    def job_started(self, job):
+        """
+        Account for a started job.
+
+        :param job: The job
+        """
+        self._running[job.identifier] = get_expected_memory(job)
+
+    def job_finished(self, job):
+        """
+        Stop accounting for a finished job.
+
+        :param job: The job
+        """
+        self._running.pop(job.identifier, None)
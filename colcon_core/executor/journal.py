@@ -0,0 +1,299 @@
+# Copyright 2016-2018 Dirk Thomas
+# Licensed under the Apache License, Version 2.0
+
+"""
+Record the outcome of jobs to resume an interrupted invocation.
+
+The journal is a file with one JSON object per line which is only ever being
+appended to while jobs are being executed.
+Each job which has started, succeeded or failed is being recorded together
+with a fingerprint of its inputs.
+"""
+
+import asyncio
+from asyncio import CancelledError
+import hashlib
+import json
+import os
+from pathlib import Path
+
+from colcon_core.event.job import JobEnded
+from colcon_core.event.job import JobStarted
+from colcon_core.executor import JobGraph
+from colcon_core.logging import colcon_logger
+from colcon_core.package_identification.ignore import IGNORE_MARKER
+
+logger = colcon_logger.getChild(__name__)
+
+"""The filename of the journal within the build base"""
+JOURNAL_FILENAME = 'colcon_journal.jsonl'
+
+"""The status of a job which has started but not ended yet"""
+STARTED = 'started'
+"""The status of a job which has ended successfully"""
+SUCCEEDED = 'succeeded'
+"""The status of a job which has ended with a non-zero return code"""
+FAILED = 'failed'
+
+
+def get_package_fingerprint(path):
+    """
+    Get a fingerprint of the files in a package.
+
+    The fingerprint considers the relative path, size and modification time
+    of each file.
+    Hidden files and directories as well as directories containing an
+    ignore marker (e.g. a nested build base) are being skipped.
+
+    :param path: The path of the package
+    :returns: The hex digest
+    :rtype: str
+    """
+    digest = hashlib.sha256()
+    path = str(path)
+    for dirpath, dirnames, filenames in os.walk(path):
+        dirnames[:] = sorted(
+            d for d in dirnames if not d.startswith('.') and
+            not os.path.exists(os.path.join(dirpath, d, IGNORE_MARKER)))
+        for filename in sorted(filenames):
+            if filename.startswith('.'):
+                continue
+            file_path = os.path.join(dirpath, filename)
+            try:
+                stat = os.stat(file_path)
+            except OSError:
+                # e.g. a broken symlink
+                continue
+            rel_path = os.path.relpath(file_path, path)
+            digest.update(
+                f'{rel_path}\0{stat.st_size}\0{stat.st_mtime_ns}\n'.encode())
+    return digest.hexdigest()
+
+
+class CheckpointJournal:
+    """
+    Append the outcome of jobs to a journal and determine resumable jobs.
+
+    The fingerprint of a job covers the task, the package sources, the
+    package arguments and the fingerprints of its upstream jobs.
+    Therefore a job is only considered unchanged if none of the jobs it
+    depends on has been processed again since.
+
+    An instance is intended to be registered as an observer of the event
+    reactor.
+    Since determining the fingerprint requires scanning the package files it
+    is being updated by the job after it has succeeded (see
+    :py:meth:`update_fingerprint`) rather than when handling the event.
+    """
+
+    EVENT_TYPES = (JobStarted, JobEnded)
+
+    def __init__(self, path, *, verb_name=None):
+        """
+        Construct a CheckpointJournal.
+
+        :param path: The path of the journal file
+        :param str verb_name: The verb name, records of other verbs are being
+          ignored
+        """
+        self.path = Path(str(path))
+        self.verb_name = verb_name
+        self._jobs = {}
+        self._tasks = {}
+        self._job_graph = None
+        self._keys = {}
+        self._identifiers = {}
+        self._fingerprints = {}
+
+    def set_jobs(self, jobs):
+        """
+        Set all jobs including the ones which might be resumed.
+
+        The tasks of the jobs are being remembered since executors might
+        replace them while the jobs are being executed, e.g. to perform them
+        in a different process.
+
+        :param jobs: The ordered dictionary of jobs
+        """
+        self._jobs = {job.identifier: job for job in jobs.values()}
+        self._tasks = {job.identifier: job.task for job in jobs.values()}
+        self._job_graph = JobGraph(jobs)
+        self._keys = {job.identifier: key for key, job in jobs.items()}
+        self._identifiers = {
+            key: job.identifier for key, job in jobs.items()}
+        self._fingerprints = {}
+
+    def get_fingerprint(self, identifier):
+        """
+        Get the fingerprint of the inputs of a job.
+
+        :param str identifier: The job identifier
+        :returns: The hex digest
+        :rtype: str
+        """
+        if identifier not in self._fingerprints:
+            self._fingerprints[identifier] = self._compute_fingerprint(
+                identifier)
+        return self._fingerprints[identifier]
+
+    async def update_fingerprint(self, identifier):
+        """
+        Update the fingerprint of a job which has succeeded.
+
+        The job might have changed its inputs, e.g. generated files.
+        The fingerprint is being determined in a separate thread to not block
+        the event loop.
+
+        :param str identifier: The job identifier
+        """
+        if identifier not in self._jobs:
+            return
+        self._fingerprints.pop(identifier, None)
+        loop = asyncio.get_event_loop()
+        try:
+            await loop.run_in_executor(
+                None, self.get_fingerprint, identifier)
+        except CancelledError:
+            # the job is recorded without a fingerprint and isn't resumable
+            raise
+        except Exception as e:  # noqa: B902
+            logger.warning(
+                'Failed to determine the fingerprint of job '
+                f"'{identifier}': {e}")
+
+    def _compute_fingerprint(self, identifier):
+        job = self._jobs[identifier]
+        context = job.task_context
+        pkg = context.pkg
+        digest = hashlib.sha256()
+        task = self._tasks[identifier]
+        task_class = type(task)
+        values = [
+            identifier,
+            f'{task_class.__module__}.{task_class.__qualname__}',
+            getattr(task, 'TASK_NAME', None),
+            pkg.type, pkg.name, str(pkg.path),
+            get_package_fingerprint(pkg.path),
+            sorted(
+                (k, repr(v))
+                for k, v in getattr(context.args, '__dict__', {}).items()),
+            [(k, str(v)) for k, v in context.dependencies.items()],
+        ]
+        upstream = self._job_graph.upstream[self._keys[identifier]]
+        for key in sorted(upstream):
+            values.append(self.get_fingerprint(self._identifiers[key]))
+        digest.update(repr(values).encode())
+        return digest.hexdigest()
+
+    def load(self):
+        """
+        Read the most recent record of each job.
+
+        Malformed lines, e.g. from an invocation which has been killed while
+        writing, are being ignored.
+
+        :returns: The mapping of job identifiers to their latest record
+        :rtype: dict
+        """
+        return {
+            identifier: record
+            for (verb_name, identifier), record in self._read().items()
+            if verb_name == self.verb_name}
+
+    def compact(self):
+        """
+        Rewrite the journal keeping only the most recent record of each job.
+
+        Records of all verbs are being preserved.
+        """
+        records = self._read()
+        if not records:
+            return
+        tmp_path = self.path.with_name(self.path.name + '.tmp')
+        with tmp_path.open('w') as h:
+            for record in records.values():
+                h.write(json.dumps(record, sort_keys=True) + '\n')
+        os.replace(str(tmp_path), str(self.path))
+
+    def _read(self):
+        records = {}
+        try:
+            with self.path.open('r') as h:
+                for line in h:
+                    try:
+                        record = json.loads(line)
+                        key = (record.get('verb_name'), record['identifier'])
+                    except (ValueError, KeyError, TypeError, AttributeError):
+                        continue
+                    # move the record to the end
+                    records.pop(key, None)
+                    records[key] = record
+        except FileNotFoundError:
+            pass
+        return records
+
+    def get_resumable_jobs(self):
+        """
+        Get the jobs which have succeeded before and are unchanged since.
+
+        A job is only resumable if all of its upstream jobs are resumable
+        too.
+
+        :returns: The identifiers of the resumable jobs
+        :rtype: set
+        """
+        records = self.load()
+        resumable = set()
+        for key in self._job_graph.get_topological_order():
+            identifier = self._identifiers[key]
+            record = records.get(identifier)
+            if record is None or record.get('status') != SUCCEEDED:
+                continue
+            upstream = self._job_graph.upstream[key]
+            if any(self._identifiers[u] not in resumable for u in upstream):
+                continue
+            if record.get('fingerprint') != self.get_fingerprint(identifier):
+                continue
+            resumable.add(identifier)
+        return resumable
+
+    def add_record(self, identifier, status, *, fingerprint=None):
+        """
+        Append a record to the journal.
+
+        :param str identifier: The job identifier
+        :param str status: The status of the job
+        :param str fingerprint: The fingerprint of the inputs of the job
+        """
+        record = {
+            'identifier': identifier,
+            'verb_name': self.verb_name,
+            'status': status,
+        }
+        if fingerprint is not None:
+            record['fingerprint'] = fingerprint
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self.path.open('a') as h:
+            h.write(json.dumps(record, sort_keys=True) + '\n')
+
+    def __call__(self, event):
+        """
+        Record started and ended jobs.
+
+        :param tuple event: The event and the job
+        """
+        data = event[0]
+        if isinstance(data, JobStarted):
+            if data.identifier in self._jobs:
+                self.add_record(data.identifier, STARTED)
+
+        elif isinstance(data, JobEnded):
+            if data.identifier not in self._jobs:
+                return
+            if data.rc:
+                self.add_record(data.identifier, FAILED)
+                return
+            # the fingerprint has been updated by the job if possible
+            self.add_record(
+                data.identifier, SUCCEEDED,
+                fingerprint=self._fingerprints.get(data.identifier))
@@ -0,0 +1,294 @@
+# Copyright 2016-2018 Dirk Thomas
+# Licensed under the Apache License, Version 2.0
+
+import asyncio
+from asyncio import CancelledError
+import hmac
+import os
+import secrets
+import shutil
+import socket
+import sys
+import tempfile
+
+from colcon_core.event.output import StderrLine
+from colcon_core.executor import ExecutorExtensionPoint
+from colcon_core.executor.parallel import add_parallel_arguments
+from colcon_core.executor.parallel import ParallelExecutor
+from colcon_core.executor.worker import CANCEL
+from colcon_core.executor.worker import encode_message
+from colcon_core.executor.worker import EVENT
+from colcon_core.executor.worker import EXCEPTION
+from colcon_core.executor.worker import EXECUTE
+from colcon_core.executor.worker import read_frame
+from colcon_core.executor.worker import read_message
+from colcon_core.executor.worker import RESULT
+from colcon_core.executor.worker import serialize_task_context
+from colcon_core.executor.worker import WORKER_TOKEN_ENVIRONMENT_VARIABLE
+from colcon_core.logging import colcon_logger
+from colcon_core.plugin_system import satisfies_version
+from colcon_core.subprocess import is_resource_usage_reporting_enabled
+
+logger = colcon_logger.getChild(__name__)
+
+
+class MultiProcessExecutor(ParallelExecutor):
+    """
+    Process multiple packages in parallel using separate worker processes.
+
+    The jobs are being scheduled like in the parallel executor but the tasks
+    are being performed by worker processes connected to a coordinator via a
+    local socket.
+    The events posted by the tasks are being forwarded to the event queue of
+    the invoking process.
+    """
+
+    # the priority needs to be lower than the extension providing the
+    # sequential execution in order to not become the default
+    PRIORITY = 90
+
+    def __init__(self):  # noqa: D107
+        super().__init__()
+        satisfies_version(
+            ExecutorExtensionPoint.EXTENSION_POINT_VERSION, '^1.0')
+
+    def add_arguments(self, *, parser):  # noqa: D102
+        # only the shared arguments since the jobserver isn't supported
+        add_parallel_arguments(parser)
+
+    def _create_jobserver(self, args):
+        if getattr(args, 'jobserver', False):
+            logger.warning(
+                'The jobserver is not supported by the multi-process '
+                'executor')
+        return None
+
+    async def _execute(self, args, jobs, *, on_error, jobserver=None):
+        if not jobs:
+            # e.g. all jobs have been skipped, no workers are needed
+            return await super()._execute(
+                args, jobs, on_error=on_error, jobserver=jobserver)
+
+        worker_count = getattr(args, 'parallel_workers', None) or \
+            os.cpu_count() or 4
+        worker_count = min(worker_count, len(jobs))
+
+        coordinator = Coordinator()
+        await coordinator.start(worker_count)
+        # delegate the tasks of all jobs to the worker processes
+        tasks = {}
+        try:
+            for name, job in jobs.items():
+                tasks[name] = job.task
+                job.task = RemoteTask(coordinator, job.task)
+            return await super()._execute(
+                args, jobs, on_error=on_error, jobserver=jobserver)
+        finally:
+            for name, task in tasks.items():
+                jobs[name].task = task
+            await coordinator.stop()
+
+
+class RemoteTask:
+    """Perform a task extension in a worker process of a coordinator."""
+
+    def __init__(self, coordinator, task):
+        """
+        Construct a RemoteTask.
+
+        :param coordinator: The :py:class:`Coordinator`
+        :param task: The task extension
+        """
+        self.coordinator = coordinator
+        self.task = task
+        self.context = None
+
+    def set_context(self, *, context):
+        """
+        Set the context before the task is being `__call__`-ed.
+
+        :param context: The task context
+        """
+        self.task.set_context(context=context)
+        self.context = context
+
+    async def __call__(self, *args, **kwargs):
+        """
+        Perform the task in a worker process.
+
+        :returns: The return code
+        """
+        assert not args and not kwargs, \
+            'Arguments can not be passed to a remote task'
+        return await self.coordinator.run_task(self.task, self.context)
+
+
+class _Worker:
+
+    __slots__ = ('reader', 'writer')
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+
+
+class Coordinator:
+    """
+    Distribute tasks to worker processes connected via a socket.
+
+    The coordinator listens on a Unix domain socket within a private
+    directory if supported by the platform, otherwise on a TCP socket bound to
+    the loopback interface.
+    Connecting workers need to authenticate themselves with a random token
+    before any message from them is being unpickled.
+    """
+
+    """The time in seconds to wait for workers to exit after disconnecting"""
+    STOP_TIMEOUT = 5.0
+
+    def __init__(self):  # noqa: D107
+        self.address = None
+        self._token = None
+        self._directory = None
+        self._server = None
+        self._processes = []
+        self._watchers = []
+        self._workers = []
+        self._idle = None
+        self._alive = 0
+        self._stopping = False
+
+    async def start(self, worker_count):
+        """
+        Listen on a socket and spawn the worker processes.
+
+        :param int worker_count: The number of worker processes
+        """
+        self._token = secrets.token_hex(16)
+        self._idle = asyncio.Queue()
+        if hasattr(socket, 'AF_UNIX'):
+            self._directory = tempfile.mkdtemp(prefix='colcon_coordinator_')
+            path = os.path.join(self._directory, 'socket')
+            self._server = await asyncio.start_unix_server(
+                self._accept, path=path)
+            self.address = f'unix:{path}'
+        else:
+            self._server = await asyncio.start_server(
+                self._accept, host='127.0.0.1', port=0)
+            port = self._server.sockets[0].getsockname()[1]
+            self.address = f'tcp:127.0.0.1:{port}'
+        logger.debug(
+            f'Starting {worker_count} worker processes connecting to '
+            f"'{self.address}'")
+
+        env = dict(os.environ)
+        env[WORKER_TOKEN_ENVIRONMENT_VARIABLE] = self._token
+        worker_args = [self.address]
+        if is_resource_usage_reporting_enabled():
+            worker_args.append('--report-resource-usage')
+        for _ in range(worker_count):
+            process = await asyncio.create_subprocess_exec(
+                sys.executable, '-m', 'colcon_core.executor.worker',
+                *worker_args, env=env)
+            self._processes.append(process)
+            self._alive += 1
+            self._watchers.append(
+                asyncio.ensure_future(self._watch(process)))
+
+    async def stop(self):
+        """Disconnect all workers and wait for their processes to exit."""
+        self._stopping = True
+        self._server.close()
+        for worker in self._workers:
+            worker.writer.close()
+        await self._server.wait_closed()
+        if self._watchers:
+            _, pending = await asyncio.wait(
+                self._watchers, timeout=self.STOP_TIMEOUT)
+            for process in self._processes:
+                if process.returncode is None:
+                    logger.warning(
+                        f'Killing worker process {process.pid} which '
+                        "didn't exit after being disconnected")
+                    process.kill()
+            if pending:
+                await asyncio.wait(pending)
+        if self._directory is not None:
+            shutil.rmtree(self._directory, ignore_errors=True)
+
+    async def run_task(self, task, context):
+        """
+        Perform a task in the next idle worker process.
+
+        The events posted by the task are being put into the event queue of
+        the context.
+
+        :param task: The task extension
+        :param context: The task context
+        :returns: The return code
+        :raises RuntimeError: if no worker process is available or the task
+          raised an exception in the worker process
+        """
+        message = encode_message((
+            EXECUTE, type(task), task.TASK_NAME, task.PACKAGE_TYPE,
+            serialize_task_context(context)))
+        worker = await self._acquire()
+        worker.writer.write(message)
+        try:
+            return await self._receive_result(worker, context)
+        except CancelledError:
+            # let the worker cancel the task and wait for it to finish
+            worker.writer.write(encode_message((CANCEL, )))
+            await self._receive_result(worker, context)
+            raise
+
+    async def _acquire(self):
+        while True:
+            worker = await self._idle.get()
+            if worker is None:
+                # wake up the next waiting task too
+                self._idle.put_nowait(None)
+                raise RuntimeError('No worker process is available')
+            if not worker.reader.at_eof():
+                return worker
+
+    async def _receive_result(self, worker, context):
+        while True:
+            message = await read_message(worker.reader)
+            if message is None:
+                context.put_event_into_queue(StderrLine(
+                    b'The worker process has terminated unexpectedly\n'))
+                return 1
+            if message[0] == EVENT:
+                context.put_event_into_queue(message[1])
+                # stop reading from the worker while the queue is at capacity
+                await context.wait_for_event_queue_capacity()
+            elif message[0] == RESULT:
+                self._idle.put_nowait(worker)
+                return message[1]
+            elif message[0] == EXCEPTION:
+                self._idle.put_nowait(worker)
+                raise RuntimeError(
+                    f'Exception in worker process:\n{message[1]}')
+
+    async def _accept(self, reader, writer):
+        token = await read_frame(reader)
+        if token is None or not hmac.compare_digest(
+            token, self._token.encode()
+        ):
+            logger.warning('Rejecting unauthenticated worker connection')
+            writer.close()
+            return
+        worker = _Worker(reader, writer)
+        self._workers.append(worker)
+        self._idle.put_nowait(worker)
+
+    async def _watch(self, process):
+        returncode = await process.wait()
+        self._alive -= 1
+        if self._stopping:
+            return
+        logger.warning(
+            f'Worker process {process.pid} exited with {returncode}')
+        if not self._alive:
+            self._idle.put_nowait(None)
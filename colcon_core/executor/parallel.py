@@ -0,0 +1,321 @@
+# Copyright 2016-2018 Dirk Thomas
+# Licensed under the Apache License, Version 2.0
+
+from argparse import ArgumentError
+import asyncio
+from contextlib import suppress
+import heapq
+import logging
+import os
+import signal
+import sys
+import traceback
+
+from colcon_core.executor import ExecutorExtensionPoint
+from colcon_core.executor import OnError
+from colcon_core.executor.admission import add_admission_arguments
+from colcon_core.executor.admission import AdmissionControl
+from colcon_core.executor.scheduling import add_scheduling_arguments
+from colcon_core.executor.scheduling import CRITICAL_PATH_POLICY
+from colcon_core.executor.scheduling import get_job_ranks
+from colcon_core.executor.timeout import JobTimeouts
+from colcon_core.executor.timeout import TIMEOUT_RETURN_CODE
+from colcon_core.generic_decorator import GenericDecorator
+from colcon_core.history import get_job_durations
+from colcon_core.jobserver import is_jobserver_supported
+from colcon_core.jobserver import JobServer
+from colcon_core.jobserver import set_jobserver
+from colcon_core.logging import colcon_logger
+from colcon_core.logging import get_effective_console_level
+from colcon_core.plugin_system import satisfies_version
+from colcon_core.subprocess import interrupt_supervised_processes
+from colcon_core.subprocess import new_event_loop
+from colcon_core.subprocess import SIGINT_RESULT
+from colcon_core.subprocess import TIMEOUT_RESULT
+
+logger = colcon_logger.getChild(__name__)
+
+
+class ParallelExecutor(ExecutorExtensionPoint):
+    """
+    Process multiple packages in parallel.
+
+    The parallelization is honoring the dependencies between the jobs.
+    """
+
+    # the priority needs to be lower than the extension providing the
+    # sequential execution in order to not become the default
+    PRIORITY = 95
+
+    SUPPORTS_TIMEOUTS = True
+
+    """The interval in seconds to check if a delayed job can be started."""
+    ADMISSION_INTERVAL = 1.0
+
+    def __init__(self):  # noqa: D107
+        super().__init__()
+        satisfies_version(
+            ExecutorExtensionPoint.EXTENSION_POINT_VERSION, '^1.0')
+        self._ongoing_jobs = {}
+        self._interrupted = False
+
+    def add_arguments(self, *, parser):  # noqa: D102
+        add_parallel_arguments(parser)
+        parser.add_argument(
+            '--jobserver',
+            action='store_true',
+            help='Share the number of parallel workers as a global limit of '
+                 'concurrent processes with nested build tools using a GNU '
+                 'make compatible jobserver advertised in MAKEFLAGS')
+
+    def execute(self, args, jobs, *, on_error=OnError.interrupt):  # noqa: D102
+        # avoid debug message from asyncio when colcon uses debug log level
+        asyncio_logger = logging.getLogger('asyncio')
+        log_level = get_effective_console_level(colcon_logger)
+        asyncio_logger.setLevel(log_level)
+
+        self._ongoing_jobs = {}
+        self._interrupted = False
+        jobserver = self._create_jobserver(args)
+        set_jobserver(jobserver)
+        loop = new_event_loop()
+        asyncio.set_event_loop(loop)
+        coro = self._execute(
+            args, jobs, on_error=on_error, jobserver=jobserver)
+        future = asyncio.ensure_future(coro, loop=loop)
+        try:
+            logger.debug('run_until_complete')
+            loop.run_until_complete(future)
+        except KeyboardInterrupt:
+            logger.debug('run_until_complete was interrupted')
+            # forward the SIGINT to processes in separate sessions
+            interrupt_supervised_processes()
+            # override job rc with special SIGINT value
+            for job in self._ongoing_jobs.values():
+                job.returncode = SIGINT_RESULT
+            # don't start any pending jobs
+            self._interrupted = True
+            # ignore further SIGINTs
+            signal.signal(signal.SIGINT, signal.SIG_IGN)
+            # wait for jobs which have also received a SIGINT
+            if not future.done():
+                logger.debug('run_until_complete again')
+                loop.run_until_complete(future)
+                assert future.done()
+            elif self._ongoing_jobs:
+                # the interrupt was raised while processing the results
+                pending = [
+                    t for t in _all_tasks(loop) if not t.done()]
+                if pending:
+                    loop.run_until_complete(asyncio.wait(pending))
+            # read potential exception to avoid asyncio error
+            _ = future.exception()  # noqa: F841
+            logger.debug('run_until_complete finished')
+            return signal.SIGINT
+        except Exception as e:  # noqa: F841
+            exc = traceback.format_exc()
+            logger.error(f'Exception in job execution: {e}\n{exc}')
+            return 1
+        finally:
+            for task in _all_tasks(loop):
+                if not task.done():
+                    logger.error(f"Task '{task}' not done")
+            # HACK on Windows closing the event loop seems to hang after Ctrl-C
+            # even though no futures are pending, but appears fixed in py3.8
+            if sys.platform != 'win32' or sys.version_info >= (3, 8):
+                logger.debug('closing loop')
+                loop.close()
+                logger.debug('loop closed')
+            else:
+                logger.debug('skipping loop closure')
+            if jobserver is not None:
+                set_jobserver(None)
+                jobserver.close()
+        result = future.result()
+        logger.debug(f"run_until_complete finished with '{result}'")
+        return result
+
+    def _create_jobserver(self, args):
+        if not getattr(args, 'jobserver', False):
+            return None
+        if not is_jobserver_supported():
+            logger.warning('The jobserver is not supported on this platform')
+            return None
+        tokens = getattr(args, 'parallel_workers', None) or \
+            os.cpu_count() or 4
+        logger.debug(f'Starting jobserver with {tokens} tokens')
+        return JobServer(tokens)
+
+    async def _execute(self, args, jobs, *, on_error, jobserver=None):
+        max_workers = getattr(args, 'parallel_workers', None) or 0
+        policy = getattr(args, 'scheduling_policy', None) or \
+            CRITICAL_PATH_POLICY
+        durations = None
+        if policy == CRITICAL_PATH_POLICY:
+            # the durations of the jobs in previous invocations
+            durations = get_job_durations(
+                jobs.keys(), verb_name=getattr(args, 'verb_name', None))
+        job_graph = self._get_job_graph(jobs)
+        ranks = get_job_ranks(job_graph, policy=policy, durations=durations)
+        admission = AdmissionControl(
+            max_load_average=getattr(args, 'max_load_average', None),
+            min_available_memory=getattr(args, 'min_available_memory', None))
+        timeouts = JobTimeouts.from_args(args)
+
+        # the ready jobs are ordered by their rank
+        ready = [(ranks[name], name) for name in job_graph.get_ready_jobs()]
+        heapq.heapify(ready)
+
+        futures = {}
+        # the jobserver tokens held by the ongoing jobs
+        tokens = {}
+        rc = 0
+        while ready or futures:
+            if self._interrupted:
+                ready.clear()
+                job_graph.clear()
+
+            # start ready jobs in the order of their rank as long as there
+            # are idle workers, passing over jobs which aren't admitted yet
+            delayed = False
+            token_future = None
+            started = set()
+            for _, name in sorted(ready):
+                if max_workers and len(futures) >= max_workers:
+                    break
+                job = jobs[name]
+                # always start a job if none is running to ensure progress
+                if futures and not admission.admit(job):
+                    delayed = True
+                    continue
+                token = None
+                if jobserver is not None:
+                    token = jobserver.try_acquire()
+                    if token is None and futures:
+                        # wait until a token is being returned
+                        token_future = jobserver.wait_for_token()
+                        break
+                started.add(name)
+                logger.debug(f"Starting job '{name}'")
+                admission.job_started(job)
+                tokens[name] = token
+                future = asyncio.ensure_future(timeouts.run_job(job))
+                futures[future] = name
+                self._ongoing_jobs[name] = job
+            if started:
+                ready[:] = [
+                    entry for entry in ready if entry[1] not in started]
+                heapq.heapify(ready)
+
+            if not futures:
+                # all remaining jobs have been skipped
+                break
+
+            # check again later if a ready job has been delayed
+            done_futures, _ = await asyncio.wait(
+                list(futures.keys()) +
+                ([token_future] if token_future is not None else []),
+                return_when=asyncio.FIRST_COMPLETED,
+                timeout=self.ADMISSION_INTERVAL if delayed else None)
+            if token_future is not None:
+                token_future.cancel()
+                done_futures.discard(token_future)
+
+            for done_future in done_futures:
+                name = futures.pop(done_future)
+                admission.job_finished(self._ongoing_jobs.pop(name))
+                token = tokens.pop(name)
+                if token is not None:
+                    jobserver.release(token)
+                result = self._get_result(name, done_future)
+                logger.debug(f"Job '{name}' finished with '{result}'")
+
+                if result:
+                    if not rc:
+                        rc = result
+                        if rc == TIMEOUT_RESULT:
+                            # the return code of the invocation is an integer
+                            rc = TIMEOUT_RETURN_CODE
+                    if on_error in (OnError.interrupt, OnError.skip_pending):
+                        # skip pending jobs
+                        ready.clear()
+                        job_graph.clear()
+                        if on_error == OnError.interrupt:
+                            # cancel ongoing jobs
+                            for future in futures.keys():
+                                future.cancel()
+                    elif on_error == OnError.skip_downstream:
+                        # skip pending jobs (recursively) depending on it
+                        for skipped in job_graph.skip_downstream(name):
+                            logger.debug(
+                                f"Skipping job '{skipped}' since it depends "
+                                f"on the failed job '{name}'")
+
+                if not job_graph.is_pending(name):
+                    # all pending jobs have been skipped
+                    continue
+                # unblock pending jobs which were waiting for the finished one
+                for dependent in job_graph.finish(name):
+                    heapq.heappush(ready, (ranks[dependent], dependent))
+
+        return rc
+
+    def _get_result(self, name, future):
+        # get the result without raising an exception
+        if future.cancelled():
+            return SIGINT_RESULT
+        exception = future.exception()
+        if exception is not None:
+            exc = ''.join(traceback.format_exception(
+                type(exception), exception, exception.__traceback__))
+            logger.error(
+                f"Exception in job execution '{name}': {exception}\n{exc}")
+            return 1
+        return future.result() or 0
+
+
+def add_parallel_arguments(parser):
+    """
+    Add the command line arguments shared by the parallel executors.
+
+    Arguments which have already been added, e.g. by another executor
+    extension using the same argument group, are being skipped.
+
+    :param parser: The argument parser
+    """
+    parser = _SkipExistingArguments(parser)
+    max_workers_default = os.cpu_count() or 4
+    with suppress(AttributeError):
+        # consider restricted set of CPUs if applicable
+        max_workers_default = min(
+            max_workers_default, len(os.sched_getaffinity(0)))
+    parser.add_argument(
+        '--parallel-workers',
+        type=int,
+        default=max_workers_default,
+        metavar='NUMBER',
+        help='The maximum number of packages to process in parallel, '
+             "or '0' for no limit "
+             f'(default: {max_workers_default})')
+    add_scheduling_arguments(parser)
+    add_admission_arguments(parser)
+
+
+class _SkipExistingArguments(GenericDecorator):
+    """Skip adding arguments which conflict with existing ones."""
+
+    def add_argument(self, *args, **kwargs):
+        try:
+            return self._decoree.add_argument(*args, **kwargs)
+        except ArgumentError as e:
+            logger.debug(f'Skipping argument: {e}')
+            return None
+
+
+def _all_tasks(loop):
+    try:
+        # new in Python 3.7
+        all_tasks = asyncio.all_tasks
+    except AttributeError:
+        all_tasks = asyncio.Task.all_tasks
+    return all_tasks(loop)
@@ -0,0 +1,102 @@
+# Copyright 2016-2018 Dirk Thomas
+# Licensed under the Apache License, Version 2.0
+
+"""Policies deciding which of the ready jobs should be started first."""
+
+"""Start ready jobs with the longest remaining downstream path first"""
+CRITICAL_PATH_POLICY = 'critical-path'
+"""Start ready jobs in the topological order of the passed jobs"""
+TOPOLOGICAL_POLICY = 'topological'
+
+SCHEDULING_POLICIES = (CRITICAL_PATH_POLICY, TOPOLOGICAL_POLICY)
+
+
+def add_scheduling_arguments(parser):
+    """
+    Add the command line argument to choose the scheduling policy.
+
+    :param parser: The argument parser
+    """
+    parser.add_argument(
+        '--scheduling-policy',
+        choices=SCHEDULING_POLICIES, default=CRITICAL_PATH_POLICY,
+        help='The order in which ready jobs are being started: '
+             f"'{CRITICAL_PATH_POLICY}' prefers jobs with the longest "
+             'remaining chain of downstream jobs weighted by their duration '
+             f"in previous invocations, '{TOPOLOGICAL_POLICY}' follows the "
+             f'topological order (default: {CRITICAL_PATH_POLICY})')
+
+
+def get_critical_path_lengths(job_graph, *, durations=None):
+    """
+    Get the length of the longest chain of downstream jobs for each job.
+
+    The length of a chain is the sum of the durations of all jobs in the chain
+    including the job itself.
+    Jobs without a known duration are being weighted with the average of the
+    known durations.
+    If no durations are known at all the static estimate of the number of
+    (recursive) downstream jobs is being returned instead.
+
+    :param job_graph: The :py:class:`colcon_core.executor.JobGraph`
+    :param dict durations: The mapping of job identifiers to their expected
+      duration in seconds, e.g. from previous invocations
+    :returns: The mapping of each job identifier to its path length
+    :rtype: dict
+    """
+    downstream = job_graph.downstream
+    # visit each job after all of its downstream jobs
+    order = list(reversed(job_graph.get_topological_order()))
+
+    durations = {
+        identifier: duration
+        for identifier, duration in (durations or {}).items()
+        if identifier in downstream and duration is not None}
+    if not durations:
+        # count the recursive downstream jobs for each job
+        recursive_downstream = {}
+        for identifier in order:
+            recursive = set(downstream[identifier])
+            for d in downstream[identifier]:
+                recursive |= recursive_downstream.get(d, set())
+            recursive_downstream[identifier] = recursive
+        return {
+            identifier: len(recursive)
+            for identifier, recursive in recursive_downstream.items()}
+
+    default_duration = sum(durations.values()) / len(durations)
+    lengths = {}
+    for identifier in order:
+        lengths[identifier] = durations.get(identifier, default_duration) + \
+            max((lengths.get(d, 0.0) for d in downstream[identifier]),
+                default=0.0)
+    return lengths
+
+
+def get_job_ranks(
+    job_graph, *, policy=CRITICAL_PATH_POLICY, durations=None
+):
+    """
+    Get a sort key for each job ranking ready jobs by the scheduling policy.
+
+    Jobs with a smaller rank should be started first.
+    Ties are always broken by the order of the passed jobs.
+
+    :param job_graph: The :py:class:`colcon_core.executor.JobGraph`
+    :param str policy: The scheduling policy
+    :param dict durations: The mapping of job identifiers to their expected
+      duration in seconds
+    :returns: The mapping of each job identifier to a sortable rank
+    :rtype: dict
+    """
+    assert policy in SCHEDULING_POLICIES, \
+        f"Unknown scheduling policy '{policy}'"
+    if policy == TOPOLOGICAL_POLICY:
+        return {
+            identifier: (index, )
+            for index, identifier in enumerate(job_graph.identifiers)}
+
+    lengths = get_critical_path_lengths(job_graph, durations=durations)
+    return {
+        identifier: (-lengths.get(identifier, 0), index)
+        for index, identifier in enumerate(job_graph.identifiers)}
@@ -9,11 +9,15 @@ import traceback
 
 from colcon_core.executor import ExecutorExtensionPoint
 from colcon_core.executor import OnError
+from colcon_core.executor.timeout import JobTimeouts
+from colcon_core.executor.timeout import TIMEOUT_RETURN_CODE
 from colcon_core.logging import colcon_logger
 from colcon_core.logging import get_effective_console_level
 from colcon_core.plugin_system import satisfies_version
+from colcon_core.subprocess import interrupt_supervised_processes
 from colcon_core.subprocess import new_event_loop
 from colcon_core.subprocess import SIGINT_RESULT
+from colcon_core.subprocess import TIMEOUT_RESULT
 
 logger = colcon_logger.getChild(__name__)
 
@@ -25,6 +29,8 @@ class SequentialExecutor(ExecutorExtensionPoint):
     The sequence follows the topological ordering.
     """
 
+    SUPPORTS_TIMEOUTS = True
+
     def __init__(self):  # noqa: D107
         super().__init__()
         satisfies_version(
@@ -39,11 +45,13 @@ class SequentialExecutor(ExecutorExtensionPoint):
         rc = 0
         loop = new_event_loop()
         asyncio.set_event_loop(loop)
+        job_graph = self._get_job_graph(jobs)
+        timeouts = JobTimeouts.from_args(args)
         jobs = jobs.copy()
         try:
             while jobs:
                 name, job = jobs.popitem(last=False)
-                coro = job()
+                coro = timeouts.run_job(job)
                 future = asyncio.ensure_future(coro, loop=loop)
                 try:
                     logger.debug(f"run_until_complete '{name}'")
@@ -51,6 +59,8 @@ class SequentialExecutor(ExecutorExtensionPoint):
                 except KeyboardInterrupt:
                     logger.debug(
                         f"run_until_complete '{name}' was interrupted")
+                    # forward the SIGINT to processes in separate sessions
+                    interrupt_supervised_processes()
                     # override job rc with special SIGINT value
                     job.returncode = SIGINT_RESULT
                     # ignore further SIGINTs
@@ -75,14 +85,18 @@ class SequentialExecutor(ExecutorExtensionPoint):
                 if result:
                     if not rc:
                         rc = result
+                        if rc == TIMEOUT_RESULT:
+                            # the return code of the invocation is an integer
+                            rc = TIMEOUT_RETURN_CODE
                     if on_error in (OnError.interrupt, OnError.skip_pending):
                         # skip pending jobs
                         return rc
                     if on_error == OnError.skip_downstream:
-                        # skip downstream jobs of failed one
-                        for pending_name, pending_job in list(jobs.items()):
-                            if job.identifier in pending_job.dependencies:
-                                del jobs[pending_name]
+                        # skip (recursive) downstream jobs of failed one
+                        for downstream_name in (
+                            job_graph.get_recursive_downstream(name)
+                        ):
+                            jobs.pop(downstream_name, None)
 
         finally:
             try:
@@ -0,0 +1,123 @@
+# Copyright 2016-2018 Dirk Thomas
+# Licensed under the Apache License, Version 2.0
+
+"""
+Predict the schedule of jobs without performing any tasks.
+
+The simulation replays the scheduling of the parallel executor using the
+expected duration of each job.
+"""
+
+from collections import namedtuple
+import heapq
+
+from colcon_core.executor.scheduling import CRITICAL_PATH_POLICY
+from colcon_core.executor.scheduling import get_critical_path_lengths
+from colcon_core.executor.scheduling import get_job_ranks
+
+"""The outcome of simulating the execution of jobs"""
+SimulationResult = namedtuple('SimulationResult', (
+    'policy', 'workers', 'makespan', 'busy_time', 'utilization', 'schedule'))
+
+"""A job in a simulated schedule"""
+ScheduledJob = namedtuple(
+    'ScheduledJob', ('identifier', 'slot', 'start', 'end'))
+
+
+def complete_durations(identifiers, durations, *, default=None):
+    """
+    Get a duration for each job.
+
+    :param identifiers: The job identifiers
+    :param dict durations: The mapping of job identifiers to known durations
+    :param float default: The duration of jobs without a known duration,
+      if None the average of the known durations or 1 second if none is known
+    :returns: The mapping of each job identifier to a duration in seconds
+    :rtype: dict
+    """
+    if default is None:
+        known = [d for d in durations.values() if d is not None]
+        default = sum(known) / len(known) if known else 1.0
+    return {
+        identifier: durations.get(identifier)
+        if durations.get(identifier) is not None else default
+        for identifier in identifiers}
+
+
+def get_critical_path(job_graph, durations):
+    """
+    Get the longest chain of jobs weighted by their duration.
+
+    No schedule can finish faster than the length of the critical path,
+    independent of the number of workers.
+
+    :param job_graph: The :py:class:`colcon_core.executor.JobGraph`
+    :param dict durations: The mapping of each job identifier to its
+      duration in seconds
+    :returns: The length of the critical path and the job identifiers along
+      it in the order of their execution
+    :rtype: tuple
+    """
+    lengths = get_critical_path_lengths(job_graph, durations=durations)
+    if not lengths:
+        return 0.0, []
+    # the ties are being broken by the order of the jobs
+    positions = {i: p for p, i in enumerate(job_graph.identifiers)}
+    identifier = max(job_graph.identifiers, key=lambda i: lengths[i])
+    path = [identifier]
+    while job_graph.downstream[identifier]:
+        identifier = max(
+            sorted(job_graph.downstream[identifier], key=positions.get),
+            key=lambda i: lengths[i])
+        path.append(identifier)
+    return float(lengths[path[0]]), path
+
+
+def simulate(job_graph, durations, *, workers, policy=CRITICAL_PATH_POLICY):
+    """
+    Simulate the execution of jobs by a number of identical workers.
+
+    Each worker processes one job at a time and a ready job is being started
+    as soon as a worker is idle, in the order of the scheduling policy.
+
+    :param job_graph: The :py:class:`colcon_core.executor.JobGraph`, which is
+      not being modified
+    :param dict durations: The mapping of each job identifier to its
+      duration in seconds
+    :param int workers: The number of workers, or 0 for no limit
+    :param str policy: The scheduling policy
+    :rtype: SimulationResult
+    """
+    assert workers >= 0, 'The number of workers must not be negative'
+    job_graph = job_graph.copy()
+    ranks = get_job_ranks(job_graph, policy=policy, durations=durations)
+
+    ready = [(ranks[i], i) for i in job_graph.get_ready_jobs()]
+    heapq.heapify(ready)
+    # the running jobs are ordered by their end time
+    running = []
+    idle_slots = list(range(workers or len(job_graph.identifiers)))
+    schedule = []
+    now = 0.0
+    while ready or running:
+        while ready and idle_slots:
+            _, identifier = heapq.heappop(ready)
+            slot = heapq.heappop(idle_slots)
+            end = now + durations[identifier]
+            heapq.heappush(running, (end, len(schedule), identifier, slot))
+            schedule.append(ScheduledJob(identifier, slot, now, end))
+
+        # finish all jobs ending at the same time before starting new ones
+        now = running[0][0]
+        while running and running[0][0] == now:
+            _, _, identifier, slot = heapq.heappop(running)
+            heapq.heappush(idle_slots, slot)
+            for dependent in job_graph.finish(identifier):
+                heapq.heappush(ready, (ranks[dependent], dependent))
+
+    busy_time = sum(job.end - job.start for job in schedule)
+    used_slots = workers or len({job.slot for job in schedule}) or 1
+    utilization = busy_time / (used_slots * now) if now else 0.0
+    return SimulationResult(
+        policy=policy, workers=workers, makespan=now, busy_time=busy_time,
+        utilization=utilization, schedule=schedule)
@@ -0,0 +1,260 @@
+# Copyright 2016-2018 Dirk Thomas
+# Licensed under the Apache License, Version 2.0
+
+"""Abort jobs which take too long or stop producing output."""
+
+import asyncio
+import time
+
+from colcon_core.event.output import StderrLine
+from colcon_core.logging import colcon_logger
+from colcon_core.subprocess import supervise_processes
+from colcon_core.subprocess import terminate_supervised_processes
+from colcon_core.subprocess import TIMEOUT_RESULT
+
+logger = colcon_logger.getChild(__name__)
+
+"""The package metadata key declaring the timeout of a job in seconds"""
+TIMEOUT_METADATA_KEY = 'timeout'
+"""The package metadata key declaring the inactivity timeout in seconds"""
+INACTIVITY_TIMEOUT_METADATA_KEY = 'inactivity_timeout'
+"""The return code of an invocation aborted by a timeout, like `timeout`"""
+TIMEOUT_RETURN_CODE = 124
+
+
+def parse_timeout(value):
+    """
+    Parse a timeout.
+
+    :param value: The number of seconds
+    :returns: The number of seconds, or None if the value is zero
+    :rtype: float
+    :raises ValueError: if the value can't be parsed
+    """
+    timeout = float(value)
+    if timeout < 0:
+        raise ValueError(f"Invalid timeout '{value}'")
+    return timeout or None
+
+
+def _parse_package_type_timeout(value):
+    package_type, separator, timeout = value.partition('=')
+    if not separator or not package_type:
+        raise ValueError(f"Invalid package type timeout '{value}'")
+    return package_type, parse_timeout(timeout)
+
+
+def add_timeout_arguments(parser):
+    """
+    Add the command line arguments for the timeouts of jobs.
+
+    :param parser: The argument parser
+    """
+    parser.add_argument(
+        '--job-timeout',
+        type=parse_timeout,
+        metavar='SECONDS',
+        help='Abort each job which takes longer than this duration, '
+             f"overridden by the '{TIMEOUT_METADATA_KEY}' declared in the "
+             'metadata of a package')
+    parser.add_argument(
+        '--package-type-timeouts',
+        type=_parse_package_type_timeout,
+        nargs='+',
+        metavar='TYPE=SECONDS',
+        help='Abort jobs of a specific package type which take longer than '
+             'the duration (e.g. cmake=3600), takes precedence '
+             'over --job-timeout')
+    parser.add_argument(
+        '--inactivity-timeout',
+        type=parse_timeout,
+        metavar='SECONDS',
+        help='Abort each job which posts no output or any other event for '
+             'this duration, overridden by the '
+             f"'{INACTIVITY_TIMEOUT_METADATA_KEY}' declared in the metadata "
+             'of a package')
+
+
+def has_timeout_arguments(args):
+    """
+    Check if any of the timeout command line arguments has been passed.
+
+    :param args: The parsed command line arguments
+    :rtype: bool
+    """
+    return any(
+        getattr(args, name, None) for name in (
+            'job_timeout', 'package_type_timeouts', 'inactivity_timeout'))
+
+
+class JobTimeouts:
+    """
+    Enforce the timeouts of jobs.
+
+    The timeout of a job is being taken from the package metadata if
+    declared, otherwise from the timeout of its package type and otherwise
+    from the global timeout.
+    When a job times out its task is being cancelled and the processes it
+    has invoked are being interrupted and eventually killed.
+    The time a job spends waiting for capacity in the event queue doesn't
+    count as inactivity.
+    """
+
+    def __init__(
+        self, *, timeout=None, package_type_timeouts=None,
+        inactivity_timeout=None
+    ):
+        """
+        Construct a JobTimeouts.
+
+        :param float timeout: The timeout of each job in seconds
+        :param dict package_type_timeouts: The mapping of package types to
+          timeouts in seconds
+        :param float inactivity_timeout: The maximum duration in seconds
+          without any event posted by a job
+        """
+        self.timeout = timeout
+        self.package_type_timeouts = package_type_timeouts or {}
+        self.inactivity_timeout = inactivity_timeout
+
+    @classmethod
+    def from_args(cls, args):
+        """
+        Create an instance from the parsed command line arguments.
+
+        :param args: The parsed command line arguments
+        :rtype: JobTimeouts
+        """
+        return cls(
+            timeout=getattr(args, 'job_timeout', None),
+            package_type_timeouts=dict(
+                getattr(args, 'package_type_timeouts', None) or ()),
+            inactivity_timeout=getattr(args, 'inactivity_timeout', None))
+
+    def get_timeout(self, job):
+        """
+        Get the timeout of a job.
+
+        :param job: The job
+        :returns: The number of seconds, or None if the job has no timeout
+        :rtype: float
+        """
+        pkg = getattr(job.task_context, 'pkg', None)
+        timeout = _get_metadata_timeout(job, TIMEOUT_METADATA_KEY)
+        if timeout is not False:
+            return timeout
+        package_type = getattr(pkg, 'type', None)
+        if package_type in self.package_type_timeouts:
+            return self.package_type_timeouts[package_type]
+        return self.timeout
+
+    def get_inactivity_timeout(self, job):
+        """
+        Get the inactivity timeout of a job.
+
+        :param job: The job
+        :returns: The number of seconds, or None if the job has no timeout
+        :rtype: float
+        """
+        timeout = _get_metadata_timeout(job, INACTIVITY_TIMEOUT_METADATA_KEY)
+        if timeout is not False:
+            return timeout
+        return self.inactivity_timeout
+
+    async def run_job(self, job):
+        """
+        Perform a job and abort it if it exceeds its timeouts.
+
+        When the job times out a :class:`StderrLine` event describing the
+        reason is being posted and the :class:`JobEnded` event of the job
+        reports the return code :attribute:`TIMEOUT_RESULT`.
+
+        :param job: The job
+        :returns: The return code of the job
+        """
+        timeout = self.get_timeout(job)
+        inactivity_timeout = self.get_inactivity_timeout(job)
+        if timeout is None and inactivity_timeout is None:
+            return await job()
+
+        start = time.monotonic()
+        last_activity = [start]
+        # the number of ongoing waits for capacity in the event queue
+        waiting = [0]
+        put_event_into_queue = job.put_event_into_queue
+        wait_for_event_queue_capacity = job.wait_for_event_queue_capacity
+
+        def _put_event_into_queue(event):
+            # the events might be posted from a different thread
+            last_activity[0] = time.monotonic()
+            put_event_into_queue(event)
+
+        async def _wait_for_event_queue_capacity():
+            waiting[0] += 1
+            try:
+                await wait_for_event_queue_capacity()
+            finally:
+                waiting[0] -= 1
+                last_activity[0] = time.monotonic()
+
+        job.put_event_into_queue = _put_event_into_queue
+        job.wait_for_event_queue_capacity = _wait_for_event_queue_capacity
+        future = asyncio.ensure_future(job())
+        supervise_processes(future)
+        try:
+            while True:
+                deadlines = []
+                if timeout is not None:
+                    deadlines.append((
+                        start + timeout,
+                        f'it took longer than {timeout:g}s'))
+                if inactivity_timeout is not None:
+                    if waiting[0]:
+                        # the job is blocked by the event queue
+                        last_activity[0] = time.monotonic()
+                    deadlines.append((
+                        last_activity[0] + inactivity_timeout,
+                        f'it produced no output for {inactivity_timeout:g}s'))
+                deadline, reason = min(deadlines)
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                done, _ = await asyncio.wait([future], timeout=remaining)
+                if done:
+                    return future.result()
+
+            logger.warning(f"Aborting job '{job.identifier}' since {reason}")
+            put_event_into_queue(StderrLine(
+                f"Aborting job '{job.identifier}' since {reason}\n"
+                .encode()))
+            job.returncode = TIMEOUT_RESULT
+            future.cancel()
+            await terminate_supervised_processes(future)
+            await asyncio.wait([future])
+            # read potential exception to avoid asyncio error
+            if not future.cancelled():
+                _ = future.exception()  # noqa: F841
+            return TIMEOUT_RESULT
+        except asyncio.CancelledError:
+            future.cancel()
+            await asyncio.wait([future])
+            raise
+        finally:
+            job.put_event_into_queue = put_event_into_queue
+            job.wait_for_event_queue_capacity = wait_for_event_queue_capacity
+
+
+def _get_metadata_timeout(job, key):
+    # False indicates that the metadata doesn't declare a timeout
+    pkg = getattr(job.task_context, 'pkg', None)
+    metadata = getattr(pkg, 'metadata', None) or {}
+    value = metadata.get(key)
+    if value is None:
+        return False
+    try:
+        return parse_timeout(value)
+    except (TypeError, ValueError):
+        logger.warning(
+            f"Ignoring metadata '{key}' of job '{job.identifier}' with the "
+            f"invalid value '{value}'")
+        return False
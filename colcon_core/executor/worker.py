@@ -0,0 +1,316 @@
+# Copyright 2016-2018 Dirk Thomas
+# Licensed under the Apache License, Version 2.0
+
+"""
+Perform tasks on behalf of a coordinator connected via a socket.
+
+A worker process connects to the address of the coordinator, authenticates
+itself with the token from the environment and then performs one task at a
+time.
+All events posted by a task are being sent back to the coordinator.
+
+The messages are pickled tuples which are prefixed with their length.
+The first element of each tuple identifies the kind of message.
+
+Run a worker with `python -m colcon_core.executor.worker ADDRESS`.
+"""
+
+import argparse
+import asyncio
+from asyncio import CancelledError
+import copy
+import os
+import pickle
+import signal
+import struct
+import sys
+import traceback
+
+from colcon_core.event.output import StderrLine
+from colcon_core.logging import colcon_logger
+from colcon_core.package_augmentation import augment_packages
+from colcon_core.package_descriptor import PackageDescriptor
+from colcon_core.subprocess import interrupt_supervised_processes
+from colcon_core.subprocess import new_event_loop
+from colcon_core.subprocess import set_resource_usage_reporting
+from colcon_core.subprocess import SIGINT_RESULT
+from colcon_core.subprocess import supervise_processes
+from colcon_core.subprocess import terminate_supervised_processes
+from colcon_core.task import TaskContext
+
+logger = colcon_logger.getChild(__name__)
+
+"""The environment variable passing the authentication token to workers"""
+WORKER_TOKEN_ENVIRONMENT_VARIABLE = 'COLCON_WORKER_TOKEN'
+
+"""Message from the coordinator to perform a task"""
+EXECUTE = 'execute'
+"""Message from the coordinator to cancel the current task"""
+CANCEL = 'cancel'
+"""Message from a worker forwarding an event posted by the task"""
+EVENT = 'event'
+"""Message from a worker with the return code of the task"""
+RESULT = 'result'
+"""Message from a worker with the traceback of an exception in the task"""
+EXCEPTION = 'exception'
+
+_HEADER = struct.Struct('!I')
+
+
+def encode_frame(data):
+    """
+    Prefix the data with its length.
+
+    :param bytes data: The data
+    :rtype: bytes
+    """
+    return _HEADER.pack(len(data)) + data
+
+
+def encode_message(message):
+    """
+    Pickle a message and prefix it with its length.
+
+    :param tuple message: The message
+    :rtype: bytes
+    """
+    return encode_frame(
+        pickle.dumps(message, protocol=pickle.HIGHEST_PROTOCOL))
+
+
+async def read_frame(reader):
+    """
+    Read the data of a single length-prefixed frame.
+
+    :param reader: The :py:class:`asyncio.StreamReader`
+    :returns: The data or None if the connection has been closed
+    :rtype: bytes
+    """
+    try:
+        header = await reader.readexactly(_HEADER.size)
+        return await reader.readexactly(_HEADER.unpack(header)[0])
+    except (asyncio.IncompleteReadError, ConnectionError):
+        return None
+
+
+async def read_message(reader):
+    """
+    Read and unpickle a single message.
+
+    :param reader: The :py:class:`asyncio.StreamReader`
+    :returns: The message or None if the connection has been closed
+    :rtype: tuple
+    """
+    data = await read_frame(reader)
+    if data is None:
+        return None
+    return pickle.loads(data)
+
+
+def serialize_task_context(context):
+    """
+    Get a picklable representation of a task context.
+
+    Values in the package metadata and attributes of the arguments which
+    can't be pickled (e.g. functions) are being omitted.
+    The keys of the omitted metadata are being recorded in order to restore
+    them on the receiving side.
+
+    :param context: The :py:class:`colcon_core.task.TaskContext`
+    :rtype: tuple
+    """
+    pkg = PackageDescriptor(context.pkg.path)
+    pkg.type = context.pkg.type
+    pkg.name = context.pkg.name
+    pkg.dependencies = context.pkg.dependencies
+    pkg.hooks = context.pkg.hooks
+    omitted_metadata = []
+    for key, value in context.pkg.metadata.items():
+        if _is_picklable(value):
+            pkg.metadata[key] = value
+        else:
+            omitted_metadata.append(key)
+
+    args = copy.copy(context.args)
+    for key, value in list(getattr(args, '__dict__', {}).items()):
+        if not _is_picklable(value):
+            logger.debug(
+                f"Omitting the argument '{key}' of package '{pkg.name}' "
+                "since it can't be serialized")
+            delattr(args, key)
+
+    return (pkg, omitted_metadata, args, context.dependencies)
+
+
+def deserialize_task_context(data):
+    """
+    Create a task context from its serialized representation.
+
+    Omitted package metadata is being restored by augmenting the package
+    again.
+
+    :param tuple data: The result of :py:func:`serialize_task_context`
+    :rtype: :py:class:`colcon_core.task.TaskContext`
+    """
+    pkg, omitted_metadata, args, dependencies = data
+    if omitted_metadata:
+        desc = PackageDescriptor(pkg.path)
+        desc.type = pkg.type
+        desc.name = pkg.name
+        augment_packages({desc})
+        for key in omitted_metadata:
+            if key in desc.metadata:
+                pkg.metadata[key] = desc.metadata[key]
+    return TaskContext(pkg=pkg, args=args, dependencies=dependencies)
+
+
+def _is_picklable(value):
+    try:
+        pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+    except Exception:  # noqa: B902
+        return False
+    return True
+
+
+async def serve(address, token):
+    """
+    Connect to the coordinator and perform tasks until disconnected.
+
+    :param str address: The address of the coordinator, either
+      `unix:PATH` or `tcp:HOST:PORT`
+    :param str token: The authentication token
+    :returns: The return code, non-zero if the coordinator couldn't be
+      reached, e.g. since it has already stopped
+    """
+    scheme, location = address.split(':', 1)
+    try:
+        if scheme == 'unix':
+            reader, writer = await asyncio.open_unix_connection(location)
+        elif scheme == 'tcp':
+            host, port = location.rsplit(':', 1)
+            reader, writer = await asyncio.open_connection(host, int(port))
+        else:
+            raise ValueError(f"Unknown address scheme '{scheme}'")
+    except OSError as e:
+        logger.debug(f"Failed to connect to '{address}': {e}")
+        return 1
+    writer.write(encode_frame(token.encode()))
+
+    execution = None
+    terminations = []
+    while True:
+        message = await read_message(reader)
+        if message is None:
+            break
+        if message[0] == EXECUTE:
+            assert execution is None or execution.done(), \
+                'Only one task can be performed at a time'
+            execution = asyncio.ensure_future(_execute(writer, *message[1:]))
+            supervise_processes(execution)
+        elif message[0] == CANCEL:
+            if execution is not None and not execution.done():
+                # the processes of a cancelled task are being terminated
+                # since they would otherwise keep the worker busy
+                execution.cancel()
+                terminations.append(asyncio.ensure_future(
+                    terminate_supervised_processes(execution)))
+
+    # the coordinator has closed the connection
+    if execution is not None and not execution.done():
+        execution.cancel()
+        terminations.append(asyncio.ensure_future(
+            terminate_supervised_processes(execution)))
+        await asyncio.wait([execution])
+    if terminations:
+        await asyncio.wait(terminations)
+    writer.close()
+    return 0
+
+
+async def _execute(writer, task_class, task_name, package_type, context_data):
+    loop = asyncio.get_event_loop()
+
+    def send(message):
+        # the event might be posted from a different thread
+        loop.call_soon_threadsafe(writer.write, encode_message(message))
+
+    def put_event_into_queue(event):
+        try:
+            send((EVENT, event))
+        except Exception as e:  # noqa: B902
+            send((EVENT, StderrLine(
+                f"Failed to forward event '{type(event).__name__}' from "
+                f'worker: {e}\n'.encode())))
+
+    # concurrent calls to drain() are only supported as of Python 3.10
+    drain_lock = asyncio.Lock()
+
+    async def wait_for_event_queue_capacity():
+        # the coordinator stops reading while its event queue is at capacity
+        async with drain_lock:
+            try:
+                await writer.drain()
+            except ConnectionError:
+                # the task is being cancelled once the connection is closed
+                pass
+
+    try:
+        context = deserialize_task_context(context_data)
+        context.put_event_into_queue = put_event_into_queue
+        context.wait_for_event_queue_capacity = wait_for_event_queue_capacity
+        task = task_class()
+        task.TASK_NAME = task_name
+        task.PACKAGE_TYPE = package_type
+        task.set_context(context=context)
+        rc = await task()
+    except CancelledError:
+        rc = SIGINT_RESULT
+    except Exception:  # noqa: B902
+        send((EXCEPTION, traceback.format_exc()))
+        return
+    send((RESULT, rc))
+
+
+def main(argv=None):
+    """
+    Run a worker process.
+
+    :param list argv: The command line arguments
+    :returns: The return code
+    """
+    parser = argparse.ArgumentParser(
+        prog='python -m colcon_core.executor.worker',
+        description='Perform tasks on behalf of a colcon coordinator')
+    parser.add_argument(
+        'address',
+        help='The address of the coordinator, either unix:PATH or '
+             'tcp:HOST:PORT')
+    parser.add_argument(
+        '--report-resource-usage',
+        action='store_true',
+        help='Report the resource usage of the commands invoked by the '
+             'tasks')
+    args = parser.parse_args(argv)
+    set_resource_usage_reporting(args.report_resource_usage)
+    token = os.environ.get(WORKER_TOKEN_ENVIRONMENT_VARIABLE, '')
+
+    loop = new_event_loop()
+    asyncio.set_event_loop(loop)
+    # the worker keeps running to report the results of the processes
+    # invoked by the task back to the coordinator, since they are started in
+    # a separate session the SIGINT is being forwarded to them
+    try:
+        loop.add_signal_handler(
+            signal.SIGINT, interrupt_supervised_processes)
+    except NotImplementedError:
+        signal.signal(
+            signal.SIGINT,
+            lambda signum, frame: interrupt_supervised_processes())
+    try:
+        return loop.run_until_complete(serve(args.address, token))
+    finally:
+        loop.close()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,201 @@
+# Copyright 2016-2018 Dirk Thomas
+# Licensed under the Apache License, Version 2.0
+
+"""
+Persist information about processed jobs across invocations.
+
+The records are stored in a SQLite database in the log base path which is
+shared between all invocations.
+"""
+
+from collections import namedtuple
+import sqlite3
+import time
+
+from colcon_core.location import get_log_base_path
+from colcon_core.logging import colcon_logger
+
+logger = colcon_logger.getChild(__name__)
+
+"""The filename of the history database within the log base path"""
+HISTORY_FILENAME = 'history.sqlite3'
+
+"""The number of most recent records being kept per job and verb"""
+MAX_RECORDS_PER_JOB = 10
+
+"""The duration in seconds to wait for a lock held by another invocation"""
+LOCK_TIMEOUT = 1.0
+
+"""A record describing one processed job"""
+JobRecord = namedtuple('JobRecord', (
+    'identifier', 'verb_name', 'timestamp', 'duration', 'returncode',
+    'output_bytes', 'peak_rss'))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY,
+    identifier TEXT NOT NULL,
+    verb_name TEXT,
+    timestamp REAL NOT NULL,
+    duration REAL NOT NULL,
+    returncode,
+    output_bytes INTEGER,
+    peak_rss INTEGER
+);
+CREATE INDEX IF NOT EXISTS jobs_identifier ON jobs (verb_name, identifier);
+"""
+
+
+def get_history_path():
+    """
+    Get the path of the history database.
+
+    :returns: The path or None if logging is disabled
+    :rtype: Path or None
+    """
+    log_base_path = get_log_base_path()
+    if log_base_path is None:
+        return None
+    return log_base_path / HISTORY_FILENAME
+
+
+class BuildHistory:
+    """Store and query records of processed jobs."""
+
+    def __init__(self, path):
+        """
+        Open the history database.
+
+        The database is created if it doesn't exist yet.
+
+        :param path: The path of the database file
+        """
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._connection = sqlite3.connect(str(path), timeout=LOCK_TIMEOUT)
+        self._connection.executescript(_SCHEMA)
+
+    def close(self):
+        """Close the history database."""
+        self._connection.close()
+
+    def __enter__(self):  # noqa: D105
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):  # noqa: D105
+        self.close()
+
+    def add_record(self, record):
+        """
+        Add a record of a processed job.
+
+        Only the :py:data:`MAX_RECORDS_PER_JOB` most recent records of the
+        same job and verb are being kept.
+
+        :param JobRecord record: The record
+        """
+        with self._connection:
+            self._connection.execute(
+                'INSERT INTO jobs (identifier, verb_name, timestamp, '
+                'duration, returncode, output_bytes, peak_rss) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)', tuple(record))
+            self._connection.execute(
+                'DELETE FROM jobs WHERE verb_name IS ? AND identifier = ? '
+                'AND id NOT IN (SELECT id FROM jobs WHERE verb_name IS ? AND '
+                'identifier = ? ORDER BY id DESC LIMIT ?)', (
+                    record.verb_name, record.identifier,
+                    record.verb_name, record.identifier,
+                    MAX_RECORDS_PER_JOB))
+
+    def get_records(self, identifier=None, *, verb_name=None, limit=None):
+        """
+        Get the records of processed jobs.
+
+        :param str identifier: Only return records of this job
+        :param str verb_name: Only return records of this verb
+        :param int limit: Only return this number of the most recent records
+        :returns: The records ordered from the oldest to the most recent one
+        :rtype: list
+        """
+        query = 'SELECT ' + ', '.join(JobRecord._fields) + ' FROM jobs'
+        conditions = []
+        parameters = []
+        if identifier is not None:
+            conditions.append('identifier = ?')
+            parameters.append(identifier)
+        if verb_name is not None:
+            conditions.append('verb_name = ?')
+            parameters.append(verb_name)
+        if conditions:
+            query += ' WHERE ' + ' AND '.join(conditions)
+        query += ' ORDER BY id DESC'
+        if limit is not None:
+            query += ' LIMIT ?'
+            parameters.append(limit)
+        rows = self._connection.execute(query, parameters).fetchall()
+        return [JobRecord(*row) for row in reversed(rows)]
+
+    def get_durations(self, identifiers=None, *, verb_name=None):
+        """
+        Get the duration of the most recent successful run of each job.
+
+        :param identifiers: Only return durations of these jobs
+        :param str verb_name: Only consider records of this verb
+        :returns: The mapping of job identifiers to durations in seconds
+        :rtype: dict
+        """
+        query = 'SELECT MAX(id) FROM jobs WHERE returncode = 0'
+        parameters = []
+        if verb_name is not None:
+            query += ' AND verb_name = ?'
+            parameters.append(verb_name)
+        query += ' GROUP BY identifier'
+        query = \
+            f'SELECT identifier, duration FROM jobs WHERE id IN ({query})'
+        durations = dict(self._connection.execute(query, parameters))
+        if identifiers is not None:
+            durations = {
+                identifier: durations[identifier]
+                for identifier in identifiers if identifier in durations}
+        return durations
+
+
+def create_job_record(
+    identifier, *, duration, returncode, verb_name=None, output_bytes=None,
+    peak_rss=None
+):
+    """
+    Create a record for a processed job using the current time.
+
+    :param str identifier: The job identifier
+    :param float duration: The wall time of the job in seconds
+    :param returncode: The return code of the job
+    :param str verb_name: The verb name
+    :param int output_bytes: The number of bytes the job has output
+    :param int peak_rss: The peak resident set size in bytes
+    :rtype: JobRecord
+    """
+    return JobRecord(
+        identifier=identifier, verb_name=verb_name, timestamp=time.time(),
+        duration=duration, returncode=returncode, output_bytes=output_bytes,
+        peak_rss=peak_rss)
+
+
+def get_job_durations(identifiers=None, *, verb_name=None):
+    """
+    Get the durations of jobs from previous invocations.
+
+    :param identifiers: Only return durations of these jobs
+    :param str verb_name: Only consider records of this verb
+    :returns: The mapping of job identifiers to durations in seconds, empty
+      if there is no history
+    :rtype: dict
+    """
+    path = get_history_path()
+    if path is None or not path.exists():
+        return {}
+    try:
+        with BuildHistory(path) as history:
+            return history.get_durations(identifiers, verb_name=verb_name)
+    except sqlite3.Error as e:
+        logger.warning(f"Failed to read the history '{path}': {e}")
+        return {}
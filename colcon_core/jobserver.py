@@ -0,0 +1,193 @@
+# Copyright 2016-2018 Dirk Thomas
+# Licensed under the Apache License, Version 2.0
+
+"""
+Share a global limit of concurrent processes with nested build tools.
+
+The jobserver implements the protocol of GNU make: a pipe contains one byte
+(a token) for each process which may run concurrently.
+A client reads a token before starting an additional process and writes it
+back once the process has finished.
+Each client has one implicit token which allows it to make progress without
+reading from the pipe, colcon passes the token acquired for a job on to the
+processes of that job.
+"""
+
+import asyncio
+import os
+import shutil
+import tempfile
+
+from colcon_core.logging import colcon_logger
+
+logger = colcon_logger.getChild(__name__)
+
+_jobserver = None
+
+
+def get_jobserver():
+    """
+    Get the active jobserver.
+
+    :returns: The jobserver or None if none is active
+    :rtype: JobServer
+    """
+    return _jobserver
+
+
+def set_jobserver(jobserver):
+    """
+    Set the active jobserver which is advertised to invoked commands.
+
+    :param JobServer jobserver: The jobserver or None to deactivate it
+    """
+    global _jobserver
+    _jobserver = jobserver
+
+
+def is_jobserver_supported():
+    """
+    Check if the jobserver is supported on this platform.
+
+    :rtype: bool
+    """
+    return hasattr(os, 'mkfifo')
+
+
+class JobServer:
+    """
+    A GNU make compatible jobserver providing a fixed number of tokens.
+
+    The tokens are stored in a named pipe.
+    While colcon uses a separate non-blocking file description of the named
+    pipe, clients inherit blocking file descriptors which are advertised via
+    `--jobserver-auth=R,W` in the `MAKEFLAGS` environment variable.
+    """
+
+    """The byte used as a token."""
+    TOKEN = b'+'
+
+    def __init__(self, tokens):
+        """
+        Create the named pipe and fill it with tokens.
+
+        :param int tokens: The number of tokens
+        """
+        assert tokens > 0
+        self.tokens = tokens
+        self._directory = tempfile.mkdtemp(prefix='colcon_jobserver_')
+        self.path = os.path.join(self._directory, 'fifo')
+        os.mkfifo(self.path, 0o600)
+        # open read-write to not block while no other end has been opened
+        self._fd = os.open(self.path, os.O_RDWR | os.O_NONBLOCK)
+        self.client_fds = (
+            os.open(self.path, os.O_RDONLY),
+            os.open(self.path, os.O_WRONLY))
+        os.write(self._fd, self.TOKEN * tokens)
+
+    def close(self):
+        """Close all file descriptors and remove the named pipe."""
+        returned = 0
+        while True:
+            try:
+                data = os.read(self._fd, self.tokens)
+            except BlockingIOError:
+                break
+            if not data:
+                break
+            returned += len(data)
+        if returned != self.tokens:
+            logger.debug(
+                f'Only {returned} of {self.tokens} jobserver tokens have been '
+                'returned')
+        for fd in (self._fd, ) + self.client_fds:
+            os.close(fd)
+        shutil.rmtree(self._directory, ignore_errors=True)
+
+    def __enter__(self):  # noqa: D105
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):  # noqa: D105
+        self.close()
+
+    def try_acquire(self):
+        """
+        Try to take a token from the pipe without blocking.
+
+        :returns: The token or None if no token is available
+        :rtype: bytes
+        """
+        try:
+            token = os.read(self._fd, 1)
+        except BlockingIOError:
+            return None
+        return token or None
+
+    def release(self, token):
+        """
+        Return a token to the pipe.
+
+        :param bytes token: The token
+        """
+        os.write(self._fd, token)
+
+    def wait_for_token(self):
+        """
+        Get a future which is done once a token might be available.
+
+        The future must be cancelled if it isn't needed anymore.
+
+        :rtype: asyncio.Future
+        """
+        loop = asyncio.get_event_loop()
+        future = loop.create_future()
+
+        def _readable():
+            if not future.done():
+                future.set_result(None)
+
+        def _remove_reader(_):
+            loop.remove_reader(self._fd)
+
+        loop.add_reader(self._fd, _readable)
+        future.add_done_callback(_remove_reader)
+        return future
+
+    def get_makeflags(self, makeflags=None):
+        """
+        Get the `MAKEFLAGS` advertising this jobserver.
+
+        Existing options regarding the number of jobs are being replaced.
+
+        :param str makeflags: Existing flags
+        :rtype: str
+        """
+        flags = [
+            flag for flag in (makeflags or '').split()
+            if not flag.startswith(('-j', '--jobs', '--jobserver-'))]
+        read_fd, write_fd = self.client_fds
+        flags += [
+            '-j',
+            f'--jobserver-fds={read_fd},{write_fd}',
+            f'--jobserver-auth={read_fd},{write_fd}']
+        return ' '.join(flags)
+
+    def update_popen_kwargs(self, popen_kwargs):
+        """
+        Get the arguments to invoke a process as a client of this jobserver.
+
+        The `MAKEFLAGS` environment variable is being updated and the file
+        descriptors of the pipe are being passed to the process.
+
+        :param dict popen_kwargs: The keyword arguments for `Popen()`
+        :returns: The updated copy of the keyword arguments
+        :rtype: dict
+        """
+        popen_kwargs = dict(popen_kwargs)
+        env = popen_kwargs.get('env')
+        env = dict(env if env is not None else os.environ)
+        env['MAKEFLAGS'] = self.get_makeflags(env.get('MAKEFLAGS'))
+        popen_kwargs['env'] = env
+        popen_kwargs['pass_fds'] = \
+            tuple(popen_kwargs.get('pass_fds', ())) + self.client_fds
+        return popen_kwargs
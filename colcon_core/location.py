@@ -94,6 +94,25 @@ def get_log_path():
     return Path(str(path)) / _log_subdirectory
 
 
+def get_log_base_path():
+    """
+    Get the base path containing the logging directories of all invocations.
+
+    The returned path is the parent directory of the path returned by
+    :func:`get_log_path`.
+
+    :returns: The base path or None if logging is disabled or no default log
+      path has been set
+    :rtype: Path or None
+    """
+    if _log_subdirectory is None:
+        return None
+    path = get_log_path()
+    if path is None:
+        return None
+    return path.parent
+
+
 def set_default_log_path(
     *, base_path, env_var=None, subdirectory=None, default='log'
 ):
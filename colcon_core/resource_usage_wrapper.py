@@ -0,0 +1,147 @@
+# Copyright 2016-2018 Dirk Thomas
+# Licensed under the Apache License, Version 2.0
+
+"""
+Run a command and report its exact resource usage.
+
+The resource usage of the reaped descendants of a process is only available
+as a sum over all of them.
+Since the wrapper process is the parent of only the wrapped command the
+resource usage returned when reaping the command is exactly the usage of the
+command and the descendants it has waited for.
+The only exception is the maximum resident set size: on Linux the high-water
+mark of a process is being carried over when executing a different program.
+Therefore the reported value can't be smaller than the resident set size of
+the wrapper when forking the command (a few MiB).
+
+Run the wrapper with
+`python -I -S resource_usage_wrapper.py <fd> <command> [<arg> ...]`.
+A single line is written to the passed file descriptor, either `usage`
+followed by the values of :attr:`REPORTED_FIELDS` or `error` followed by the
+error number and the command which couldn't be started.
+The wrapper then exits with the return code of the command or ends with the
+same signal as the command.
+
+The signals in :attr:`FORWARDED_SIGNALS` which are being sent to the wrapper
+are being forwarded to the command.
+Where the sender of a signal can be determined signals which have been sent
+to the whole process group, e.g. by the terminal or by the invoking process,
+aren't forwarded since the command has received them already.
+
+The module is being invoked by its path and therefore only uses the
+standard library.
+Expensive imports are being avoided to keep the overhead per command low.
+"""
+
+import os
+import resource
+import signal
+import sys
+
+"""The fields of the resource usage being reported"""
+REPORTED_FIELDS = (
+    'ru_utime', 'ru_stime', 'ru_maxrss', 'ru_inblock', 'ru_oublock')
+
+"""The signals being forwarded to the command"""
+FORWARDED_SIGNALS = (signal.SIGINT, signal.SIGTERM, signal.SIGHUP)
+
+# the code of signals sent by the kernel, e.g. from the terminal, on Linux
+_SI_KERNEL = 0x80
+
+
+def main(argv=None):
+    """
+    Run the command and report its resource usage.
+
+    :param list argv: The file descriptor to report to followed by the
+      command, if None the arguments of the process
+    :returns: The return code
+    """
+    if argv is None:
+        argv = sys.argv[1:]
+    fd = int(argv[0])
+    args = argv[1:]
+    # the command must not inherit the report file descriptor
+    os.set_inheritable(fd, False)
+
+    # the sender of a signal is only available when waiting for it
+    wait_for_signals = hasattr(signal, 'sigwaitinfo')
+    if wait_for_signals:
+        waited_signals = set(FORWARDED_SIGNALS) | {signal.SIGCHLD}
+        previous_mask = signal.pthread_sigmask(
+            signal.SIG_BLOCK, waited_signals)
+
+    # the pipe is being closed when the command has been started successfully
+    error_r, error_w = os.pipe()
+    pid = os.fork()
+    if not pid:
+        try:
+            if wait_for_signals:
+                signal.pthread_sigmask(signal.SIG_SETMASK, previous_mask)
+            os.execvp(args[0], args)
+        except OSError as e:
+            os.write(error_w, str(e.errno).encode())
+        finally:
+            os._exit(127)
+    os.close(error_w)
+    error = os.read(error_r, 64)
+    os.close(error_r)
+
+    if wait_for_signals:
+        status, usage = _wait_for_signals(pid, waited_signals)
+    else:
+        for signum in FORWARDED_SIGNALS:
+            signal.signal(
+                signum, lambda signum, frame: _forward_signal(pid, signum))
+        _, status, usage = os.wait4(pid, 0)
+
+    if error:
+        _report(fd, f'error {error.decode()} {args[0]}')
+        return 127
+    _report(fd, ' '.join(
+        ['usage'] + [str(getattr(usage, name)) for name in REPORTED_FIELDS]))
+
+    if os.WIFSIGNALED(status):
+        signum = os.WTERMSIG(status)
+        # end with the same signal without dumping the core of the wrapper
+        resource.setrlimit(resource.RLIMIT_CORE, (0, 0))
+        signal.signal(signum, signal.SIG_DFL)
+        signal.pthread_sigmask(signal.SIG_UNBLOCK, {signum})
+        os.kill(os.getpid(), signum)
+        return 128 + signum
+    return os.WEXITSTATUS(status)
+
+
+def _wait_for_signals(pid, waited_signals):
+    while True:
+        info = signal.sigwaitinfo(waited_signals)
+        if info.si_signo == signal.SIGCHLD:
+            reaped_pid, status, usage = os.wait4(pid, os.WNOHANG)
+            if reaped_pid:
+                return status, usage
+            continue
+        # signals from the kernel (e.g. the terminal) and from the invoking
+        # process have been sent to the process group including the command
+        if info.si_code == _SI_KERNEL or info.si_pid == os.getppid():
+            continue
+        _forward_signal(pid, info.si_signo)
+
+
+def _forward_signal(pid, signum):
+    try:
+        os.kill(pid, signum)
+    except ProcessLookupError:
+        pass
+
+
+def _report(fd, line):
+    try:
+        os.write(fd, (line + '\n').encode())
+    except BrokenPipeError:
+        # the invoking process doesn't wait for the report anymore
+        pass
+    os.close(fd)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
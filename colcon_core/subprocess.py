@@ -6,17 +6,24 @@ Call a subprocess making the stdout and stderr output available via callbacks.
 
 The stdout and stderr pipes are read concurrently using the asyncio event loop
 to maintain the original order as closely as possible.
+The pipes are read in large chunks which are split into lines in bulk while
+the callbacks are still being invoked for each line.
 """
 
 import asyncio
+from collections import namedtuple
 from concurrent.futures import ALL_COMPLETED
-from functools import partial
+import errno
+import mmap
 import os
 import platform
 import shlex
+import signal
 import subprocess
 import sys
+import tempfile
 from typing import Any
+from typing import Awaitable
 from typing import Callable
 from typing import Mapping
 from typing import Optional
@@ -25,9 +32,64 @@ from typing import Sequence
 from colcon_core.logging import colcon_logger
 
 SIGINT_RESULT = 'SIGINT'
+TIMEOUT_RESULT = 'TIMEOUT'
+
+"""The duration in seconds interrupted processes have before being killed"""
+TERMINATE_GRACE_PERIOD = 5.0
+
+"""The maximum number of bytes read from a pipe at once"""
+READ_CHUNK_SIZE = 64 * 1024
+"""The number of bytes after which an unterminated line is passed in pieces"""
+MAX_LINE_LENGTH = 1024 * 1024
+"""The number of captured bytes after which a bounded capture uses a file"""
+CAPTURE_SPILL_THRESHOLD = 16 * 1024 * 1024
 
 logger = colcon_logger.getChild(__name__)
 
+try:
+    import resource
+except ImportError:  # pragma: no cover
+    # not available on Windows
+    resource = None
+
+"""The resources used by a finished process and its descendants"""
+ResourceUsage = namedtuple('ResourceUsage', (
+    'user_time', 'system_time', 'max_rss', 'block_input', 'block_output'))
+
+# the processes invoked by each supervised asyncio task
+_supervised_processes = {}
+
+# the script reporting the resource usage of the command it runs
+_RESOURCE_USAGE_WRAPPER = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), 'resource_usage_wrapper.py')
+
+# whether the resource usage of the commands invoked by run() is reported
+_report_resource_usage = False
+
+
+def set_resource_usage_reporting(enabled):
+    """
+    Enable or disable reporting the resource usage of invoked commands.
+
+    Since the commands are then being invoked through
+    :py:mod:`colcon_core.resource_usage_wrapper` each command has an overhead
+    of starting an additional Python interpreter.
+    Therefore the resource usage is only being reported on request.
+
+    :param bool enabled: The flag if the resource usage should be reported
+    """
+    global _report_resource_usage
+    _report_resource_usage = bool(enabled)
+
+
+def is_resource_usage_reporting_enabled():
+    """
+    Check if the resource usage of invoked commands is being reported.
+
+    :rtype: bool
+    """
+    return _report_resource_usage
+
 
 def new_event_loop():
     """
@@ -43,6 +105,128 @@ def new_event_loop():
     return asyncio.new_event_loop()
 
 
+class CapturedOutput:
+    """
+    The output of a process captured with bounded memory usage.
+
+    The output is being stored in memory until it exceeds
+    :py:data:`CAPTURE_SPILL_THRESHOLD` bytes, after that it is being written
+    to a temporary file.
+    The output can be accessed as a buffer without copying it or read in
+    chunks.
+    The temporary file is being removed when the instance is closed or
+    garbage collected.
+    """
+
+    def __init__(self, spill_threshold=None):
+        """
+        Construct a CapturedOutput.
+
+        :param int spill_threshold: The number of bytes after which the
+          output is being written to a temporary file, if None
+          :py:data:`CAPTURE_SPILL_THRESHOLD`
+        """
+        if spill_threshold is None:
+            spill_threshold = CAPTURE_SPILL_THRESHOLD
+        self._spill_threshold = spill_threshold
+        self._buffer = bytearray()
+        self._file = None
+        self._length = 0
+
+    def __len__(self):
+        """Get the number of captured bytes."""
+        return self._length
+
+    def __enter__(self):  # noqa: D105
+        return self
+
+    def __exit__(self, *args):  # noqa: D105
+        self.close()
+
+    @property
+    def spilled(self):
+        """Whether the output has been written to a temporary file."""
+        return self._file is not None
+
+    def write(self, data):
+        """
+        Append data to the captured output.
+
+        :param bytes data: The data
+        """
+        self._length += len(data)
+        if self._file is None:
+            if self._length <= self._spill_threshold:
+                self._buffer += data
+                return
+            self._file = tempfile.TemporaryFile()
+            self._file.write(self._buffer)
+            self._buffer = bytearray()
+        self._file.write(data)
+
+    def getbuffer(self):
+        """
+        Get the captured output without copying it.
+
+        The caller should release the returned object when done with it.
+
+        :returns: A :py:class:`memoryview` of the output in memory or a
+          read-only :py:class:`mmap.mmap` of the temporary file
+        """
+        if self._file is None:
+            return memoryview(self._buffer)
+        self._file.flush()
+        return mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def getvalue(self):
+        """
+        Get a copy of the captured output.
+
+        :rtype: bytes
+        """
+        if self._file is None:
+            return bytes(self._buffer)
+        self._file.flush()
+        self._file.seek(0)
+        try:
+            return self._file.read()
+        finally:
+            self._file.seek(0, os.SEEK_END)
+
+    def iter_chunks(self, size=READ_CHUNK_SIZE):
+        """
+        Read the captured output in chunks.
+
+        :param int size: The maximum number of bytes of each chunk
+        :returns: A generator of bytes
+        """
+        if self._file is None:
+            for start in range(0, len(self._buffer), size):
+                yield bytes(self._buffer[start:start + size])
+            return
+        offset = 0
+        while True:
+            self._file.flush()
+            self._file.seek(offset)
+            try:
+                chunk = self._file.read(size)
+            finally:
+                # further writes append to the end of the file
+                self._file.seek(0, os.SEEK_END)
+            if not chunk:
+                break
+            offset += len(chunk)
+            yield chunk
+
+    def close(self):
+        """Release the captured output and remove the temporary file."""
+        self._buffer = bytearray()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self._length = 0
+
+
 async def run(
     args: Sequence[str],
     stdout_callback: Callable[[bytes], None],
@@ -50,12 +234,21 @@ async def run(
     *,
     use_pty: Optional[bool] = None,
     capture_output: Optional[bool] = None,
+    bounded_capture: bool = False,
+    flow_control: Optional[Callable[[], Awaitable[None]]] = None,
+    chunked: bool = False,
     **other_popen_kwargs: Mapping[str, Any]
 ) -> subprocess.CompletedProcess:
     """
     Run the command described by args.
 
-    Invokes the callbacks for every line read from the subprocess pipes.
+    Invokes the callbacks for every line read from the subprocess pipes or
+    for every chunk of lines if `chunked` is set.
+
+    If the consumer of the callbacks can't keep up with the output the flow
+    control coroutine function can pause the reading.
+    The subprocess is then being blocked when writing to the full pipe
+    instead of the output accumulating in memory.
 
     See the documentation of `subprocess.Popen()
     <https://docs.python.org/3/library/subprocess.html#subprocess.Popen>` for
@@ -68,27 +261,42 @@ async def run(
       the stderr pipe of the process
     :param use_pty: whether to use a pseudo terminal
     :param capture_output: whether to store stdout and stderr
-    :returns: the result of the completed process
+    :param bounded_capture: whether to store the captured stdout and stderr
+      as :py:class:`CapturedOutput` instances which spill to a temporary
+      file instead of as bytes, which requires the whole output to fit into
+      memory
+    :param flow_control: the coroutine function is awaited after the
+      callbacks have been invoked for each chunk of output and no further
+      output is being read until it returns
+    :param chunked: whether to invoke the callbacks with chunks of complete
+      lines instead of every single line
+    :returns: the result of the completed process, the attribute
+      `resource_usage` contains the :py:data:`ResourceUsage` of the process
+      if available, which requires the reporting to be enabled (see
+      :py:func:`set_resource_usage_reporting`)
     :rtype: subprocess.CompletedProcess
     """
     assert callable(stdout_callback) or stdout_callback is None
     assert callable(stderr_callback) or stderr_callback is None
+    assert callable(flow_control) or flow_control is None
 
-    stdout_capture = []
+    stdout_capture = CapturedOutput(
+        spill_threshold=None if bounded_capture else sys.maxsize)
 
     def _stdout_callback(line):
         if stdout_callback:
             stdout_callback(line)
         if capture_output:
-            stdout_capture.append(line)
+            stdout_capture.write(line)
 
-    stderr_capture = []
+    stderr_capture = CapturedOutput(
+        spill_threshold=None if bounded_capture else sys.maxsize)
 
     def _stderr_callback(line):
         if stderr_callback:
             stderr_callback(line)
         if capture_output:
-            stderr_capture.append(line)
+            stderr_capture.write(line)
 
     # if use_pty is neither True nor False choose based on isatty of stdout
     if use_pty is None:
@@ -97,13 +305,18 @@ async def run(
     if use_pty and platform.system() != 'Linux':
         use_pty = False
 
-    rc, _, _ = await _async_check_call(
+    rc, _, _, resource_usage = await _async_check_call(
         args, _stdout_callback, _stderr_callback,
-        use_pty=use_pty, **other_popen_kwargs)
+        use_pty=use_pty, flow_control=flow_control, chunked=chunked,
+        resource_usage=_report_resource_usage, **other_popen_kwargs)
 
-    return subprocess.CompletedProcess(
-        args, rc, stdout=b''.join(stdout_capture),
-        stderr=b''.join(stderr_capture))
+    if not bounded_capture:
+        stdout_capture = stdout_capture.getvalue()
+        stderr_capture = stderr_capture.getvalue()
+    completed = subprocess.CompletedProcess(
+        args, rc, stdout=stdout_capture, stderr=stderr_capture)
+    completed.resource_usage = resource_usage
+    return completed
 
 
 async def check_output(
@@ -121,7 +334,7 @@ async def check_output(
     :returns: The `stdout` output of the command
     :rtype: str
     """
-    rc, stdout_data, stderr_data = await _async_check_call(
+    rc, stdout_data, stderr_data, _ = await _async_check_call(
         args, subprocess.PIPE, subprocess.PIPE, use_pty=False,
         **other_popen_kwargs)
     if rc:
@@ -132,14 +345,30 @@ async def check_output(
 
 async def _async_check_call(
     args, stdout_callback, stderr_callback, *, use_pty=None,
+    flow_control=None, chunked=False, resource_usage=False,
     **other_popen_kwargs
 ):
     """Coroutine running the command and invoking the callbacks."""
     # choose function to create subprocess
-    if not other_popen_kwargs.pop('shell', False):
+    shell = other_popen_kwargs.pop('shell', False)
+    if shell:
+        args = [' '.join([escape_shell_argument(a) for a in args])]
+    report_fd = None
+    if resource_usage and _can_report_resource_usage(other_popen_kwargs):
+        # the wrapper is the parent of only the command and reports its
+        # resource usage through a pipe
+        if shell:
+            args = ['/bin/sh', '-c'] + args
+        report_fd, write_fd = os.pipe()
+        args = [
+            sys.executable, '-I', '-S', _RESOURCE_USAGE_WRAPPER,
+            str(write_fd)] + list(args)
+        other_popen_kwargs['pass_fds'] = \
+            tuple(other_popen_kwargs.get('pass_fds', ())) + (write_fd, )
+        create_subprocess = asyncio.create_subprocess_exec
+    elif not shell:
         create_subprocess = asyncio.create_subprocess_exec
     else:
-        args = [' '.join([escape_shell_argument(a) for a in args])]
         create_subprocess = asyncio.create_subprocess_shell
 
     # choose stdout and stderr arguments for the subprocess
@@ -155,33 +384,56 @@ async def _async_check_call(
         if stderr_callback:
             stderr_descriptor, stderr = pty.openpty()
 
-    process = await create_subprocess(
-        *args, stdout=stdout, stderr=stderr, **other_popen_kwargs)
+    supervised_processes = _get_supervised_processes()
+    if supervised_processes is not None and os.name == 'posix':
+        # a separate process group allows signaling all descendants
+        other_popen_kwargs.setdefault('start_new_session', True)
+
+    try:
+        process = await create_subprocess(
+            *args, stdout=stdout, stderr=stderr, **other_popen_kwargs)
+    except BaseException:  # noqa: B902
+        if report_fd is not None:
+            os.close(report_fd)
+        raise
+    finally:
+        if report_fd is not None:
+            # only the wrapper must keep the write end open
+            os.close(write_fd)
+    if supervised_processes is not None:
+        supervised_processes.add(process)
 
     # read pipes concurrently
     callbacks = []
     if use_pty:
         if callable(stdout_callback):
-            callbacks.append(_fd2callback(stdout_descriptor, stdout_callback))
+            callbacks.append(_fd2callback(
+                stdout_descriptor, stdout_callback, flow_control,
+                chunked=chunked))
         if callable(stderr_callback):
-            callbacks.append(_fd2callback(stderr_descriptor, stderr_callback))
+            callbacks.append(_fd2callback(
+                stderr_descriptor, stderr_callback, flow_control,
+                chunked=chunked))
     else:
         if callable(stdout_callback):
             callbacks.append(_pipe2callback(
                 process.stdout, stdout_callback,
-                process.stderr if callable(stderr_callback) else None))
+                process.stderr if callable(stderr_callback) else None,
+                flow_control, chunked=chunked))
         if callable(stderr_callback):
             callbacks.append(asyncio.ensure_future(_pipe2callback(
                 process.stderr, stderr_callback,
-                process.stdout if callable(stdout_callback) else None)))
+                process.stdout if callable(stdout_callback) else None,
+                flow_control, chunked=chunked)))
 
     output = [None, None]
+    report = [None]
     if not stdout_callback and not stderr_callback:
         # asynchronously wait for the subprocess
-        await process.wait()
+        await _wait_and_read_report(process, report_fd, report)
     else:
         # asynchronously communicate with the subprocess
-        callbacks.append(process.wait())
+        callbacks.append(_wait_and_read_report(process, report_fd, report))
         if subprocess.PIPE in (stdout_callback, stderr_callback):
             callbacks.append(_communicate_and_close_fds(
                 process,
@@ -214,7 +466,103 @@ async def _async_check_call(
             for task in done:
                 _ = task.exception()  # noqa: F841
 
-    return process.returncode, output[0], output[1]
+    usage = None
+    if report[0] is not None:
+        if report[0].startswith('error '):
+            # the wrapper wasn't able to start the command
+            _, error_number, filename = report[0].split(' ', 2)
+            error_number = int(error_number)
+            raise OSError(error_number, os.strerror(error_number), filename)
+        usage = _get_resource_usage(report[0].split()[1:])
+    return process.returncode, output[0], output[1], usage
+
+
+def supervise_processes(task):
+    """
+    Track the processes invoked by an asyncio task.
+
+    On POSIX platforms each process invoked by the task is being started in a
+    new session so that the process and all its descendants can be signaled
+    as a group.
+    Since such processes don't receive a SIGINT from the terminal anymore the
+    caller should use :function:`interrupt_supervised_processes` to forward
+    it.
+
+    :param task: The asyncio task, it stops being supervised when done
+    """
+    _supervised_processes[task] = set()
+    task.add_done_callback(
+        lambda task: _supervised_processes.pop(task, None))
+
+
+def _get_supervised_processes():
+    try:
+        try:
+            # new in Python 3.7
+            current_task = asyncio.current_task
+        except AttributeError:
+            current_task = asyncio.Task.current_task
+        task = current_task()
+    except RuntimeError:
+        # no running event loop
+        return None
+    return _supervised_processes.get(task)
+
+
+def interrupt_supervised_processes():
+    """Send a SIGINT to the running processes of all supervised tasks."""
+    for processes in list(_supervised_processes.values()):
+        for process in list(processes):
+            if process.returncode is None:
+                _signal_process_group(process, signal.SIGINT)
+
+
+async def terminate_supervised_processes(
+    task, *, grace_period=TERMINATE_GRACE_PERIOD
+):
+    """
+    Terminate the processes invoked by a supervised asyncio task.
+
+    The process groups are being sent a SIGINT first and if any process
+    hasn't ended within the grace period all process groups are being
+    killed.
+
+    :param task: The supervised asyncio task
+    :param float grace_period: The duration in seconds before killing the
+      processes
+    """
+    processes = [
+        p for p in _supervised_processes.get(task, ())
+        if p.returncode is None]
+    if not processes:
+        return
+    if os.name == 'posix':
+        for process in processes:
+            logger.debug(f'Interrupting process group {process.pid}')
+            _signal_process_group(process, signal.SIGINT)
+        waits = [asyncio.ensure_future(p.wait()) for p in processes]
+        _, pending = await asyncio.wait(waits, timeout=grace_period)
+    else:
+        waits, pending = [], ()
+    for process in processes:
+        # descendants might still be running even if the process has ended
+        logger.debug(f'Killing process group {process.pid}')
+        _signal_process_group(process, getattr(signal, 'SIGKILL', None))
+    if pending:
+        await asyncio.wait(pending)
+
+
+def _signal_process_group(process, signum):
+    try:
+        if os.name == 'posix':
+            os.killpg(process.pid, signum)
+        elif process.returncode is None:
+            if signum == signal.SIGINT:
+                process.send_signal(signum)
+            else:
+                process.kill()
+    except ProcessLookupError:
+        pass
 
 
 def escape_shell_argument(arg):
@@ -244,33 +592,79 @@ def escape_shell_argument(arg):
     return quoted
 
 
-async def _fd2callback(descriptor, callback):
+async def _fd2callback(
+    descriptor, callback, flow_control=None, *, chunked=False
+):
     """Coroutine reading from fd and invoking the callback for each line."""
-    func = partial(_blocking_fd2callback, descriptor, callback)
     loop = asyncio.get_event_loop()
-    await loop.run_in_executor(None, func)
+    stream = asyncio.StreamReader(limit=READ_CHUNK_SIZE)
+    # the file descriptor is being read without blocking on the event loop
+    transport, _ = await loop.connect_read_pipe(
+        lambda: _PseudoTerminalProtocol(stream),
+        os.fdopen(descriptor, mode='rb', buffering=0))
+    try:
+        # the text mode of a pseudo terminal terminates lines with CR LF
+        await _pipe2callback(
+            stream, callback, flow_control=flow_control,
+            universal_newlines=True, chunked=chunked)
+    finally:
+        transport.close()
 
 
-def _blocking_fd2callback(descriptor, callback):
-    """Read all lines from the stream invoke the callback for each line."""
-    with os.fdopen(descriptor) as stream:
-        while True:
-            try:
-                line = stream.readline()
-            except IOError:
-                # this is how the fd signals the EOF
-                break
-            callback(line.encode())
+class _PseudoTerminalProtocol(asyncio.StreamReaderProtocol):
+
+    def connection_lost(self, exc):
+        # this is how a pseudo terminal signals the EOF, passing it on as an
+        # exception would discard the data which hasn't been read yet
+        if isinstance(exc, OSError) and exc.errno == errno.EIO:
+            exc = None
+        super().connection_lost(exc)
 
 
-async def _pipe2callback(stream, callback, other_stream=None):
+async def _pipe2callback(
+    stream, callback, other_stream=None, flow_control=None, *,
+    universal_newlines=False, chunked=False
+):
     """Coroutine reading from pipe and invoking the callback for each line."""
+    # the beginning of a line which has not been terminated yet
+    pending = b''
+    # a carriage return at the end of the previous chunk
+    carriage_return = False
     while True:
-        line = await stream.readline()
-        if not line:
+        chunk = await stream.read(READ_CHUNK_SIZE)
+        if not chunk:
             # this is how the pipe signals the EOF
             break
-        callback(line)
+        if universal_newlines:
+            # translate CR LF as well as CR to LF
+            if carriage_return:
+                chunk = b'\r' + chunk
+            # the following chunk might start with the matching LF
+            carriage_return = chunk.endswith(b'\r')
+            if carriage_return:
+                chunk = chunk[:-1]
+            chunk = chunk.replace(b'\r\n', b'\n').replace(b'\r', b'\n')
+        end = chunk.rfind(b'\n')
+        if end == -1:
+            pending += chunk
+            if len(pending) >= MAX_LINE_LENGTH:
+                # pass very long lines in pieces to bound the memory usage
+                callback(pending)
+                pending = b''
+        else:
+            data = pending + chunk[:end + 1] if pending else chunk[:end + 1]
+            pending = chunk[end + 1:]
+            if chunked:
+                callback(data)
+            else:
+                _split_lines(data, callback)
+        if flow_control is not None:
+            await flow_control()
+    if carriage_return:
+        pending += b'\n'
+    if pending:
+        # the last line is not terminated by a newline
+        callback(pending)
 
     # HACK on Windows sometimes only one of the two streams gets closed
     # feeding an EOF explicitly ensures that the other coroutine finishes
@@ -278,6 +672,63 @@ async def _pipe2callback(stream, callback, other_stream=None):
         other_stream.feed_eof()
 
 
+def _split_lines(data, callback):
+    """Invoke the callback for each newline terminated line in the data."""
+    start = 0
+    find = data.find
+    while True:
+        end = find(b'\n', start) + 1
+        if not end:
+            break
+        callback(data[start:end])
+        start = end
+
+
+def _can_report_resource_usage(popen_kwargs):
+    if resource is None or not sys.executable:
+        return False
+    # the wrapper would need to be invoked differently
+    return (
+        popen_kwargs.get('executable') is None and
+        popen_kwargs.get('close_fds', True))
+
+
+async def _wait_and_read_report(process, report_fd, report):
+    """Coroutine waiting for the process and reading its report if any."""
+    try:
+        await process.wait()
+        if report_fd is not None:
+            report[0] = _read_report(report_fd)
+    finally:
+        if report_fd is not None:
+            os.close(report_fd)
+
+
+def _read_report(fd):
+    # the process has ended and closed the write end of the pipe
+    data = b''
+    while True:
+        chunk = os.read(fd, READ_CHUNK_SIZE)
+        if not chunk:
+            break
+        data += chunk
+    if not data.endswith(b'\n'):
+        # the wrapper has been killed before reporting
+        return None
+    return data.decode(errors='replace').rstrip('\n')
+
+
+def _get_resource_usage(values):
+    # the values of the fields reported by the wrapper
+    user_time, system_time, max_rss, block_input, block_output = values
+    # the maximum resident set size is reported in bytes on macOS
+    rss_unit = 1 if sys.platform == 'darwin' else 1024
+    return ResourceUsage(
+        user_time=float(user_time), system_time=float(system_time),
+        max_rss=int(max_rss) * rss_unit, block_input=int(block_input),
+        block_output=int(block_output))
+
+
 async def _wait_and_close_fds(process, stdout=None, stderr=None):
     """Coroutine waiting for the process and closing all handles."""
     try:
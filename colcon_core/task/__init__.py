@@ -11,8 +11,11 @@ import warnings
 from colcon_core.event.command import Command
 from colcon_core.event.command import CommandEnded
 from colcon_core.event.job import JobProgress
+from colcon_core.event.output import StderrChunk
 from colcon_core.event.output import StderrLine
+from colcon_core.event.output import StdoutChunk
 from colcon_core.event.output import StdoutLine
+from colcon_core.jobserver import get_jobserver
 from colcon_core.logging import colcon_logger
 from colcon_core.plugin_system import instantiate_extensions
 from colcon_core.plugin_system import order_extensions_by_name
@@ -49,6 +52,17 @@ class TaskContext:
         """
         raise NotImplementedError()
 
+    async def wait_for_event_queue_capacity(self):
+        """
+        Wait until the event queue can take more events.
+
+        By default the method returns immediately and it will be replaced at
+        runtime once the event queue is known.
+        Producers of many events, e.g. the output of a subprocess, should
+        await it in order to not exceed the capacity of the queue.
+        """
+        pass
+
 
 class TaskExtensionPoint:
     """
@@ -154,8 +168,8 @@ async def check_call(
 
     Post a `Command` event to the queue describing the exact invocation in
     order to allow reproducing it.
-    All output to `stdout` and `stderr` is posted as `StdoutLine` and
-    `StderrLine` events to the event queue.
+    All output to `stdout` and `stderr` is posted as `StdoutChunk` and
+    `StderrChunk` events to the event queue.
 
     This function has been depreated, use ``colcon_core.task.run()`` instead.
 
@@ -175,15 +189,20 @@ async def check_call(
 
 
 async def run(
-    context, cmd, *, use_pty=None, capture_output=None, **other_popen_kwargs
+    context, cmd, *, use_pty=None, capture_output=None, bounded_capture=False,
+    **other_popen_kwargs
 ):
     """
     Run the command described by cmd.
 
     Post a `Command` event to the queue describing the exact invocation in
     order to allow reproducing it.
-    All output to `stdout` and `stderr` is posted as `StdoutLine` and
-    `StderrLine` events to the event queue.
+    All output to `stdout` and `stderr` is posted as `StdoutChunk` and
+    `StderrChunk` events containing one or more complete lines to the event
+    queue.
+    If a jobserver is active it is advertised to the command in the
+    `MAKEFLAGS` environment variable.
+    Reading the output is paused while the event queue is at capacity.
 
     See the documentation of `subprocess.Popen()
     <https://docs.python.org/3/library/subprocess.html#subprocess.Popen>` for
@@ -192,14 +211,16 @@ async def run(
     :param cmd: The command and its arguments
     :param use_pty: whether to use a pseudo terminal
     :param capture_output: whether to store stdout and stderr
+    :param bounded_capture: whether to store the captured output as
+      :py:class:`colcon_core.subprocess.CapturedOutput` instances
     :returns: the result of the completed process
     :rtype: subprocess.CompletedProcess
     """
-    def stdout_callback(line):
-        context.put_event_into_queue(StdoutLine(line))
+    def stdout_callback(data):
+        context.put_event_into_queue(StdoutChunk(data))
 
-    def stderr_callback(line):
-        context.put_event_into_queue(StderrLine(line))
+    def stderr_callback(data):
+        context.put_event_into_queue(StderrChunk(data))
 
     cwd = other_popen_kwargs.get('cwd', None)
     env = other_popen_kwargs.get('env', None)
@@ -207,14 +228,23 @@ async def run(
 
     context.put_event_into_queue(
         Command(cmd, cwd=cwd, env=env, shell=shell))
+
+    # advertise the jobserver to nested build tools
+    jobserver = get_jobserver()
+    if jobserver is not None:
+        other_popen_kwargs = jobserver.update_popen_kwargs(other_popen_kwargs)
+
     completed = await colcon_core_subprocess_run(
         cmd, stdout_callback, stderr_callback,
         use_pty=use_pty, capture_output=capture_output,
-        **other_popen_kwargs)
+        bounded_capture=bounded_capture,
+        flow_control=getattr(context, 'wait_for_event_queue_capacity', None),
+        chunked=True, **other_popen_kwargs)
     context.put_event_into_queue(
         CommandEnded(
             cmd, cwd=cwd, env=env, shell=shell,
-            returncode=completed.returncode))
+            returncode=completed.returncode,
+            resource_usage=getattr(completed, 'resource_usage', None)))
     return completed
 
 
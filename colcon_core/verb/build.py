@@ -17,6 +17,8 @@ from colcon_core.executor import add_executor_arguments
 from colcon_core.executor import execute_jobs
 from colcon_core.executor import Job
 from colcon_core.executor import OnError
+from colcon_core.executor.journal import CheckpointJournal
+from colcon_core.executor.journal import JOURNAL_FILENAME
 from colcon_core.package_identification.ignore import IGNORE_MARKER
 from colcon_core.package_selection import add_arguments \
     as add_packages_arguments
@@ -110,6 +112,14 @@ class BuildVerb(VerbExtensionPoint):
             help='Continue other packages when a package fails to build '
                  '(packages recursively depending on the failed package are '
                  'skipped)')
+        parser.add_argument(
+            '--resume',
+            action='store_true',
+            help='Skip packages which have been built successfully in a '
+                 'previous invocation with this option as long as their '
+                 'sources, arguments and upstream packages are unchanged '
+                 '(the outcome of the packages is only being recorded when '
+                 'using this option)')
         add_executor_arguments(parser)
         add_event_handler_arguments(parser)
 
@@ -146,9 +156,17 @@ class BuildVerb(VerbExtensionPoint):
                 event_queue.put(
                     (JobUnselected(name), None))
 
+        # fingerprinting the package sources is only worth it when resuming
+        resume = getattr(context.args, 'resume', False)
+        journal = None
+        if resume:
+            journal = CheckpointJournal(
+                Path(context.args.build_base) / JOURNAL_FILENAME,
+                verb_name=getattr(context.args, 'verb_name', None))
         rc = execute_jobs(
             context, jobs, on_error=on_error,
-            pre_execution_callback=post_unselected_packages)
+            pre_execution_callback=post_unselected_packages,
+            journal=journal, resume=resume)
 
         self._create_prefix_scripts(install_base, context.args.merge_install)
 
@@ -0,0 +1,125 @@
+# Copyright 2016-2018 Dirk Thomas
+# Licensed under the Apache License, Version 2.0
+
+from collections import OrderedDict
+
+from colcon_core.event_handler import format_duration
+from colcon_core.executor import Job
+from colcon_core.executor import JobGraph
+from colcon_core.executor.scheduling import SCHEDULING_POLICIES
+from colcon_core.executor.simulation import complete_durations
+from colcon_core.executor.simulation import get_critical_path
+from colcon_core.executor.simulation import simulate
+from colcon_core.history import get_job_durations
+from colcon_core.package_selection import add_arguments \
+    as add_packages_arguments
+from colcon_core.package_selection import get_packages
+from colcon_core.plugin_system import satisfies_version
+from colcon_core.verb import logger
+from colcon_core.verb import VerbExtensionPoint
+
+
+class SimulateVerb(VerbExtensionPoint):
+    """Predict the duration of processing a set of packages."""
+
+    def __init__(self):  # noqa: D107
+        super().__init__()
+        satisfies_version(VerbExtensionPoint.EXTENSION_POINT_VERSION, '^1.0')
+
+    def add_arguments(self, *, parser):  # noqa: D102
+        parser.add_argument(
+            '--parallel-workers',
+            type=_parse_workers,
+            nargs='+',
+            default=[1, 2, 4, 8, 16],
+            metavar='NUMBER',
+            help='The numbers of parallel workers to simulate, '
+                 "'0' for no limit (default: 1 2 4 8 16)")
+        parser.add_argument(
+            '--scheduling-policies',
+            nargs='+',
+            choices=SCHEDULING_POLICIES,
+            default=list(SCHEDULING_POLICIES),
+            metavar='POLICY',
+            help='The scheduling policies to simulate '
+                 f"({', '.join(SCHEDULING_POLICIES)}, default: all)")
+        parser.add_argument(
+            '--history-verb',
+            default='build',
+            metavar='VERB',
+            help='The verb whose job durations recorded in the build '
+                 'history are being used (default: build)')
+        parser.add_argument(
+            '--default-duration',
+            type=float,
+            metavar='SECONDS',
+            help='The duration of packages without a recorded duration '
+                 '(default: the average of the recorded durations)')
+        add_packages_arguments(parser)
+
+    def main(self, *, context):  # noqa: D102
+        decorators = get_packages(context.args)
+        jobs = OrderedDict()
+        for decorator in decorators:
+            if not decorator.selected:
+                continue
+            name = decorator.descriptor.name
+            jobs[name] = Job(
+                identifier=name,
+                dependencies=set(decorator.recursive_dependencies),
+                task=None, task_context=None)
+        job_graph = JobGraph(jobs)
+        cycle = job_graph.find_cycle()
+        if cycle is not None:
+            return 'Unable to simulate jobs with circular dependencies: ' + \
+                ' -> '.join(cycle)
+
+        known_durations = get_job_durations(
+            jobs.keys(), verb_name=context.args.history_verb)
+        if not known_durations:
+            logger.warning(
+                'No durations have been recorded for the selected packages, '
+                f"run the verb '{context.args.history_verb}' first")
+        durations = complete_durations(
+            jobs.keys(), known_durations,
+            default=context.args.default_duration)
+
+        total = sum(durations.values())
+        missing = len(jobs) - len(known_durations)
+        print(
+            f'Packages: {len(jobs)} ({missing} without a recorded duration)')
+        print(f'Total duration: {format_duration(total)}')
+        length, path = get_critical_path(job_graph, durations)
+        print(
+            f'Critical path: {format_duration(length)} '
+            f"({' -> '.join(path)})")
+        print()
+
+        header = (
+            'policy', 'workers', 'makespan', 'utilization', 'speedup')
+        rows = []
+        for policy in context.args.scheduling_policies:
+            for workers in context.args.parallel_workers:
+                result = simulate(
+                    job_graph, durations, workers=workers, policy=policy)
+                rows.append((
+                    policy, str(workers) if workers else 'unlimited',
+                    format_duration(result.makespan),
+                    f'{result.utilization:.1%}',
+                    f'{total / result.makespan:.2f}x'
+                    if result.makespan else '-'))
+        widths = [
+            max(len(row[i]) for row in [header] + rows)
+            for i in range(len(header))]
+        for row in [header] + rows:
+            print('  '.join(
+                value.ljust(width) if i == 0 else value.rjust(width)
+                for i, (value, width) in enumerate(zip(row, widths))))
+        return 0
+
+
+def _parse_workers(value):
+    workers = int(value)
+    if workers < 0:
+        raise ValueError(f"Invalid number of workers '{value}'")
+    return workers
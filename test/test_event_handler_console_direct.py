@@ -3,8 +3,12 @@
 
 from unittest.mock import patch
 
+from colcon_core.event.job import JobEnded
+from colcon_core.event.output import StderrChunk
 from colcon_core.event.output import StderrLine
+from colcon_core.event.output import StdoutChunk
 from colcon_core.event.output import StdoutLine
+from colcon_core.event.timer import TimerEvent
 from colcon_core.event_handler.console_direct import ConsoleDirectEventHandler
 import pytest
 
@@ -42,6 +46,15 @@ def test_console_direct():
         assert stderr.buffer.write.call_count == 0
         assert stderr.write.call_count == 0
 
+    with patch('sys.stdout') as stdout, patch('sys.stderr') as stderr:
+        extension = ConsoleDirectEventHandler()
+
+        # chunks are being written at once
+        extension((StdoutChunk(b'first\nsecond\n'), None))
+        stdout.buffer.write.assert_called_once_with(b'first\nsecond\n')
+        extension((StderrChunk('first\nsecond\n'), None))
+        stderr.write.assert_called_once_with('first\nsecond\n')
+
     with patch('sys.stdout') as stdout:
         stdout.buffer.write.side_effect = BrokenPipeError()
         stdout.write.side_effect = BrokenPipeError()
@@ -58,3 +71,53 @@ def test_console_direct():
         event = StdoutLine('string line')
         extension((event, None))
         assert stdout.write.call_count == 0
+        event = StdoutChunk(b'bytes line\n')
+        extension((event, None))
+        assert stdout.buffer.write.call_count == 1
+
+
+def test_console_direct_buffered():
+    with patch('sys.stdout') as stdout, patch('sys.stderr') as stderr:
+        stdout.isatty.return_value = False
+        extension = ConsoleDirectEventHandler()
+        assert TimerEvent in extension.EVENT_TYPES
+        extension.FLUSH_THRESHOLD = 30
+
+        extension((StdoutLine(b'bytes line\n'), None))
+        extension((StdoutLine(b'bytes line\n'), None))
+        assert stdout.buffer.write.call_count == 2
+        assert stdout.flush.call_count == 0
+
+        # the order across the streams is being maintained
+        extension((StderrLine(b'error\n'), None))
+        assert stdout.flush.call_count == 1
+        assert stderr.flush.call_count == 0
+
+        # the byte threshold triggers a flush
+        extension((StderrLine(b'another much longer error\n'), None))
+        assert stderr.flush.call_count == 1
+
+        # text is being passed to the buffer before bytes
+        extension((StdoutLine('text\n'), None))
+        assert stdout.write.call_count == 1
+        assert stdout.flush.call_count == 1
+        extension((StdoutLine(b'bytes\n'), None))
+        assert stdout.flush.call_count == 2
+
+        # the buffered output is being flushed periodically
+        extension((TimerEvent(), None))
+        assert stdout.flush.call_count == 3
+        extension((TimerEvent(), None))
+        assert stdout.flush.call_count == 3
+
+        extension((StdoutLine(b'line\n'), None))
+        extension((JobEnded('name', 0), None))
+        assert stdout.flush.call_count == 4
+
+    # unbuffered output on interactive terminals
+    with patch('sys.stdout') as stdout:
+        stdout.isatty.return_value = True
+        extension = ConsoleDirectEventHandler()
+        assert TimerEvent not in extension.EVENT_TYPES
+        extension((StdoutLine(b'bytes line\n'), None))
+        assert stdout.flush.call_count == 1
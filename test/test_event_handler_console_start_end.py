@@ -9,6 +9,7 @@ from colcon_core.event.test import TestFailure
 from colcon_core.event_handler.console_start_end \
     import ConsoleStartEndEventHandler
 from colcon_core.subprocess import SIGINT_RESULT
+from colcon_core.subprocess import TIMEOUT_RESULT
 
 
 def test_console_start_end():
@@ -36,6 +37,14 @@ def test_console_start_end():
             assert stderr.write.call_count == 0
             stdout.write.reset_mock()
 
+            # timeout
+            event = JobEnded('idA', TIMEOUT_RESULT)
+            extension((event, None))
+            assert stderr.write.call_count == 2
+            assert stdout.write.call_count == 0
+            assert 'Timeout' in stderr.write.call_args_list[0][0][0]
+            stderr.write.reset_mock()
+
             # failure
             event = JobEnded('idA', 1)
             extension((event, None))
@@ -0,0 +1,92 @@
+# Copyright 2016-2018 Dirk Thomas
+# Licensed under the Apache License, Version 2.0
+
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from types import SimpleNamespace
+from unittest.mock import Mock
+from unittest.mock import patch
+
+from colcon_core.event.command import CommandEnded
+from colcon_core.event.job import JobEnded
+from colcon_core.event.job import JobStarted
+from colcon_core.event.output import StderrLine
+from colcon_core.event.output import StdoutLine
+from colcon_core.event_handler.history import HistoryEventHandler
+from colcon_core.event_reactor import EventReactorShutdown
+from colcon_core.history import BuildHistory
+from colcon_core.subprocess import ResourceUsage
+
+
+def test_history():
+    extension = HistoryEventHandler()
+    extension.context = Mock()
+    extension.context.args = SimpleNamespace(verb_name='build')
+    job = SimpleNamespace(identifier='idA')
+
+    with TemporaryDirectory(prefix='test_colcon_') as base_path:
+        path = Path(base_path) / 'history.sqlite3'
+        with patch(
+            'colcon_core.event_handler.history.get_history_path',
+            return_value=path
+        ):
+            # ignore events of jobs which haven't been started
+            extension((StdoutLine(b'line\n'), job))
+            extension((JobEnded('idA', 0), job))
+            assert not path.exists()
+
+            extension((JobStarted('idA'), job))
+            extension((StdoutLine(b'line\n'), job))
+            extension((StderrLine('error\n'), job))
+            extension((StdoutLine(b'other\n'), None))
+            # the peak memory is the maximum of all commands of the job
+            for max_rss in (2048, 4096, None):
+                extension((CommandEnded(
+                    ['cmd'], cwd='/tmp', returncode=0,
+                    resource_usage=ResourceUsage(
+                        user_time=1.0, system_time=0.5, max_rss=max_rss,
+                        block_input=0, block_output=0)), job))
+            extension((CommandEnded(['cmd'], cwd='/tmp', returncode=0), job))
+            extension((JobEnded('idA', 1), job))
+            extension((EventReactorShutdown(), None))
+
+        with BuildHistory(path) as history:
+            records = history.get_records()
+        assert len(records) == 1
+        assert records[0].identifier == 'idA'
+        assert records[0].verb_name == 'build'
+        assert records[0].returncode == 1
+        assert records[0].output_bytes == 11
+        assert records[0].peak_rss == 4096
+        assert records[0].duration >= 0.0
+
+    # logging is disabled
+    with patch(
+        'colcon_core.event_handler.history.get_history_path',
+        return_value=None
+    ):
+        extension((JobStarted('idA'), job))
+        extension((JobEnded('idA', 0), job))
+
+
+def test_history_error():
+    extension = HistoryEventHandler()
+    extension.context = Mock()
+    extension.context.args = SimpleNamespace(verb_name='build')
+    job = SimpleNamespace(identifier='idA')
+
+    with TemporaryDirectory(prefix='test_colcon_') as base_path:
+        path = Path(base_path) / 'history.sqlite3'
+        path.write_text('not a database')
+        with patch(
+            'colcon_core.event_handler.history.get_history_path',
+            return_value=path
+        ), patch(
+            'colcon_core.event_handler.history.logger.warning'
+        ) as warning:
+            for _ in range(2):
+                extension((JobStarted('idA'), job))
+                extension((JobEnded('idA', 0), job))
+            extension((EventReactorShutdown(), None))
+        # the failure is only reported once
+        assert warning.call_count == 1
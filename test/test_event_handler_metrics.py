@@ -0,0 +1,102 @@
+# Copyright 2016-2018 Dirk Thomas
+# Licensed under the Apache License, Version 2.0
+
+import os
+from types import SimpleNamespace
+from unittest.mock import patch
+from urllib.request import urlopen
+
+from colcon_core.event.command import Command
+from colcon_core.event.command import CommandEnded
+from colcon_core.event.job import JobEnded
+from colcon_core.event.job import JobQueued
+from colcon_core.event.job import JobSkipped
+from colcon_core.event.job import JobStarted
+from colcon_core.event.output import StderrLine
+from colcon_core.event.output import StdoutLine
+from colcon_core.event.test import TestFailure
+from colcon_core.event_handler.metrics import METRICS_FILENAME
+from colcon_core.event_handler.metrics import MetricsEventHandler
+from colcon_core.event_reactor import EventReactorShutdown
+from colcon_core.subprocess import SIGINT_RESULT
+
+
+def test_metrics(tmp_path):
+    extension = MetricsEventHandler()
+    assert not extension.enabled
+    job_a = SimpleNamespace(identifier='pkgA')
+    job_b = SimpleNamespace(identifier='pkgB')
+
+    log_path = tmp_path / 'log'
+    with patch.dict(os.environ, {'COLCON_METRICS_PORT': ''}), patch(
+        'colcon_core.event_handler.metrics.get_log_path',
+        return_value=log_path
+    ):
+        extension.handle_events([
+            (JobQueued('pkgA', {}), job_a),
+            (JobQueued('pkgB', {}), job_b),
+            (JobQueued('pkgC', {}), None),
+            (JobStarted('pkgA'), job_a),
+            (Command(['cmake'], cwd='/tmp'), job_a),
+            (StdoutLine(b'12345\n'), job_a),
+            (StderrLine('abc\n'), job_a),
+            (StdoutLine(b'ignored\n'), None),
+            (CommandEnded(['cmake'], cwd='/tmp', returncode=2), job_a),
+            (TestFailure('pkgA'), job_a),
+        ])
+        metrics = extension.get_metrics()
+        assert 'colcon_jobs_queued 2\n' in metrics
+        assert 'colcon_jobs_running 1\n' in metrics
+        assert 'colcon_job_commands_total{job="pkgA"} 1\n' in metrics
+        assert 'colcon_job_failed_commands_total{job="pkgA"} 1\n' in metrics
+        assert 'colcon_job_output_bytes_total{job="pkgA"} 10\n' in metrics
+        assert 'colcon_job_test_failures_total{job="pkgA"} 1\n' in metrics
+        assert 'colcon_job_elapsed_seconds{job="pkgA"} ' in metrics
+        # the file is only written once a job has ended
+        assert not (log_path / METRICS_FILENAME).exists()
+
+        extension((JobEnded('pkgA', 1), job_a))
+        extension((JobSkipped('pkgC'), None))
+        extension((JobStarted('pkgB'), job_b))
+        extension((JobEnded('pkgB', SIGINT_RESULT), job_b))
+        extension((EventReactorShutdown(), None))
+
+    metrics = (log_path / METRICS_FILENAME).read_text()
+    assert 'colcon_jobs_queued 0\n' in metrics
+    assert 'colcon_jobs_running 0\n' in metrics
+    assert 'colcon_jobs_finished_total{result="failed"} 1\n' in metrics
+    assert 'colcon_jobs_finished_total{result="interrupted"} 1\n' in metrics
+    assert 'colcon_jobs_skipped_total 1\n' in metrics
+    assert 'colcon_job_duration_seconds_bucket{le="1"} 2\n' in metrics
+    assert 'colcon_job_duration_seconds_bucket{le="+Inf"} 2\n' in metrics
+    assert 'colcon_job_duration_seconds_count 2\n' in metrics
+
+
+def test_metrics_server():
+    extension = MetricsEventHandler()
+    with patch.dict(os.environ, {'COLCON_METRICS_PORT': '0'}), patch(
+        'colcon_core.event_handler.metrics.get_log_path', return_value=None
+    ):
+        extension((JobQueued('pkg"A', {}), None))
+        port = extension._server.server_address[1]
+        with urlopen(f'http://127.0.0.1:{port}/metrics') as response:
+            assert response.status == 200
+            content = response.read().decode()
+        assert 'colcon_jobs_queued 1\n' in content
+
+        extension((JobStarted('pkg"A'), None))
+        extension((JobEnded('pkg"A', 0), None))
+        assert 'colcon_job_elapsed_seconds{job="pkg\\"A"} ' in \
+            extension.get_metrics()
+
+        extension((EventReactorShutdown(), None))
+        assert extension._server is None
+
+    # an invalid port is being ignored
+    extension = MetricsEventHandler()
+    with patch.dict(os.environ, {'COLCON_METRICS_PORT': 'invalid'}), patch(
+        'colcon_core.event_handler.metrics.get_log_path', return_value=None
+    ), patch('colcon_core.event_handler.metrics.logger.warning') as warning:
+        extension((JobQueued('pkgA', {}), None))
+    assert warning.call_count == 1
+    assert extension._server is None
@@ -0,0 +1,122 @@
+# Copyright 2016-2018 Dirk Thomas
+# Licensed under the Apache License, Version 2.0
+
+from argparse import Namespace
+from io import BytesIO
+import logging
+from pathlib import Path
+import pickle
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from colcon_core.command import CommandContext
+from colcon_core.event.job import JobEnded
+from colcon_core.event.job import JobStarted
+from colcon_core.event.output import StdoutLine
+from colcon_core.event.timer import TimerEvent
+from colcon_core.event_handler import EventHandlerExtensionPoint
+from colcon_core.event_handler_process import _HEADER
+from colcon_core.event_handler_process import EventHandlerProcess
+from colcon_core.event_handler_process import ForwardedJob
+from colcon_core.event_handler_process import main
+from colcon_core.event_reactor import create_event_reactor
+from colcon_core.event_reactor import EventReactorShutdown
+from colcon_core.logging import colcon_logger
+
+from .extension_point_context import ExtensionPointContext
+
+
+class RecordingExtension(EventHandlerExtensionPoint):
+
+    events = []
+
+    def __call__(self, event):
+        if not isinstance(event[0], TimerEvent):
+            RecordingExtension.events.append(event)
+
+
+def _encode(message):
+    data = pickle.dumps(message)
+    return _HEADER.pack(len(data)) + data
+
+
+def test_main():
+    job = ForwardedJob('pkgA')
+    args = Namespace(event_handlers=None, event_handler_process=False)
+    stream = BytesIO(
+        _encode(('build', args, None, 30)) +
+        _encode([(JobStarted('pkgA'), job), (StdoutLine(b'line\n'), job)]) +
+        _encode([
+            (JobEnded('pkgA', 0), job), (EventReactorShutdown(), None),
+            (StdoutLine(b'ignored\n'), job)]))
+
+    RecordingExtension.events = []
+    with ExtensionPointContext(recording=RecordingExtension), patch(
+        'colcon_core.event_handler_process.set_default_log_path'
+    ) as set_default_log_path:
+        assert main(stream) == 0
+    assert set_default_log_path.call_count == 1
+
+    events = RecordingExtension.events
+    assert [type(data) for data, _ in events] == [
+        JobStarted, StdoutLine, JobEnded, EventReactorShutdown]
+    assert str(events[1][1]) == 'pkgA'
+
+    # a closed connection without any messages
+    assert main(BytesIO()) == 1
+
+
+def test_main_logging():
+    args = Namespace(event_handlers=None, event_handler_process=False)
+    log_path = Path('log', 'build')
+    stream = BytesIO(_encode(('build', args, log_path, logging.INFO)))
+
+    level = colcon_logger.level
+    try:
+        with patch(
+            'colcon_core.event_handler_process.set_default_log_path'
+        ), patch(
+            'colcon_core.event_handler_process.add_file_handler'
+        ) as add_file_handler:
+            assert main(stream) == 0
+        # the console uses the level of the invoking process
+        assert colcon_logger.level == logging.INFO
+    finally:
+        colcon_logger.setLevel(level)
+    # all levels are being appended to the log file of the invoking process
+    add_file_handler.assert_called_once_with(
+        colcon_logger, log_path / 'logger_all.log')
+
+
+def test_event_handler_process():
+    args = Namespace(event_handlers=None, event_handler_process=True)
+    context = CommandContext(command_name='build', args=args)
+    with patch(
+        'colcon_core.event_handler_process.get_log_path', return_value=None
+    ), patch(
+        'colcon_core.event_handler_process.get_effective_console_level',
+        return_value=logging.INFO
+    ) as get_effective_console_level:
+        event_reactor = create_event_reactor(context)
+    # the console level is being passed rather than the level of the logger
+    get_effective_console_level.assert_called_once_with(colcon_logger)
+    assert len(event_reactor._observers) == 1
+    observer = event_reactor._observers[0]
+    assert isinstance(observer, EventHandlerProcess)
+    # the invoking process keeps its own arguments
+    assert args.event_handler_process is True
+
+    job = SimpleNamespace(identifier='pkgA')
+    with event_reactor:
+        queue = event_reactor.get_queue()
+        queue.put((JobStarted('pkgA'), job))
+        # events which can't be pickled are being skipped
+        queue.put((lambda: None, job))
+        queue.put((JobEnded('pkgA', 0), job))
+    assert observer._process.returncode == 0
+    # the same stand-in is being used for all events of a job
+    assert observer._get_forwarded_job(job) is \
+        observer._get_forwarded_job(job)
+
+    # further events after the shutdown are being ignored
+    observer((StdoutLine(b'line\n'), job))
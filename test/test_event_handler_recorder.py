@@ -0,0 +1,45 @@
+# Copyright 2016-2018 Dirk Thomas
+# Licensed under the Apache License, Version 2.0
+
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from colcon_core.event.job import JobEnded
+from colcon_core.event.job import JobStarted
+from colcon_core.event.output import StdoutLine
+from colcon_core.event_handler.recorder import EventRecorderEventHandler
+from colcon_core.event_handler.recorder import RECORDING_FILENAME
+from colcon_core.event_reactor import EventReactorShutdown
+from colcon_core.event_recording import read_recording
+
+
+def test_recorder(tmp_path):
+    extension = EventRecorderEventHandler()
+    assert not extension.enabled
+    job = SimpleNamespace(identifier='idA')
+
+    # logging is disabled
+    with patch(
+        'colcon_core.event_handler.recorder.get_log_path', return_value=None
+    ):
+        extension((JobStarted('idA'), job))
+
+    log_path = tmp_path / 'log'
+    with patch(
+        'colcon_core.event_handler.recorder.get_log_path',
+        return_value=log_path
+    ):
+        extension((JobStarted('idA'), job))
+        extension.handle_events([
+            (StdoutLine(b'line\n'), job), (JobEnded('idA', 0), job)])
+        path = log_path / RECORDING_FILENAME
+        # the events are available before the recording has been closed
+        assert len(list(read_recording(path))) == 3
+
+        extension((EventReactorShutdown(), None))
+        extension((StdoutLine(b'late\n'), job))
+
+    events = [event for _, event in read_recording(path)]
+    assert [type(data) for data, _ in events] == [
+        JobStarted, StdoutLine, JobEnded]
+    assert events[1][1].identifier == 'idA'
@@ -0,0 +1,43 @@
+# Copyright 2016-2018 Dirk Thomas
+# Licensed under the Apache License, Version 2.0
+
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from colcon_core.event.command import CommandEnded
+from colcon_core.event_handler.resource_usage import ResourceUsageEventHandler
+from colcon_core.event_reactor import EventReactorShutdown
+from colcon_core.subprocess import ResourceUsage
+
+
+def _command_ended(cmd, cpu_time, max_rss):
+    return CommandEnded(
+        cmd, cwd='/tmp', returncode=0, resource_usage=ResourceUsage(
+            user_time=cpu_time, system_time=0.0, max_rss=max_rss,
+            block_input=0, block_output=0))
+
+
+def test_resource_usage(capsys):
+    extension = ResourceUsageEventHandler()
+    assert not extension.enabled
+    job = SimpleNamespace(identifier='pkgA')
+
+    # without any commands nothing is being printed
+    extension((EventReactorShutdown(), None))
+    assert capsys.readouterr().out == ''
+
+    extension((_command_ended(['cmake'], 2.0, 100 * 1024 * 1024), job))
+    extension((_command_ended(['make'], 30.0, None), job))
+    extension((_command_ended(['test'], 1.0, 200 * 1024 * 1024), None))
+    # commands without resource usage are being ignored
+    extension((CommandEnded(['other'], cwd='/tmp', returncode=0), job))
+    with patch('colcon_core.event_handler.resource_usage.SUMMARY_COUNT', 2):
+        extension((EventReactorShutdown(), None))
+    assert capsys.readouterr().out.splitlines() == [
+        'Commands with the most CPU time:',
+        '  30.0s pkgA: make',
+        '  2.00s pkgA: cmake',
+        'Commands with the most peak memory:',
+        '  200.0 MiB test',
+        '  100.0 MiB pkgA: cmake',
+    ]
@@ -0,0 +1,94 @@
+# Copyright 2016-2018 Dirk Thomas
+# Licensed under the Apache License, Version 2.0
+
+import json
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from colcon_core.event.command import Command
+from colcon_core.event.command import CommandEnded
+from colcon_core.event.job import JobEnded
+from colcon_core.event.job import JobProgress
+from colcon_core.event.job import JobQueued
+from colcon_core.event.job import JobStarted
+from colcon_core.event_handler.trace_event import TRACE_FILENAME
+from colcon_core.event_handler.trace_event import TraceEventHandler
+from colcon_core.event_reactor import EventReactorShutdown
+
+
+def test_trace(tmp_path):
+    extension = TraceEventHandler()
+    # the trace is opt-in
+    assert not extension.enabled
+    job_a = SimpleNamespace(identifier='pkgA')
+    job_b = SimpleNamespace(identifier='pkgB')
+    job_c = SimpleNamespace(identifier='pkgC')
+
+    log_path = tmp_path / 'log'
+    with patch(
+        'colcon_core.event_handler.trace_event.get_log_path',
+        return_value=log_path
+    ):
+        for job in (job_a, job_b, job_c):
+            extension((JobQueued(job.identifier, {}), job))
+        extension((JobStarted('pkgA'), job_a))
+        extension((JobStarted('pkgB'), job_b))
+        extension((JobProgress('pkgA', 'configure'), job_a))
+        extension((Command(['/usr/bin/cmake', '..'], cwd='/tmp'), job_a))
+        extension((
+            CommandEnded(['/usr/bin/cmake', '..'], cwd='/tmp', returncode=0),
+            job_a))
+        # a command without a reported end
+        extension((Command(['make'], cwd='/tmp'), job_a))
+        # commands of unknown jobs are being ignored
+        extension((Command(['make'], cwd='/tmp'), None))
+        extension((JobEnded('pkgA', 'SIGINT'), job_a))
+
+        # the lane of the ended job is being reused
+        extension((JobStarted('pkgC'), job_c))
+        extension((JobEnded('pkgC', 0), job_c))
+        extension((JobEnded('pkgB', 1), job_b))
+
+        # the trace is usable before it has been terminated
+        content = (log_path / TRACE_FILENAME).read_text()
+        assert json.loads(content + ']')
+
+        extension((EventReactorShutdown(), None))
+        extension((JobStarted('pkgD'), None))
+
+    trace_events = json.loads((log_path / TRACE_FILENAME).read_text())
+    lanes = {
+        e['args']['name']: e['tid'] for e in trace_events
+        if e['name'] == 'thread_name'}
+    assert lanes == {'job slot 1': 1, 'job slot 2': 2}
+
+    jobs = {e['name']: e for e in trace_events if e.get('cat') == 'job'}
+    assert set(jobs.keys()) == {'pkgA', 'pkgB', 'pkgC'}
+    assert jobs['pkgA']['tid'] == 1
+    assert jobs['pkgB']['tid'] == 2
+    assert jobs['pkgC']['tid'] == 1
+    assert jobs['pkgA']['args']['returncode'] == 'SIGINT'
+    assert jobs['pkgB']['args']['returncode'] == 1
+
+    commands = [e for e in trace_events if e.get('cat') == 'command']
+    assert [c['name'] for c in commands] == ['cmake', 'make']
+    assert commands[0]['args']['returncode'] == 0
+    assert commands[1]['args']['returncode'] is None
+    assert all(c['tid'] == 1 for c in commands)
+    # the commands are nested within the job
+    assert commands[0]['ts'] >= jobs['pkgA']['ts']
+    assert commands[1]['ts'] + commands[1]['dur'] <= \
+        jobs['pkgA']['ts'] + jobs['pkgA']['dur']
+
+    progress = [e for e in trace_events if e.get('cat') == 'progress']
+    assert [p['name'] for p in progress] == ['configure']
+
+
+def test_trace_logging_disabled():
+    extension = TraceEventHandler()
+    with patch(
+        'colcon_core.event_handler.trace_event.get_log_path', return_value=None
+    ):
+        extension((JobStarted('pkgA'), None))
+        extension((JobEnded('pkgA', 0), None))
+        extension((EventReactorShutdown(), None))
@@ -0,0 +1,28 @@
+# Copyright 2016-2018 Dirk Thomas
+# Licensed under the Apache License, Version 2.0
+
+from colcon_core.event.output import StderrChunk
+from colcon_core.event.output import StderrLine
+from colcon_core.event.output import StdoutChunk
+from colcon_core.event.output import StdoutLine
+
+
+def test_stdout_chunk():
+    chunk = StdoutChunk(b'first\n\nthird\nincomplete')
+    lines = chunk.get_lines()
+    assert all(isinstance(line, StdoutLine) for line in lines)
+    assert [line.line for line in lines] == [
+        b'first\n', b'\n', b'third\n', b'incomplete']
+
+    chunk = StdoutChunk('first\nsecond\n')
+    assert [line.line for line in chunk.get_lines()] == [
+        'first\n', 'second\n']
+
+    assert StdoutChunk(b'').get_lines() == []
+
+
+def test_stderr_chunk():
+    chunk = StderrChunk(b'error\nwarning\n')
+    lines = chunk.get_lines()
+    assert all(isinstance(line, StderrLine) for line in lines)
+    assert [line.line for line in lines] == [b'error\n', b'warning\n']
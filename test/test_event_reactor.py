@@ -1,15 +1,27 @@
 # Copyright 2016-2018 Dirk Thomas
 # Licensed under the Apache License, Version 2.0
 
+import asyncio
 from queue import Queue
+import sys
 import time
 from unittest.mock import Mock
 from unittest.mock import patch
 
+from colcon_core.event.output import StderrLine
+from colcon_core.event.output import StdoutChunk
+from colcon_core.event.output import StdoutLine
 from colcon_core.event.timer import TimerEvent
 from colcon_core.event_handler import EventHandlerExtensionPoint
 from colcon_core.event_reactor import create_event_reactor
+from colcon_core.event_reactor import EventQueue
+from colcon_core.event_reactor import EventReactor
 from colcon_core.event_reactor import EventReactorShutdown
+from colcon_core.event_reactor import get_output_size
+from colcon_core.subprocess import new_event_loop
+from colcon_core.subprocess import READ_CHUNK_SIZE
+from colcon_core.subprocess import run
+import pytest
 
 from .extension_point_context import ExtensionPointContext
 
@@ -45,6 +57,28 @@ class Extension3(CustomExtension):
             raise RuntimeError("RuntimeError for '%s'" % event[0])
 
 
+class ResourceUsageExtension(CustomExtension):
+
+    REQUIRES_RESOURCE_USAGE = True
+
+
+def test_create_event_reactor_resource_usage():
+    context = Mock()
+    context.args = Mock()
+    for event_handlers, enabled in (
+        ([], True), (['resource_usage-'], False)
+    ):
+        context.args.event_handlers = event_handlers
+        with ExtensionPointContext(
+            extension1=Extension1, resource_usage=ResourceUsageExtension
+        ), patch(
+            'colcon_core.event_reactor.set_resource_usage_reporting'
+        ) as set_resource_usage_reporting:
+            create_event_reactor(context)
+        # only enabled extensions request the resource usage of commands
+        set_resource_usage_reporting.assert_called_once_with(enabled)
+
+
 def test_create_event_reactor():
     context = Mock()
     context.args = Mock()
@@ -118,3 +152,359 @@ def test_create_event_reactor():
 
     # no harm in flushing after the thread has been joined
     event_reactor.flush()
+
+
+def test_event_queue():
+    queue = EventQueue()
+    assert queue.get_all(timeout=0.01) == []
+    for i in range(5):
+        queue.put(i)
+    assert queue.get_all(max_count=2) == [0, 1]
+    assert queue.get_all(timeout=0) == [2, 3, 4]
+    queue.task_done(4)
+    assert queue.unfinished_tasks == 1
+    queue.task_done()
+    queue.join()
+    with pytest.raises(ValueError):
+        queue.task_done()
+
+
+class BatchExtension(CustomExtension):
+
+    def __init__(self):
+        super().__init__()
+        self.batches = []
+
+    def handle_events(self, events):
+        self.batches.append(events)
+
+
+def test_batch_observers():
+    event_reactor = EventReactor()
+    # avoid timer events other than the initial one
+    event_reactor.TIMER_INTERVAL = 60
+    notifications = []
+    batch = BatchExtension()
+    event_reactor.register_observer(
+        lambda event: notifications.append(('a', event[0])))
+    event_reactor.register_observer(batch)
+    event_reactor.register_observer(
+        lambda event: notifications.append(('b', event[0])))
+    event_reactor.register_observer(
+        lambda event: notifications.append(('c', event[0])))
+
+    queue = event_reactor.get_queue()
+    # the events posted before starting are being received as one batch
+    for i in range(3):
+        queue.put((i, None))
+    with event_reactor:
+        queue.join()
+
+    assert len(batch.batches[0]) == 1
+    assert isinstance(batch.batches[0][0][0], TimerEvent)
+    assert batch.batches[1] == [(i, None) for i in range(3)]
+    assert isinstance(batch.batches[-1][-1][0], EventReactorShutdown)
+
+    notifications = [
+        n for n in notifications if isinstance(n[1], int)]
+    assert notifications == [
+        ('a', 0), ('a', 1), ('a', 2),
+        # consecutive observers are being notified for each event in turn
+        ('b', 0), ('c', 0), ('b', 1), ('c', 1), ('b', 2), ('c', 2)]
+
+
+class CountingExtension(EventHandlerExtensionPoint):
+
+    count = 0
+
+    def __call__(self, event):
+        CountingExtension.count += 1
+
+
+def _measure_throughput(count, *, max_batch_size):
+    context = Mock()
+    context.args = Mock()
+    context.args.event_handlers = []
+    with ExtensionPointContext(counting=CountingExtension):
+        event_reactor = create_event_reactor(context)
+    event_reactor.MAX_BATCH_SIZE = max_batch_size
+    CountingExtension.count = 0
+    queue = event_reactor.get_queue()
+    start = time.monotonic()
+    with event_reactor:
+        for i in range(count):
+            queue.put((i, None))
+    duration = time.monotonic() - start
+    # the posted events, the shutdown event and at least one timer event
+    assert CountingExtension.count >= count + 2
+    return count / duration
+
+
+def test_throughput():
+    count = 20000
+    # a batch size of one corresponds to processing one event at a time
+    single = _measure_throughput(count, max_batch_size=1)
+    batched = _measure_throughput(
+        count, max_batch_size=EventReactor.MAX_BATCH_SIZE)
+    print(
+        f'Event reactor throughput: {single:.0f} events/s one at a time, '
+        f'{batched:.0f} events/s batched')
+
+
+def test_flush():
+    event_reactor = EventReactor()
+    event_reactor.TIMER_INTERVAL = 60
+    processed = []
+
+    def slow_observer(event):
+        if event[0] == 'slow':
+            time.sleep(0.2)
+            # flushing from within an observer must not block
+            event_reactor.flush()
+        processed.append(event[0])
+
+    event_reactor.register_observer(slow_observer)
+    # flushing before starting doesn't block
+    event_reactor.flush()
+    with event_reactor:
+        queue = event_reactor.get_queue()
+        event_reactor.flush()
+        queue.put(('slow', None))
+        queue.put(('fast', None))
+        event_reactor.flush()
+        # the last event has been fully processed not only been taken
+        assert processed[-2:] == ['slow', 'fast']
+    event_reactor.flush()
+
+
+class StringExtension(CustomExtension):
+
+    EVENT_TYPES = (str, )
+
+
+class BatchStringExtension(BatchExtension):
+
+    EVENT_TYPES = (str, )
+
+
+def test_event_types():
+    event_reactor = EventReactor()
+    event_reactor.TIMER_INTERVAL = 60
+    all_events = CustomExtension()
+    strings = StringExtension()
+    batch_strings = BatchStringExtension()
+    for observer in (all_events, strings, batch_strings):
+        event_reactor.register_observer(observer)
+
+    queue = event_reactor.get_queue()
+    for data in ('first', 1, 'second', True):
+        queue.put((data, None))
+    with event_reactor:
+        queue.join()
+
+    assert [e[0] for e in all_events.events[1:-1]] == [
+        'first', 1, 'second', True]
+    # neither timer events nor other events are being dispatched
+    assert strings.events == [('first', None), ('second', None)]
+    assert batch_strings.batches == [[('first', None), ('second', None)]]
+    # the dispatch table contains each type once
+    assert set(event_reactor._dispatch_table.keys()) == {
+        str, int, bool, EventReactorShutdown}
+
+
+class LineExtension(CustomExtension):
+
+    EVENT_TYPES = (StdoutLine, StderrLine)
+
+
+class ChunkExtension(BatchExtension):
+
+    EVENT_TYPES = (StdoutLine, StdoutChunk)
+
+
+def test_chunk_events():
+    event_reactor = EventReactor()
+    event_reactor.TIMER_INTERVAL = 60
+    all_events = CustomExtension()
+    lines = LineExtension()
+    batch_all_events = BatchExtension()
+    chunks = ChunkExtension()
+    strings = StringExtension()
+    for observer in (all_events, lines, batch_all_events, chunks, strings):
+        event_reactor.register_observer(observer)
+
+    queue = event_reactor.get_queue()
+    chunk = StdoutChunk(b'first\nsecond\n')
+    queue.put((chunk, 'job'))
+    queue.put(('string', None))
+    with event_reactor:
+        queue.join()
+
+    # observers which don't declare the chunk type receive the lines
+    for observer in (all_events, lines):
+        received = [
+            e for e in observer.events if not isinstance(
+                e[0], (TimerEvent, EventReactorShutdown))]
+        assert [(type(d), j) for d, j in received[:2]] == \
+            [(StdoutLine, 'job')] * 2
+        assert [d.line for d, _ in received[:2]] == [b'first\n', b'second\n']
+    batch_lines = [
+        e[0].line for batch in batch_all_events.batches for e in batch
+        if isinstance(e[0], StdoutLine)]
+    assert batch_lines == [b'first\n', b'second\n']
+    # observers declaring the chunk type receive it as is
+    assert chunks.batches == [[(chunk, 'job')]]
+    # observers not interested in lines receive neither
+    assert strings.events == [('string', None)]
+
+
+def test_event_queue_high_water_mark():
+    queue = EventQueue(high_water_mark=4)
+    loop = new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        # producers are not being paused below the high-water mark
+        for i in range(3):
+            queue.put(i)
+        loop.run_until_complete(
+            asyncio.wait_for(queue.wait_for_capacity(), timeout=1))
+
+        queue.put(3)
+        waiter = asyncio.ensure_future(queue.wait_for_capacity())
+        loop.run_until_complete(asyncio.sleep(0.01))
+        assert not waiter.done()
+        # the producers are only being resumed at half the high-water mark
+        assert queue.get_all(max_count=1) == [0]
+        loop.run_until_complete(asyncio.sleep(0.01))
+        assert not waiter.done()
+        assert queue.get_all(max_count=1) == [1]
+        loop.run_until_complete(asyncio.wait_for(waiter, timeout=1))
+
+        # removing the high-water mark resumes all producers
+        queue.put(4)
+        queue.put(5)
+        waiter = asyncio.ensure_future(queue.wait_for_capacity())
+        loop.run_until_complete(asyncio.sleep(0.01))
+        assert not waiter.done()
+        queue.set_high_water_mark(None)
+        loop.run_until_complete(asyncio.wait_for(waiter, timeout=1))
+    finally:
+        loop.close()
+        asyncio.set_event_loop(None)
+
+
+def test_event_queue_high_water_mark_bytes():
+    assert get_output_size((StdoutChunk(b'line\n' * 3), None)) == 15
+    assert get_output_size((StderrLine(b'line\n'), None)) == 5
+    assert get_output_size(('string', None)) == 0
+    assert get_output_size(42) == 0
+
+    queue = EventQueue(high_water_mark=100, high_water_mark_bytes=64)
+    loop = new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        # few events with a lot of output pause the producers
+        queue.put((StdoutChunk(b'x' * 40), None))
+        loop.run_until_complete(
+            asyncio.wait_for(queue.wait_for_capacity(), timeout=1))
+        queue.put((StdoutChunk(b'x' * 24), None))
+        queue.put(('string', None))
+        assert queue.queued_bytes == 64
+        waiter = asyncio.ensure_future(queue.wait_for_capacity())
+        loop.run_until_complete(asyncio.sleep(0.01))
+        assert not waiter.done()
+
+        # the producers are only being resumed at half the high-water mark
+        assert len(queue.get_all(max_count=1)) == 1
+        assert queue.queued_bytes == 24
+        loop.run_until_complete(asyncio.wait_for(waiter, timeout=1))
+        assert len(queue.get_all()) == 2
+        assert queue.queued_bytes == 0
+
+        # removing the high-water marks resumes all producers
+        queue.put((StdoutChunk(b'x' * 64), None))
+        waiter = asyncio.ensure_future(queue.wait_for_capacity())
+        loop.run_until_complete(asyncio.sleep(0.01))
+        assert not waiter.done()
+        queue.set_high_water_mark(None)
+        loop.run_until_complete(asyncio.wait_for(waiter, timeout=1))
+    finally:
+        loop.close()
+        asyncio.set_event_loop(None)
+
+
+def test_flow_control():
+    event_reactor = EventReactor()
+    event_reactor.TIMER_INTERVAL = 60
+    queue = event_reactor.get_queue()
+    queue.set_high_water_mark(20)
+    sizes = []
+    lines = []
+
+    class SlowObserver:
+
+        def handle_events(self, events):
+            lines.extend(e[0] for e in events if isinstance(e[0], bytes))
+            time.sleep(0.005)
+
+    event_reactor.register_observer(SlowObserver())
+
+    def callback(line):
+        queue.put((line, None))
+        sizes.append(queue.qsize())
+
+    loop = new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        with event_reactor:
+            completed = loop.run_until_complete(run(
+                [sys.executable, '-c', 'for i in range(20000): print(i)'],
+                callback, None, use_pty=False,
+                flow_control=queue.wait_for_capacity))
+    finally:
+        loop.close()
+        asyncio.set_event_loop(None)
+
+    assert completed.returncode == 0
+    # no output has been lost
+    assert lines == [f'{i}\n'.encode() for i in range(20000)]
+    # the reading was paused while the queue was at capacity, the high-water
+    # mark is only checked after each chunk of output
+    assert max(sizes) < 20 + READ_CHUNK_SIZE // 2
+    assert max(sizes) < len(lines)
+
+
+class TimerExtension(CustomExtension):
+
+    EVENT_TYPES = (TimerEvent, )
+
+
+class FastTimerExtension(BatchExtension):
+
+    EVENT_TYPES = (TimerEvent, )
+    TIMER_INTERVAL = 0.05
+
+
+def test_timer_intervals():
+    event_reactor = EventReactor()
+    event_reactor.TIMER_INTERVAL = 60
+    strings = StringExtension()
+    event_reactor.register_observer(strings)
+    # without any observer interested in timer events the thread only wakes
+    # up for posted events
+    assert event_reactor._notify_timer_observers() is None
+
+    slow = TimerExtension()
+    fast = FastTimerExtension()
+    event_reactor.register_observer(slow)
+    event_reactor.register_observer(fast)
+    with event_reactor:
+        time.sleep(0.3)
+    assert strings.events == []
+    # each observer receives the initial timer event and then one per
+    # interval
+    assert len(slow.events) == 1
+    assert 3 <= len(fast.batches) <= 7
+    assert all(
+        len(b) == 1 and isinstance(b[0][0], TimerEvent)
+        for b in fast.batches)
@@ -0,0 +1,115 @@
+# Copyright 2016-2018 Dirk Thomas
+# Licensed under the Apache License, Version 2.0
+
+from pathlib import Path
+import time
+from types import SimpleNamespace
+
+from colcon_core.event.command import Command
+from colcon_core.event.command import CommandEnded
+from colcon_core.event.job import JobEnded
+from colcon_core.event.job import JobStarted
+from colcon_core.event.output import StderrLine
+from colcon_core.event.output import StdoutLine
+from colcon_core.event.timer import TimerEvent
+from colcon_core.event_reactor import EventReactorShutdown
+from colcon_core.event_recording import EventRecorder
+from colcon_core.event_recording import read_recording
+from colcon_core.event_recording import RecordedJob
+from colcon_core.event_recording import replay_recording
+import pytest
+
+
+class NotPicklable:
+
+    __slots__ = ('callback', )
+
+    def __init__(self):
+        self.callback = lambda: None
+
+
+class WithDict:
+
+    def __init__(self, value):
+        self.value = value
+
+
+def _record(path):
+    job_a = SimpleNamespace(identifier='a')
+    job_b = SimpleNamespace(identifier='b')
+    recorder = EventRecorder(path)
+    start = time.monotonic()
+    assert recorder.write((JobStarted('a'), job_a), timestamp=start)
+    assert recorder.write((
+        Command(['cmd', 'arg'], cwd='/tmp', env={'VAR': 'value'}), job_a),
+        timestamp=start + 0.1)
+    assert recorder.write(
+        (StdoutLine(b'line\n'), job_a), timestamp=start + 0.2)
+    assert recorder.write(
+        (StderrLine('error\n'), job_b), timestamp=start + 0.3)
+    assert not recorder.write((NotPicklable(), job_b))
+    assert recorder.write((WithDict(42), None), timestamp=start + 0.4)
+    assert recorder.write((
+        CommandEnded(['cmd'], cwd='/tmp', returncode=1), job_a),
+        timestamp=start + 0.5)
+    assert recorder.write((JobEnded('a', 0), job_a), timestamp=start + 0.6)
+    recorder.close()
+
+
+def test_recording(tmp_path):
+    path = tmp_path / 'events.bin'
+    _record(path)
+
+    records = list(read_recording(path))
+    assert [round(offset, 6) for offset, _ in records] == [
+        0.0, 0.1, 0.2, 0.3, 0.4, 0.5, 0.6]
+    events = [event for _, event in records]
+    assert [type(data) for data, _ in events] == [
+        JobStarted, Command, StdoutLine, StderrLine, WithDict, CommandEnded,
+        JobEnded]
+    assert events[0][0].identifier == 'a'
+    assert events[1][0].cmd == ['cmd', 'arg']
+    assert events[1][0].env == {'VAR': 'value'}
+    assert events[2][0].line == b'line\n'
+    assert events[3][0].line == 'error\n'
+    assert events[4][0].value == 42
+    assert events[4][1] is None
+    assert events[5][0].returncode == 1
+    assert events[5][0].cwd == '/tmp'
+
+    # all events of a job share the same stand-in
+    jobs = [job for _, job in events]
+    assert isinstance(jobs[0], RecordedJob)
+    assert str(jobs[0]) == 'a'
+    assert jobs[0] is jobs[1] is jobs[6]
+    assert jobs[3].identifier == 'b'
+
+    # a truncated record at the end is being ignored
+    data = path.read_bytes()
+    path.write_bytes(data[:-3])
+    assert len(list(read_recording(path))) == 6
+
+
+def test_recording_invalid(tmp_path):
+    path = tmp_path / 'events.bin'
+    path.write_bytes(b'not a recording')
+    with pytest.raises(ValueError):
+        list(read_recording(path))
+
+
+def test_replay_recording(tmp_path):
+    path = tmp_path / 'events.bin'
+    _record(path)
+
+    events = []
+    replay_recording(path, [events.append])
+    data = [
+        type(e[0]) for e in events if not isinstance(e[0], TimerEvent)]
+    assert data == [
+        JobStarted, Command, StdoutLine, StderrLine, WithDict, CommandEnded,
+        JobEnded, EventReactorShutdown]
+
+    # the recorded timing is being maintained
+    start = time.monotonic()
+    replay_recording(Path(str(path)), [lambda event: None], real_time=True)
+    assert time.monotonic() - start >= 0.6
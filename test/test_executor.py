@@ -3,6 +3,8 @@
 
 from argparse import ArgumentParser
 from asyncio import CancelledError
+from collections import OrderedDict
+from types import SimpleNamespace
 from unittest.mock import Mock
 from unittest.mock import patch
 
@@ -17,6 +19,7 @@ from colcon_core.executor import execute_jobs
 from colcon_core.executor import ExecutorExtensionPoint
 from colcon_core.executor import get_executor_extensions
 from colcon_core.executor import Job
+from colcon_core.executor import JobGraph
 from colcon_core.executor import OnError
 from colcon_core.subprocess import SIGINT_RESULT
 import pytest
@@ -119,6 +122,61 @@ def test_job():
     assert events[-1][1] == job
 
 
+def _create_job_graph(**dependencies):
+    return JobGraph(OrderedDict(
+        (identifier, Job(
+            identifier=identifier, dependencies=set(deps), task=None,
+            task_context=None))
+        for identifier, deps in dependencies.items()))
+
+
+def test_job_graph():
+    # a - b - c
+    #   \ d /
+    # e
+    job_graph = _create_job_graph(
+        a=(), b=('a', 'not-a-job'), d=('a', 'd'), c=('a', 'b', 'd'), e=())
+    assert job_graph.identifiers == ['a', 'b', 'd', 'c', 'e']
+    assert job_graph.upstream == {
+        'a': set(), 'b': {'a'}, 'c': {'a', 'b', 'd'}, 'd': {'a'}, 'e': set()}
+    assert job_graph.downstream == {
+        'a': {'b', 'c', 'd'}, 'b': {'c'}, 'c': set(), 'd': {'c'}, 'e': set()}
+    assert job_graph.get_topological_order() == ['a', 'e', 'b', 'd', 'c']
+    assert job_graph.find_cycle() is None
+    assert job_graph.get_recursive_downstream('a') == {'b', 'c', 'd'}
+    assert job_graph.get_recursive_downstream('c') == set()
+
+    # maintain the ready jobs
+    graph = job_graph.copy()
+    assert graph.get_ready_jobs() == ['a', 'e']
+    assert graph.finish('a') in (['b', 'd'], ['d', 'b'])
+    assert graph.get_ready_jobs() == ['b', 'd', 'e']
+    assert graph.finish('b') == []
+    assert graph.finish('d') == ['c']
+    assert not graph.is_pending('a')
+    assert graph.get_pending_jobs() == ['c', 'e']
+    graph.clear()
+    assert graph.get_pending_jobs() == []
+
+    # the copy has separate counters
+    assert job_graph.get_ready_jobs() == ['a', 'e']
+    assert job_graph.get_pending_jobs() == ['a', 'b', 'd', 'c', 'e']
+
+    # skip downstream jobs recursively
+    graph = job_graph.copy()
+    assert graph.skip_downstream('b') == {'c'}
+    assert graph.skip_downstream('a') == {'b', 'd'}
+    assert graph.get_pending_jobs() == ['a', 'e']
+    graph.remove('e')
+    assert graph.get_pending_jobs() == ['a']
+
+    # circular dependencies
+    job_graph = _create_job_graph(
+        a=(), b=('a', 'd'), c=('b', ), d=('c', ), e=('d', ))
+    assert job_graph.get_topological_order() == ['a']
+    assert job_graph.find_cycle() == ['b', 'c', 'd', 'b']
+
+
 def test_interface():
     interface = ExecutorExtensionPoint()
     interface._flush()
@@ -187,6 +245,52 @@ def test_add_executor_arguments():
     assert args.executor == 'extension2'
 
 
+class TimeoutExtension(ExecutorExtensionPoint):
+    PRIORITY = 110
+
+    SUPPORTS_TIMEOUTS = True
+
+    def execute(self, args, jobs, *, on_error):
+        return 0
+
+
+def test_execute_jobs_timeouts():
+    context = Mock()
+    context.args = SimpleNamespace(
+        event_handlers=None, executor='extension1', job_timeout=60.0)
+    jobs = {}
+
+    event_reactor = Mock()
+    event_reactor.__enter__ = lambda self: self
+    event_reactor.__exit__ = lambda self, *args: None
+    with patch(
+        'colcon_core.executor.create_event_reactor', return_value=event_reactor
+    ), ExtensionPointContext(
+        extension1=Extension1, extension2=TimeoutExtension
+    ):
+        extensions = get_executor_extensions()
+        extensions[100]['extension1'].execute = \
+            lambda args, jobs, on_error: 0
+        # the timeouts are being ignored by the executor
+        with patch('colcon_core.executor.logger.warning') as warning:
+            assert execute_jobs(context, jobs) == 0
+        assert warning.call_count == 1
+        assert 'timeout' in warning.call_args[0][0]
+
+        # the timeouts are being enforced by the executor
+        context.args.executor = 'extension2'
+        with patch('colcon_core.executor.logger.warning') as warning:
+            assert execute_jobs(context, jobs) == 0
+        assert warning.call_count == 0
+
+        # no timeouts have been passed
+        context.args.executor = 'extension1'
+        context.args.job_timeout = None
+        with patch('colcon_core.executor.logger.warning') as warning:
+            assert execute_jobs(context, jobs) == 0
+        assert warning.call_count == 0
+
+
 def test_execute_jobs():
     context = Mock()
     context.args = Mock()
@@ -244,3 +348,22 @@ def test_execute_jobs():
             assert isinstance(
                 event_reactor.get_queue().put.call_args[0][0][0], JobQueued)
             assert callback.call_count == 1
+
+            # circular dependencies
+            event_reactor.get_queue().put.reset_mock()
+            jobs['one'].returncode = None
+            jobs['one'].dependencies = {'two'}
+            jobs['two'] = Job(
+                identifier='two', dependencies={'id'}, task=None,
+                task_context=task_context)
+            with patch('colcon_core.executor.logger.error') as error:
+                rc = execute_jobs(context, jobs)
+            assert rc == 1
+            assert error.call_count == 1
+            assert error.call_args[0][0] == \
+                'Unable to execute jobs with circular dependencies: ' \
+                'one -> two -> one'
+            assert event_reactor.get_queue().put.call_count == 4
+            assert isinstance(
+                event_reactor.get_queue().put.call_args_list[2][0][0][0],
+                JobSkipped)
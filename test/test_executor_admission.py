@@ -0,0 +1,118 @@
+# Copyright 2016-2018 Dirk Thomas
+# Licensed under the Apache License, Version 2.0
+
+from types import SimpleNamespace
+from unittest.mock import mock_open
+from unittest.mock import patch
+
+from colcon_core.executor.admission import AdmissionControl
+from colcon_core.executor.admission import get_available_memory
+from colcon_core.executor.admission import get_expected_memory
+from colcon_core.executor.admission import get_load_average
+from colcon_core.executor.admission import parse_memory_size
+import pytest
+
+
+def _create_job(identifier, expected_memory=None):
+    metadata = {}
+    if expected_memory is not None:
+        metadata['expected_memory'] = expected_memory
+    return SimpleNamespace(
+        identifier=identifier,
+        task_context=SimpleNamespace(pkg=SimpleNamespace(metadata=metadata)))
+
+
+def test_parse_memory_size():
+    assert parse_memory_size(42) == 42
+    assert parse_memory_size('42') == 42
+    assert parse_memory_size('2k') == 2048
+    assert parse_memory_size('512M') == 512 * 1024 ** 2
+    assert parse_memory_size('1.5GiB') == 3 * 1024 ** 3 // 2
+    assert parse_memory_size(' 1 TB ') == 1024 ** 4
+    with pytest.raises(ValueError):
+        parse_memory_size('1X')
+    with pytest.raises(ValueError):
+        parse_memory_size(-1)
+
+
+def test_get_load_average():
+    with patch(
+        'colcon_core.executor.admission.open',
+        mock_open(read_data='1.50 0.75 0.25 1/123 4567\n')
+    ):
+        assert get_load_average() == 1.5
+
+    with patch(
+        'colcon_core.executor.admission.open', side_effect=OSError()
+    ):
+        with patch('os.getloadavg', return_value=(2.5, 1.0, 0.5)):
+            assert get_load_average() == 2.5
+        with patch('os.getloadavg', side_effect=OSError()):
+            assert get_load_average() is None
+
+
+def test_get_available_memory():
+    with patch(
+        'colcon_core.executor.admission.open',
+        mock_open(read_data=(
+            'MemTotal:       16000000 kB\n'
+            'MemFree:         1000000 kB\n'
+            'MemAvailable:    8000000 kB\n'))
+    ):
+        assert get_available_memory() == 8000000 * 1024
+
+    with patch(
+        'colcon_core.executor.admission.open',
+        mock_open(read_data='MemTotal:       16000000 kB\n')
+    ):
+        assert get_available_memory() is None
+
+    with patch(
+        'colcon_core.executor.admission.open', side_effect=OSError()
+    ):
+        assert get_available_memory() is None
+
+
+def test_get_expected_memory():
+    assert get_expected_memory(_create_job('a')) is None
+    assert get_expected_memory(_create_job('a', '1K')) == 1024
+    assert get_expected_memory(
+        SimpleNamespace(identifier='a', task_context=None)) is None
+    with patch('colcon_core.executor.admission.logger.warning') as warning:
+        assert get_expected_memory(_create_job('a', 'invalid')) is None
+    assert warning.call_count == 1
+
+
+def test_admission_control():
+    admission = AdmissionControl()
+    assert admission.admit(_create_job('a'))
+
+    admission = AdmissionControl(max_load_average=4.0)
+    with patch(
+        'colcon_core.executor.admission.get_load_average', return_value=3.9
+    ):
+        assert admission.admit(_create_job('a'))
+    with patch(
+        'colcon_core.executor.admission.get_load_average', return_value=4.0
+    ):
+        assert not admission.admit(_create_job('a'))
+    with patch(
+        'colcon_core.executor.admission.get_load_average', return_value=None
+    ):
+        assert admission.admit(_create_job('a'))
+
+    admission = AdmissionControl(min_available_memory=1000)
+    heavy = _create_job('heavy', 3000)
+    with patch(
+        'colcon_core.executor.admission.get_available_memory',
+        return_value=5000
+    ):
+        assert admission.admit(_create_job('light'))
+        assert admission.admit(heavy)
+        admission.job_started(heavy)
+        # the expected memory of the running job is taken into account
+        assert admission.admit(_create_job('light'))
+        assert admission.admit(_create_job('medium', 1000))
+        assert not admission.admit(_create_job('medium', 1001))
+        admission.job_finished(heavy)
+        assert admission.admit(_create_job('medium', 1001))
@@ -0,0 +1,262 @@
+# Copyright 2016-2018 Dirk Thomas
+# Licensed under the Apache License, Version 2.0
+
+from asyncio import CancelledError
+from collections import OrderedDict
+import os
+from types import SimpleNamespace
+from unittest.mock import Mock
+from unittest.mock import patch
+
+from colcon_core.event.job import JobEnded
+from colcon_core.event.job import JobSkipped
+from colcon_core.event.job import JobStarted
+from colcon_core.executor import execute_jobs
+from colcon_core.executor import ExecutorExtensionPoint
+from colcon_core.executor import Job
+from colcon_core.executor.journal import CheckpointJournal
+from colcon_core.executor.journal import FAILED
+from colcon_core.executor.journal import get_package_fingerprint
+from colcon_core.executor.journal import STARTED
+from colcon_core.executor.journal import SUCCEEDED
+from colcon_core.package_descriptor import PackageDescriptor
+from colcon_core.package_identification.ignore import IGNORE_MARKER
+from colcon_core.task import TaskContext
+import pytest
+
+from .extension_point_context import ExtensionPointContext
+from .run_until_complete import run_until_complete
+
+
+def _touch(path, content='', *, mtime=None):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(content)
+    if mtime is not None:
+        os.utime(str(path), (mtime, mtime))
+
+
+def test_get_package_fingerprint(tmp_path):
+    _touch(tmp_path / 'file', mtime=1)
+    _touch(tmp_path / 'sub' / 'file', mtime=1)
+    fingerprint = get_package_fingerprint(tmp_path)
+    assert get_package_fingerprint(tmp_path) == fingerprint
+
+    # hidden files and ignored directories are not considered
+    _touch(tmp_path / '.hidden')
+    _touch(tmp_path / '.git' / 'file')
+    _touch(tmp_path / 'build' / IGNORE_MARKER)
+    _touch(tmp_path / 'build' / 'file')
+    assert get_package_fingerprint(tmp_path) == fingerprint
+
+    # modified content
+    _touch(tmp_path / 'sub' / 'file', 'content', mtime=1)
+    modified = get_package_fingerprint(tmp_path)
+    assert modified != fingerprint
+
+    # modification time
+    _touch(tmp_path / 'sub' / 'file', 'content', mtime=2)
+    assert get_package_fingerprint(tmp_path) != modified
+
+    # additional file
+    _touch(tmp_path / 'other')
+    assert get_package_fingerprint(tmp_path) != modified
+
+
+class Task:
+
+    TASK_NAME = 'build'
+
+    def set_context(self, *, context):
+        pass
+
+
+def _create_jobs(tmp_path, **dependencies):
+    jobs = OrderedDict()
+    for name, deps in dependencies.items():
+        pkg = PackageDescriptor(tmp_path / name)
+        pkg.type = 'type'
+        pkg.name = name
+        _touch(pkg.path / 'file', mtime=1)
+        context = TaskContext(
+            pkg=pkg, args=SimpleNamespace(option=None),
+            dependencies=OrderedDict((d, str(tmp_path / d)) for d in deps))
+        jobs[name] = Job(
+            identifier=name, dependencies=set(deps), task=Task(),
+            task_context=context)
+    return jobs
+
+
+def _run(journal, jobs, returncodes=None):
+    for name in jobs.keys():
+        journal((JobStarted(name), None))
+        rc = (returncodes or {}).get(name, 0)
+        if not rc:
+            run_until_complete(journal.update_fingerprint(name))
+        journal((JobEnded(name, rc), None))
+
+
+def test_journal(tmp_path):
+    jobs = _create_jobs(tmp_path, a=[], b=['a'], c=[])
+    path = tmp_path / 'build' / 'journal'
+    journal = CheckpointJournal(path, verb_name='build')
+    journal.set_jobs(jobs)
+    assert journal.load() == {}
+    assert journal.get_resumable_jobs() == set()
+
+    _run(journal, jobs, {'c': 1})
+    records = journal.load()
+    assert records['a']['status'] == SUCCEEDED
+    assert records['a']['fingerprint'] == journal.get_fingerprint('a')
+    assert records['c']['status'] == FAILED
+    assert journal.get_resumable_jobs() == {'a', 'b'}
+
+    # a job which has started but not ended is not resumable
+    journal((JobStarted('b'), None))
+    assert journal.load()['b']['status'] == STARTED
+    assert journal.get_resumable_jobs() == {'a'}
+    journal((JobEnded('b', 0), None))
+
+    # the sources are not being scanned when handling the events
+    with patch(
+        'colcon_core.executor.journal.get_package_fingerprint'
+    ) as get_package_fingerprint:
+        journal((JobStarted('a'), None))
+        journal((JobEnded('a', 0), None))
+    assert not get_package_fingerprint.called
+
+    # events of unknown jobs are being ignored
+    run_until_complete(journal.update_fingerprint('unknown'))
+    journal((JobStarted('unknown'), None))
+    journal((JobEnded('unknown', 0), None))
+    assert 'unknown' not in journal.load()
+
+    # records of other verbs are being ignored
+    assert CheckpointJournal(path, verb_name='test').load() == {}
+
+    # changing the sources of an upstream job invalidates downstream jobs
+    journal = CheckpointJournal(path, verb_name='build')
+    journal.set_jobs(jobs)
+    assert journal.get_resumable_jobs() == {'a', 'b'}
+    _touch(tmp_path / 'a' / 'file', 'modified')
+    journal.set_jobs(jobs)
+    assert journal.get_resumable_jobs() == set()
+
+    # changing the arguments invalidates the job
+    _run(journal, jobs)
+    journal.set_jobs(jobs)
+    assert journal.get_resumable_jobs() == {'a', 'b', 'c'}
+    jobs['c'].task_context.args.option = 'value'
+    journal.set_jobs(jobs)
+    assert journal.get_resumable_jobs() == {'a', 'b'}
+
+
+class GeneratingTask(Task):
+
+    def __init__(self, path):
+        self.path = path
+
+    async def __call__(self):
+        _touch(self.path / 'generated')
+        return 0
+
+
+def test_job_updates_fingerprint(tmp_path):
+    jobs = _create_jobs(tmp_path, a=[])
+    job = jobs['a']
+    job.task = GeneratingTask(tmp_path / 'a')
+    journal = CheckpointJournal(tmp_path / 'journal', verb_name='build')
+    journal.set_jobs(jobs)
+    before = journal.get_fingerprint('a')
+    job.set_journal(journal)
+    # the fingerprint is available when the events are being handled
+    job.set_event_queue(SimpleNamespace(put=journal))
+
+    assert run_until_complete(job()) == 0
+    records = journal.load()
+    assert records['a']['status'] == SUCCEEDED
+    # the fingerprint considers the files generated by the job
+    assert records['a']['fingerprint'] != before
+    assert records['a']['fingerprint'] == journal.get_fingerprint('a')
+
+    # a failure to determine the fingerprint only results in a warning
+    with patch(
+        'colcon_core.executor.journal.get_package_fingerprint',
+        side_effect=OSError('error')
+    ), patch('colcon_core.executor.journal.logger.warning') as warning:
+        assert run_until_complete(job()) == 0
+    assert warning.call_count == 1
+    assert journal.load()['a'].get('fingerprint') is None
+
+    # the job still ends when being cancelled while updating the fingerprint
+    events = []
+    job.set_event_queue(SimpleNamespace(put=events.append))
+    with patch.object(
+        journal, 'update_fingerprint', side_effect=CancelledError
+    ):
+        with pytest.raises(CancelledError):
+            run_until_complete(job())
+    assert [type(e) for e, _ in events][-2:] == [JobStarted, JobEnded]
+    assert events[-1][0].rc == 0
+
+
+def test_compact(tmp_path):
+    jobs = _create_jobs(tmp_path, a=[], b=['a'])
+    path = tmp_path / 'journal'
+    journal = CheckpointJournal(path, verb_name='build')
+    journal.compact()
+    assert not path.exists()
+
+    journal.set_jobs(jobs)
+    _run(journal, jobs)
+    _run(journal, jobs)
+    CheckpointJournal(path, verb_name='test').add_record('a', FAILED)
+    with path.open('a') as h:
+        h.write('{"incomplete\n')
+    records = journal.load()
+    assert len(path.read_text().splitlines()) == 10
+
+    journal.compact()
+    assert len(path.read_text().splitlines()) == 3
+    assert journal.load() == records
+    assert CheckpointJournal(path, verb_name='test').load()['a'][
+        'status'] == FAILED
+
+
+class Extension(ExecutorExtensionPoint):
+
+    def execute(self, args, jobs, *, on_error):
+        for job in jobs.values():
+            job.returncode = 0
+        return 0
+
+
+def test_execute_jobs_resume(tmp_path):
+    jobs = _create_jobs(tmp_path, a=[], b=['a'], c=[])
+    journal = CheckpointJournal(tmp_path / 'journal', verb_name='build')
+    journal.set_jobs(jobs)
+    _run(journal, jobs)
+    _touch(tmp_path / 'c' / 'file', 'modified')
+
+    context = Mock()
+    context.args = Mock()
+    context.args.executor = 'extension'
+    event_reactor = Mock()
+    event_reactor.__enter__ = lambda self: self
+    event_reactor.__exit__ = lambda self, *args: None
+    with patch(
+        'colcon_core.executor.create_event_reactor', return_value=event_reactor
+    ):
+        with ExtensionPointContext(extension=Extension):
+            rc = execute_jobs(context, jobs, journal=journal, resume=True)
+    assert rc == 0
+    event_reactor.register_observer.assert_called_once_with(journal)
+    assert jobs['c']._journal is journal
+
+    # only the job with modified sources has been executed
+    events = [
+        call[0][0] for call in event_reactor.get_queue().put.call_args_list]
+    skipped = [e.identifier for e, _ in events if isinstance(e, JobSkipped)]
+    assert skipped == ['a', 'b']
+    assert jobs['a'].returncode is None
+    assert jobs['b'].returncode is None
+    assert jobs['c'].returncode == 0
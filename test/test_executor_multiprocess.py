@@ -0,0 +1,256 @@
+# Copyright 2016-2018 Dirk Thomas
+# Licensed under the Apache License, Version 2.0
+
+from argparse import ArgumentParser
+import asyncio
+from collections import OrderedDict
+import os
+from pathlib import Path
+from queue import Queue
+import sys
+import time
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from colcon_core.event.job import JobEnded
+from colcon_core.event.job import JobStarted
+from colcon_core.event.output import StderrLine
+from colcon_core.event.output import StdoutLine
+from colcon_core.executor import Job
+from colcon_core.executor import OnError
+from colcon_core.executor.journal import CheckpointJournal
+from colcon_core.executor.multiprocess import MultiProcessExecutor
+from colcon_core.executor.parallel import ParallelExecutor
+from colcon_core.executor.timeout import TIMEOUT_RETURN_CODE
+from colcon_core.executor.worker import deserialize_task_context
+from colcon_core.executor.worker import serialize_task_context
+from colcon_core.executor.worker import serve
+from colcon_core.package_descriptor import PackageDescriptor
+from colcon_core.subprocess import SIGINT_RESULT
+from colcon_core.subprocess import TIMEOUT_RESULT
+from colcon_core.task import TaskContext
+from colcon_core.task import TaskExtensionPoint
+import pytest
+
+from .run_until_complete import run_until_complete
+
+pytestmark = pytest.mark.skipif(
+    sys.platform == 'win32',
+    reason='The worker processes are not being tested on Windows')
+
+
+class EchoTask(TaskExtensionPoint):
+
+    async def build(self):
+        self.print(f'{self.context.pkg.name} {os.getpid()}')
+        if self.context.args.rc == 'raise':
+            raise RuntimeError('custom exception')
+        if self.context.args.rc == 'sleep':
+            await asyncio.sleep(30)
+        return self.context.args.rc
+
+
+@pytest.fixture(autouse=True)
+def importable_test_module(monkeypatch):
+    # the worker processes need to import the task extension of this module
+    root = str(Path(__file__).parents[1])
+    monkeypatch.setenv(
+        'PYTHONPATH',
+        os.pathsep.join([root] + list(filter(
+            None, [os.environ.get('PYTHONPATH')]))))
+
+
+def _create_jobs(queue, *specs, path=None):
+    jobs = OrderedDict()
+    for name, dependencies, rc in specs:
+        pkg = PackageDescriptor(path or os.getcwd())
+        pkg.type = 'echo'
+        pkg.name = name
+        task = EchoTask()
+        task.TASK_NAME = 'build'
+        task.PACKAGE_TYPE = 'echo'
+        context = TaskContext(
+            pkg=pkg, args=SimpleNamespace(rc=rc),
+            dependencies=OrderedDict((d, None) for d in dependencies))
+        job = Job(
+            identifier=name, dependencies=set(dependencies), task=task,
+            task_context=context)
+        job.set_event_queue(queue)
+        jobs[name] = job
+    return jobs
+
+
+def _get_events(queue):
+    events = []
+    while not queue.empty():
+        events.append(queue.get())
+    return events
+
+
+def test_add_arguments():
+    parser = ArgumentParser()
+    group = parser.add_argument_group()
+    ParallelExecutor().add_arguments(parser=group)
+    # the arguments of the parallel executor are being shared
+    MultiProcessExecutor().add_arguments(parser=group)
+    args = parser.parse_args(['--parallel-workers', '3'])
+    assert args.parallel_workers == 3
+
+    # without the parallel executor
+    parser = ArgumentParser()
+    MultiProcessExecutor().add_arguments(parser=parser)
+    args = parser.parse_args(
+        ['--parallel-workers', '3', '--scheduling-policy', 'topological'])
+    assert args.parallel_workers == 3
+    assert args.scheduling_policy == 'topological'
+    assert args.max_load_average is None
+    assert not hasattr(args, 'jobserver')
+
+    # another executor extension already added one of the arguments
+    parser = ArgumentParser()
+    parser.add_argument('--parallel-workers', type=int, default=1)
+    MultiProcessExecutor().add_arguments(parser=parser)
+    args = parser.parse_args([])
+    assert args.parallel_workers == 1
+    assert args.scheduling_policy is not None
+
+
+def test_serialize_task_context():
+    pkg = PackageDescriptor(os.getcwd())
+    pkg.type = 'unknown'
+    pkg.name = 'name'
+    pkg.metadata['key'] = 'value'
+    pkg.metadata['getter'] = lambda: None
+    args = SimpleNamespace(path='path', callback=lambda: None)
+    context = TaskContext(
+        pkg=pkg, args=args, dependencies=OrderedDict(dep='dep/path'))
+    context.put_event_into_queue = lambda event: None
+
+    data = serialize_task_context(context)
+    # the passed context is not being modified
+    assert 'getter' in pkg.metadata
+    assert hasattr(args, 'callback')
+
+    restored = deserialize_task_context(data)
+    assert restored.pkg == pkg
+    assert restored.pkg.metadata == {'key': 'value'}
+    assert restored.args.path == 'path'
+    assert not hasattr(restored.args, 'callback')
+    assert restored.dependencies == context.dependencies
+
+
+def test_execute():
+    queue = Queue()
+    jobs = _create_jobs(
+        queue, ('a', [], 0), ('b', ['a'], 0), ('c', ['a'], 0))
+    _get_events(queue)
+    args = SimpleNamespace(parallel_workers=2)
+    extension = MultiProcessExecutor()
+    rc = extension.execute(args, jobs)
+    assert rc == 0
+    # the original tasks are being restored
+    assert all(isinstance(job.task, EchoTask) for job in jobs.values())
+
+    events = _get_events(queue)
+    started = [e.identifier for e, _ in events if isinstance(e, JobStarted)]
+    assert started[0] == 'a'
+    assert set(started) == {'a', 'b', 'c'}
+    ended = {e.identifier: e.rc for e, _ in events if isinstance(e, JobEnded)}
+    assert ended == {'a': 0, 'b': 0, 'c': 0}
+    # the output is being attributed to the job and is coming from a worker
+    lines = [(e, job) for e, job in events if isinstance(e, StdoutLine)]
+    assert len(lines) == 3
+    for event, job in lines:
+        name, pid = event.line.split()
+        assert name == job.identifier
+        assert int(pid) != os.getpid()
+
+
+def test_execute_without_jobs():
+    with patch(
+        'colcon_core.executor.multiprocess.Coordinator'
+    ) as coordinator:
+        rc = MultiProcessExecutor().execute(
+            SimpleNamespace(parallel_workers=2), OrderedDict())
+    assert rc == 0
+    # no workers are being started
+    assert not coordinator.called
+
+
+def test_serve_unreachable(tmp_path):
+    # the coordinator has already stopped
+    address = f"unix:{tmp_path / 'missing'}"
+    with patch('colcon_core.executor.worker.logger.debug') as debug:
+        rc = run_until_complete(serve(address, 'token'))
+    assert rc != 0
+    assert debug.call_count == 1
+
+
+def test_execute_resume(tmp_path):
+    queue = Queue()
+    jobs = _create_jobs(
+        queue, ('a', [], 0), ('b', ['a'], 0), path=tmp_path / 'src')
+    journal = CheckpointJournal(tmp_path / 'journal', verb_name='build')
+    journal.set_jobs(jobs)
+    for job in jobs.values():
+        job.set_journal(journal)
+    args = SimpleNamespace(parallel_workers=2)
+    rc = MultiProcessExecutor().execute(args, jobs)
+    assert rc == 0
+    for event in _get_events(queue):
+        journal(event)
+
+    # the fingerprints don't depend on the tasks being performed remotely
+    journal = CheckpointJournal(tmp_path / 'journal', verb_name='build')
+    journal.set_jobs(jobs)
+    assert journal.get_resumable_jobs() == {'a', 'b'}
+
+
+def test_execute_failures():
+    queue = Queue()
+    jobs = _create_jobs(
+        queue, ('a', [], 3), ('b', ['a'], 0), ('c', [], 'raise'))
+    args = SimpleNamespace(parallel_workers=2)
+    extension = MultiProcessExecutor()
+    rc = extension.execute(args, jobs, on_error=OnError.continue_)
+    assert rc in (1, 3)
+
+    events = _get_events(queue)
+    ended = {e.identifier: e.rc for e, _ in events if isinstance(e, JobEnded)}
+    assert ended == {'a': 3, 'b': 0, 'c': 1}
+    errors = [
+        e.line for e, job in events
+        if isinstance(e, StderrLine) and job.identifier == 'c']
+    assert any(b'custom exception' in line for line in errors)
+
+
+def test_execute_interrupt():
+    queue = Queue()
+    jobs = _create_jobs(queue, ('a', [], 'sleep'), ('b', [], 2))
+    args = SimpleNamespace(parallel_workers=2)
+    extension = MultiProcessExecutor()
+    start = time.monotonic()
+    rc = extension.execute(args, jobs, on_error=OnError.interrupt)
+    assert rc == 2
+    # the task in the worker process has been cancelled
+    assert time.monotonic() - start < 30
+
+    events = _get_events(queue)
+    ended = {e.identifier: e.rc for e, _ in events if isinstance(e, JobEnded)}
+    assert ended == {'a': SIGINT_RESULT, 'b': 2}
+
+
+def test_execute_timeout():
+    queue = Queue()
+    jobs = _create_jobs(queue, ('a', [], 'sleep'), ('b', [], 0))
+    args = SimpleNamespace(parallel_workers=2, job_timeout=1.0)
+    extension = MultiProcessExecutor()
+    start = time.monotonic()
+    with patch('colcon_core.executor.timeout.logger.warning'):
+        rc = extension.execute(args, jobs, on_error=OnError.continue_)
+    assert rc == TIMEOUT_RETURN_CODE
+    assert time.monotonic() - start < 30
+
+    events = _get_events(queue)
+    ended = {e.identifier: e.rc for e, _ in events if isinstance(e, JobEnded)}
+    assert ended == {'a': TIMEOUT_RESULT, 'b': 0}
@@ -0,0 +1,267 @@
+# Copyright 2016-2018 Dirk Thomas
+# Licensed under the Apache License, Version 2.0
+
+import asyncio
+from collections import OrderedDict
+import os
+import signal
+import sys
+from threading import Thread
+import time
+from types import SimpleNamespace
+from unittest.mock import Mock
+from unittest.mock import patch
+
+from colcon_core.executor import Job
+from colcon_core.executor import OnError
+from colcon_core.executor.parallel import ParallelExecutor
+from colcon_core.executor.sequential import SequentialExecutor
+from colcon_core.subprocess import SIGINT_RESULT
+import pytest
+
+ran_jobs = []
+running_jobs = set()
+max_running_jobs = []
+
+
+class SleepJob(Job):
+
+    def __init__(self, identifier, dependencies=(), *, duration=0.05, rc=0):
+        super().__init__(
+            identifier=identifier, dependencies=set(dependencies), task=None,
+            task_context=None)
+        self.duration = duration
+        self.rc = rc
+
+    async def __call__(self, *args, **kwargs):
+        running_jobs.add(self.identifier)
+        max_running_jobs.append(len(running_jobs))
+        try:
+            await asyncio.sleep(self.duration)
+        except asyncio.CancelledError:
+            self.returncode = SIGINT_RESULT
+            return self.returncode
+        finally:
+            running_jobs.discard(self.identifier)
+        ran_jobs.append(self.identifier)
+        if isinstance(self.rc, BaseException):
+            raise self.rc
+        return self.rc
+
+
+def _create_jobs(*jobs):
+    return OrderedDict((job.identifier, job) for job in jobs)
+
+
+@pytest.fixture(autouse=True)
+def clear_ran_jobs():
+    yield
+    ran_jobs.clear()
+    running_jobs.clear()
+    max_running_jobs.clear()
+
+
+def test_priority():
+    # the sequential executor remains the default
+    assert ParallelExecutor.PRIORITY < SequentialExecutor.PRIORITY
+
+
+def test_add_arguments():
+    extension = ParallelExecutor()
+    parser = Mock()
+    extension.add_arguments(parser=parser)
+    assert parser.add_argument.call_count == 5
+    call = parser.add_argument.call_args_list[0]
+    assert call[0] == ('--parallel-workers', )
+    assert call[1]['default'] >= 1
+    call = parser.add_argument.call_args_list[1]
+    assert call[0] == ('--scheduling-policy', )
+
+
+def test_parallel():
+    extension = ParallelExecutor()
+
+    args = SimpleNamespace(parallel_workers=2)
+    jobs = _create_jobs(
+        SleepJob('one'),
+        SleepJob('two'),
+        SleepJob('three', ('one', 'two')),
+        SleepJob('four', ('three', 'not-a-job')))
+
+    rc = extension.execute(args, jobs)
+    assert rc == 0
+    assert set(ran_jobs[:2]) == {'one', 'two'}
+    assert ran_jobs[2:] == ['three', 'four']
+    assert max(max_running_jobs) == 2
+    # the passed jobs are not being modified
+    assert len(jobs) == 4
+
+
+def test_parallel_workers_limit():
+    extension = ParallelExecutor()
+
+    jobs = _create_jobs(*[SleepJob(f'job{i}') for i in range(6)])
+
+    rc = extension.execute(SimpleNamespace(parallel_workers=3), jobs)
+    assert rc == 0
+    assert len(ran_jobs) == 6
+    assert max(max_running_jobs) == 3
+    ran_jobs.clear()
+    max_running_jobs.clear()
+
+    # no limit
+    rc = extension.execute(SimpleNamespace(parallel_workers=0), jobs)
+    assert rc == 0
+    assert len(ran_jobs) == 6
+    assert max(max_running_jobs) == 6
+
+
+def test_parallel_on_error():
+    extension = ParallelExecutor()
+
+    args = SimpleNamespace(parallel_workers=2)
+    jobs = _create_jobs(
+        SleepJob('fail', rc=2, duration=0.01),
+        SleepJob('slow', duration=0.2),
+        SleepJob('downstream', ('fail', )),
+        SleepJob('indirect', ('downstream', )),
+        SleepJob('other', ('slow', )))
+
+    # ongoing jobs are cancelled, pending jobs are skipped
+    rc = extension.execute(args, jobs, on_error=OnError.interrupt)
+    assert rc == 2
+    assert ran_jobs == ['fail']
+    assert jobs['slow'].returncode == SIGINT_RESULT
+    ran_jobs.clear()
+
+    # ongoing jobs continue, pending jobs are skipped
+    jobs['slow'].returncode = None
+    rc = extension.execute(args, jobs, on_error=OnError.skip_pending)
+    assert rc == 2
+    assert ran_jobs == ['fail', 'slow']
+    ran_jobs.clear()
+
+    # pending jobs only run if they don't depend on the failed job
+    rc = extension.execute(args, jobs, on_error=OnError.skip_downstream)
+    assert rc == 2
+    assert ran_jobs == ['fail', 'slow', 'other']
+    ran_jobs.clear()
+
+    # all pending jobs are being processed
+    rc = extension.execute(args, jobs, on_error=OnError.continue_)
+    assert rc == 2
+    assert ran_jobs[:1] == ['fail']
+    assert set(ran_jobs[1:]) == {'slow', 'downstream', 'indirect', 'other'}
+    ran_jobs.clear()
+
+    # an exception is considered a failure
+    jobs['fail'].rc = RuntimeError('custom exception')
+    rc = extension.execute(args, jobs, on_error=OnError.skip_downstream)
+    assert rc == 1
+    assert ran_jobs == ['fail', 'slow', 'other']
+
+
+@pytest.fixture
+def restore_sigint_handler():
+    handler = signal.getsignal(signal.SIGINT)
+    yield
+    signal.signal(signal.SIGINT, handler)
+
+
+def test_parallel_keyboard_interrupt(restore_sigint_handler):
+    if sys.platform == 'win32':
+        pytest.skip(
+            'Skipping keyboard interrupt test since the signal will cause '
+            'pytest to return failure even if no tests fail.')
+
+    extension = ParallelExecutor()
+
+    args = SimpleNamespace(parallel_workers=2)
+    jobs = _create_jobs(
+        SleepJob('one', duration=0.01),
+        SleepJob('aborted', duration=3),
+        SleepJob('four', ('aborted', )))
+
+    def delayed_sigint():
+        time.sleep(0.1)
+        # Note: a real Ctrl-C would signal the whole process group
+        os.kill(os.getpid(), signal.SIGINT)
+
+    thread = Thread(target=delayed_sigint)
+    thread.start()
+    try:
+        rc = extension.execute(args, jobs)
+    finally:
+        thread.join()
+
+    assert rc == signal.SIGINT
+    # the pending job depending on the interrupted one is not started
+    assert ran_jobs == ['one', 'aborted']
+    assert jobs['aborted'].returncode == SIGINT_RESULT
+
+
+def test_parallel_scheduling_policy():
+    extension = ParallelExecutor()
+
+    jobs = _create_jobs(
+        SleepJob('short', duration=0.01),
+        SleepJob('long', duration=0.01),
+        SleepJob('long2', ('long', ), duration=0.01),
+        SleepJob('long3', ('long2', ), duration=0.01))
+
+    args = SimpleNamespace(
+        parallel_workers=1, scheduling_policy='topological')
+    rc = extension.execute(args, jobs)
+    assert rc == 0
+    assert ran_jobs == ['short', 'long', 'long2', 'long3']
+    ran_jobs.clear()
+
+    # the job with the longest chain of downstream jobs is started first
+    args.scheduling_policy = 'critical-path'
+    rc = extension.execute(args, jobs)
+    assert rc == 0
+    assert ran_jobs == ['long', 'long2', 'short', 'long3']
+
+
+def test_parallel_admission_control():
+    extension = ParallelExecutor()
+    extension.ADMISSION_INTERVAL = 0.01
+
+    jobs = _create_jobs(*[SleepJob(f'job{i}') for i in range(4)])
+    args = SimpleNamespace(parallel_workers=4, max_load_average=2.0)
+
+    # the system is too busy to start more than one job at a time
+    with patch(
+        'colcon_core.executor.admission.get_load_average', return_value=2.0
+    ) as get_load_average:
+        rc = extension.execute(args, jobs)
+    assert rc == 0
+    assert len(ran_jobs) == 4
+    assert max(max_running_jobs) == 1
+    assert get_load_average.call_count >= 3
+
+
+def test_parallel_admission_control_passes_over_jobs():
+    extension = ParallelExecutor()
+    extension.ADMISSION_INTERVAL = 0.01
+
+    jobs = _create_jobs(
+        SleepJob('first', duration=0.2),
+        SleepJob('heavy', duration=0.01),
+        SleepJob('light', duration=0.05))
+    for name, memory in (('first', '1G'), ('heavy', '2G'), ('light', '1M')):
+        jobs[name].task_context = SimpleNamespace(
+            pkg=SimpleNamespace(metadata={'expected_memory': memory}))
+    args = SimpleNamespace(
+        parallel_workers=4, scheduling_policy='topological',
+        min_available_memory=2 ** 30)
+
+    # the light job is started while the heavy job ahead of it doesn't fit
+    with patch(
+        'colcon_core.executor.admission.get_available_memory',
+        return_value=3 * 2 ** 30
+    ):
+        rc = extension.execute(args, jobs)
+    assert rc == 0
+    assert ran_jobs == ['light', 'first', 'heavy']
+    assert max(max_running_jobs) == 2
@@ -0,0 +1,89 @@
+# Copyright 2016-2018 Dirk Thomas
+# Licensed under the Apache License, Version 2.0
+
+from collections import OrderedDict
+from unittest.mock import Mock
+
+from colcon_core.executor import Job
+from colcon_core.executor import JobGraph
+from colcon_core.executor.scheduling import add_scheduling_arguments
+from colcon_core.executor.scheduling import CRITICAL_PATH_POLICY
+from colcon_core.executor.scheduling import get_critical_path_lengths
+from colcon_core.executor.scheduling import get_job_ranks
+from colcon_core.executor.scheduling import TOPOLOGICAL_POLICY
+import pytest
+
+
+def _create_job_graph(**dependencies):
+    return JobGraph(OrderedDict(
+        (identifier, Job(
+            identifier=identifier, dependencies=set(deps), task=None,
+            task_context=None))
+        for identifier, deps in dependencies.items()))
+
+
+# a - b - c - d
+# e - f
+# g
+JOBS = {
+    'a': (),
+    'b': ('a', ),
+    'c': ('a', 'b'),
+    'd': ('a', 'b', 'c'),
+    'e': ('not-a-job', ),
+    'f': ('e', ),
+    'g': ('g', ),
+}
+
+
+def test_add_scheduling_arguments():
+    parser = Mock()
+    add_scheduling_arguments(parser)
+    assert parser.add_argument.call_count == 1
+    assert parser.add_argument.call_args[0] == ('--scheduling-policy', )
+    assert parser.add_argument.call_args[1]['default'] == \
+        CRITICAL_PATH_POLICY
+
+
+def test_get_critical_path_lengths():
+    job_graph = _create_job_graph(**JOBS)
+
+    # without durations the number of downstream jobs is used
+    lengths = get_critical_path_lengths(job_graph)
+    assert lengths == {
+        'a': 3, 'b': 2, 'c': 1, 'd': 0, 'e': 1, 'f': 0, 'g': 0}
+
+    # durations of the longest downstream chain
+    lengths = get_critical_path_lengths(job_graph, durations={
+        'a': 1.0, 'b': 2.0, 'c': 3.0, 'd': 4.0, 'e': 5.0, 'f': 20.0,
+        'g': 30.0, 'not-a-job': 100.0})
+    assert lengths == {
+        'a': 10.0, 'b': 9.0, 'c': 7.0, 'd': 4.0, 'e': 25.0, 'f': 20.0,
+        'g': 30.0}
+
+    # unknown durations are using the average of the known ones
+    lengths = get_critical_path_lengths(job_graph, durations={
+        'a': 1.0, 'd': 3.0, 'f': None})
+    assert lengths == {
+        'a': 8.0, 'b': 7.0, 'c': 5.0, 'd': 3.0, 'e': 4.0, 'f': 2.0,
+        'g': 2.0}
+
+
+def test_get_job_ranks():
+    job_graph = _create_job_graph(**JOBS)
+
+    ranks = get_job_ranks(job_graph, policy=TOPOLOGICAL_POLICY)
+    assert sorted(ranks, key=ranks.get) == list(JOBS.keys())
+
+    ranks = get_job_ranks(job_graph)
+    assert sorted(ranks, key=ranks.get) == \
+        ['a', 'b', 'c', 'e', 'd', 'f', 'g']
+
+    ranks = get_job_ranks(job_graph, durations={
+        'a': 1.0, 'b': 1.0, 'c': 1.0, 'd': 1.0, 'e': 1.0, 'f': 20.0,
+        'g': 5.0})
+    assert sorted(ranks, key=ranks.get) == \
+        ['e', 'f', 'g', 'a', 'b', 'c', 'd']
+
+    with pytest.raises(AssertionError):
+        get_job_ranks(job_graph, policy='unknown')
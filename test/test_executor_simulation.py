@@ -0,0 +1,97 @@
+# Copyright 2016-2018 Dirk Thomas
+# Licensed under the Apache License, Version 2.0
+
+from collections import OrderedDict
+
+from colcon_core.executor import Job
+from colcon_core.executor import JobGraph
+from colcon_core.executor.scheduling import CRITICAL_PATH_POLICY
+from colcon_core.executor.scheduling import TOPOLOGICAL_POLICY
+from colcon_core.executor.simulation import complete_durations
+from colcon_core.executor.simulation import get_critical_path
+from colcon_core.executor.simulation import simulate
+import pytest
+
+
+def _create_job_graph(**dependencies):
+    return JobGraph(OrderedDict(
+        (name, Job(
+            identifier=name, dependencies=set(deps), task=None,
+            task_context=None))
+        for name, deps in dependencies.items()))
+
+
+def test_complete_durations():
+    assert complete_durations(['a', 'b'], {}) == {'a': 1.0, 'b': 1.0}
+    assert complete_durations(
+        ['a', 'b', 'c'], {'a': 2.0, 'b': 4.0, 'd': 9.0}
+    ) == {'a': 2.0, 'b': 4.0, 'c': 5.0}
+    assert complete_durations(
+        ['a', 'b'], {'a': 2.0, 'b': None}, default=0.5
+    ) == {'a': 2.0, 'b': 0.5}
+
+
+def test_get_critical_path():
+    assert get_critical_path(_create_job_graph(), {}) == (0.0, [])
+
+    job_graph = _create_job_graph(a=[], b=['a'], c=['a'], d=['b', 'c'], e=[])
+    durations = {'a': 1.0, 'b': 2.0, 'c': 3.0, 'd': 1.0, 'e': 4.0}
+    assert get_critical_path(job_graph, durations) == \
+        (5.0, ['a', 'c', 'd'])
+
+    # ties are broken by the order of the jobs
+    durations['c'] = 2.0
+    assert get_critical_path(job_graph, durations) == \
+        (4.0, ['a', 'b', 'd'])
+
+
+def test_simulate():
+    job_graph = _create_job_graph(a=[], b=['a'], c=['a'], d=[])
+    durations = {'a': 1.0, 'b': 3.0, 'c': 1.0, 'd': 2.0}
+
+    result = simulate(job_graph, durations, workers=1)
+    assert result.workers == 1
+    assert result.policy == CRITICAL_PATH_POLICY
+    assert result.makespan == pytest.approx(7.0)
+    assert result.busy_time == pytest.approx(7.0)
+    assert result.utilization == pytest.approx(1.0)
+    assert [job.identifier for job in result.schedule] == \
+        ['a', 'b', 'd', 'c']
+    # the passed graph isn't being modified
+    assert job_graph.get_ready_jobs() == ['a', 'd']
+
+    # the critical path starts first
+    result = simulate(job_graph, durations, workers=2)
+    assert result.makespan == pytest.approx(4.0)
+    assert result.utilization == pytest.approx(7.0 / 8.0)
+    assert {job.identifier: job.start for job in result.schedule} == \
+        {'a': 0.0, 'd': 0.0, 'b': 1.0, 'c': 2.0}
+
+    # the topological order delays the longest chain
+    result = simulate(
+        job_graph, {'a': 1.0, 'b': 3.0, 'c': 1.0, 'd': 3.0},
+        workers=2, policy=TOPOLOGICAL_POLICY)
+    assert result.makespan == pytest.approx(4.0)
+    result = simulate(
+        _create_job_graph(d=[], a=[], b=['a'], c=['a']),
+        {'a': 1.0, 'b': 3.0, 'c': 1.0, 'd': 3.0},
+        workers=1, policy=TOPOLOGICAL_POLICY)
+    assert [job.identifier for job in result.schedule] == \
+        ['d', 'a', 'b', 'c']
+
+    # no limit
+    result = simulate(job_graph, durations, workers=0)
+    assert result.makespan == pytest.approx(4.0)
+    assert len({job.slot for job in result.schedule}) == 3
+    assert result.utilization == pytest.approx(7.0 / 12.0)
+
+    # jobs finishing at the same time are all finished before starting more
+    job_graph = _create_job_graph(a=[], b=[], c=['b'], d=['a'])
+    result = simulate(
+        job_graph, {'a': 1.0, 'b': 1.0, 'c': 5.0, 'd': 1.0}, workers=1)
+    assert [job.identifier for job in result.schedule] == \
+        ['b', 'c', 'a', 'd']
+
+    result = simulate(_create_job_graph(), {}, workers=2)
+    assert result.makespan == 0.0
+    assert result.utilization == 0.0
@@ -0,0 +1,252 @@
+# Copyright 2016-2018 Dirk Thomas
+# Licensed under the Apache License, Version 2.0
+
+from argparse import ArgumentParser
+import asyncio
+from collections import OrderedDict
+import os
+from queue import Queue
+import sys
+import time
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from colcon_core.event.job import JobEnded
+from colcon_core.event.output import StderrLine
+from colcon_core.executor import Job
+from colcon_core.executor.sequential import SequentialExecutor
+from colcon_core.executor.timeout import add_timeout_arguments
+from colcon_core.executor.timeout import JobTimeouts
+from colcon_core.executor.timeout import parse_timeout
+from colcon_core.executor.timeout import TIMEOUT_RETURN_CODE
+from colcon_core.package_descriptor import PackageDescriptor
+from colcon_core.subprocess import run
+from colcon_core.subprocess import supervise_processes
+from colcon_core.subprocess import terminate_supervised_processes
+from colcon_core.subprocess import TIMEOUT_RESULT
+from colcon_core.task import TaskContext
+import pytest
+
+from .run_until_complete import run_until_complete
+
+
+def test_parse_timeout():
+    assert parse_timeout('1.5') == 1.5
+    assert parse_timeout(2) == 2
+    assert parse_timeout('0') is None
+    with pytest.raises(ValueError):
+        parse_timeout('-1')
+    with pytest.raises(ValueError):
+        parse_timeout('forever')
+
+
+def test_add_timeout_arguments():
+    parser = ArgumentParser()
+    add_timeout_arguments(parser)
+    args = parser.parse_args([
+        '--job-timeout', '60', '--package-type-timeouts', 'foo=10', 'bar=0',
+        '--inactivity-timeout', '5'])
+    timeouts = JobTimeouts.from_args(args)
+    assert timeouts.timeout == 60
+    assert timeouts.package_type_timeouts == {'foo': 10, 'bar': None}
+    assert timeouts.inactivity_timeout == 5
+
+    with pytest.raises(SystemExit):
+        with patch('sys.stderr'):
+            parser.parse_args(['--package-type-timeouts', '10'])
+
+    timeouts = JobTimeouts.from_args(SimpleNamespace())
+    assert timeouts.timeout is None
+    assert timeouts.package_type_timeouts == {}
+    assert timeouts.inactivity_timeout is None
+
+
+def _create_job(task=None, *, package_type='foo', metadata=None):
+    pkg = PackageDescriptor(os.getcwd())
+    pkg.type = package_type
+    pkg.name = 'pkg'
+    pkg.metadata.update(metadata or {})
+    job = Job(
+        identifier='pkg', dependencies=set(), task=task,
+        task_context=TaskContext(pkg=pkg, args=None, dependencies={}))
+    events = Queue()
+    job._event_queue = events
+    return job, events
+
+
+def test_get_timeout():
+    timeouts = JobTimeouts(
+        timeout=60, package_type_timeouts={'foo': 10, 'bar': None},
+        inactivity_timeout=5)
+    job, _ = _create_job()
+    assert timeouts.get_timeout(job) == 10
+    assert timeouts.get_inactivity_timeout(job) == 5
+    job, _ = _create_job(package_type='bar')
+    assert timeouts.get_timeout(job) is None
+    job, _ = _create_job(package_type='baz')
+    assert timeouts.get_timeout(job) == 60
+
+    # the metadata takes precedence
+    job, _ = _create_job(metadata={'timeout': 3, 'inactivity_timeout': '0'})
+    assert timeouts.get_timeout(job) == 3
+    assert timeouts.get_inactivity_timeout(job) is None
+
+    job, _ = _create_job(metadata={'timeout': 'forever'})
+    with patch('colcon_core.executor.timeout.logger.warning') as warning:
+        assert timeouts.get_timeout(job) == 10
+    assert warning.call_count == 1
+
+
+class SleepTask:
+
+    def __init__(self, *, output_interval=None):
+        self.output_interval = output_interval
+        self.context = None
+
+    def set_context(self, *, context):
+        self.context = context
+
+    async def __call__(self):
+        code = 'import time\n'
+        if self.output_interval:
+            code += (
+                'for _ in range(5):\n'
+                f'    print(flush=True); time.sleep({self.output_interval})\n')
+        code += 'time.sleep(30)\n'
+        completed = await run(
+            [sys.executable, '-c', code],
+            lambda line: self.context.put_event_into_queue(line), None,
+            use_pty=False)
+        return completed.returncode
+
+
+def _get_events(queue):
+    events = []
+    while not queue.empty():
+        events.append(queue.get()[0])
+    return events
+
+
+@pytest.mark.skipif(
+    sys.platform == 'win32', reason='Process groups are specific to POSIX')
+def test_run_job_timeout():
+    job, queue = _create_job(SleepTask())
+    timeouts = JobTimeouts(timeout=0.5)
+    with patch('colcon_core.executor.timeout.logger.warning'):
+        start = time.monotonic()
+        rc = run_until_complete(timeouts.run_job(job))
+    assert rc == TIMEOUT_RESULT
+    assert time.monotonic() - start < 10
+    assert job.returncode == TIMEOUT_RESULT
+    events = _get_events(queue)
+    assert isinstance(events[-1], JobEnded)
+    assert events[-1].rc == TIMEOUT_RESULT
+    assert any(
+        isinstance(e, StderrLine) and b'took longer than 0.5s' in e.line
+        for e in events)
+    # the original function has been restored
+    assert job.put_event_into_queue.__func__ is Job.put_event_into_queue
+
+
+@pytest.mark.skipif(
+    sys.platform == 'win32', reason='Process groups are specific to POSIX')
+def test_run_job_inactivity_timeout():
+    # the job produces output regularly for longer than the timeout
+    job, queue = _create_job(SleepTask(output_interval=0.2))
+    timeouts = JobTimeouts(inactivity_timeout=0.6)
+    with patch('colcon_core.executor.timeout.logger.warning'):
+        start = time.monotonic()
+        rc = run_until_complete(timeouts.run_job(job))
+    assert rc == TIMEOUT_RESULT
+    assert time.monotonic() - start > 1.0
+    events = _get_events(queue)
+    assert any(
+        isinstance(e, StderrLine) and b'no output for 0.6s' in e.line
+        for e in events)
+
+
+def test_run_job_waiting_for_capacity():
+    class Task:
+
+        def set_context(self, *, context):
+            self.context = context
+
+        async def __call__(self):
+            await self.context.wait_for_event_queue_capacity()
+            return 0
+
+    async def wait_for_capacity():
+        await asyncio.sleep(1.0)
+
+    job, queue = _create_job(Task())
+    queue.wait_for_capacity = wait_for_capacity
+    # waiting for capacity in the event queue isn't a lack of activity
+    rc = run_until_complete(
+        JobTimeouts(inactivity_timeout=0.3).run_job(job))
+    assert rc == 0
+    # the original function has been restored
+    assert job.wait_for_event_queue_capacity.__func__ is \
+        Job.wait_for_event_queue_capacity
+
+
+@pytest.mark.skipif(
+    sys.platform == 'win32', reason='Process groups are specific to POSIX')
+def test_execute_timeout():
+    job, _ = _create_job(SleepTask())
+    args = SimpleNamespace(job_timeout=0.5)
+    with patch('colcon_core.executor.timeout.logger.warning'):
+        rc = SequentialExecutor().execute(args, OrderedDict(pkg=job))
+    # the return code of the invocation is an integer
+    assert rc == TIMEOUT_RETURN_CODE
+    assert job.returncode == TIMEOUT_RESULT
+
+
+def test_run_job_without_timeout():
+    class Task:
+
+        def set_context(self, *, context):
+            pass
+
+        async def __call__(self):
+            return 3
+
+    job, queue = _create_job(Task())
+    rc = run_until_complete(JobTimeouts(timeout=10).run_job(job))
+    assert rc == 3
+    assert _get_events(queue)[-1].rc == 3
+
+    job, queue = _create_job(Task())
+    rc = run_until_complete(JobTimeouts().run_job(job))
+    assert rc == 3
+
+
+@pytest.mark.skipif(
+    sys.platform == 'win32', reason='Process groups are specific to POSIX')
+def test_terminate_supervised_processes():
+    # the process ignores the SIGINT and needs to be killed
+    code = (
+        'import signal, time\n'
+        'signal.signal(signal.SIGINT, signal.SIG_IGN)\n'
+        'print(flush=True)\n'
+        'time.sleep(30)\n')
+    started = []
+
+    async def task():
+        await run(
+            [sys.executable, '-c', code],
+            lambda line: started.append(line), None, use_pty=False)
+
+    async def main():
+        future = asyncio.ensure_future(task())
+        supervise_processes(future)
+        while not started:
+            await asyncio.sleep(0.05)
+        future.cancel()
+        await terminate_supervised_processes(future, grace_period=0.2)
+        await asyncio.wait([future])
+        return future
+
+    start = time.monotonic()
+    future = run_until_complete(main())
+    assert future.cancelled()
+    assert time.monotonic() - start < 10
@@ -0,0 +1,109 @@
+# Copyright 2016-2018 Dirk Thomas
+# Licensed under the Apache License, Version 2.0
+
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest.mock import patch
+
+from colcon_core.history import BuildHistory
+from colcon_core.history import create_job_record
+from colcon_core.history import get_history_path
+from colcon_core.history import get_job_durations
+from colcon_core.history import HISTORY_FILENAME
+
+
+def test_build_history():
+    with TemporaryDirectory(prefix='test_colcon_') as base_path:
+        path = Path(base_path) / 'log' / HISTORY_FILENAME
+        with BuildHistory(path) as history:
+            assert history.get_records() == []
+            assert history.get_durations() == {}
+
+            history.add_record(create_job_record(
+                'pkgA', duration=2.0, returncode=0, verb_name='build',
+                output_bytes=42))
+            history.add_record(create_job_record(
+                'pkgB', duration=3.0, returncode=1, verb_name='build'))
+            history.add_record(create_job_record(
+                'pkgA', duration=5.0, returncode=0, verb_name='test'))
+            history.add_record(create_job_record(
+                'pkgA', duration=4.0, returncode='SIGINT',
+                verb_name='build'))
+            history.add_record(create_job_record(
+                'pkgC', duration=1.0, returncode=0, verb_name='build'))
+
+        # reopen the existing database
+        with BuildHistory(path) as history:
+            records = history.get_records()
+            assert len(records) == 5
+            assert records[0].identifier == 'pkgA'
+            assert records[0].duration == 2.0
+            assert records[0].output_bytes == 42
+            assert records[0].peak_rss is None
+            assert records[3].returncode == 'SIGINT'
+
+            records = history.get_records('pkgA', verb_name='build')
+            assert [r.duration for r in records] == [2.0, 4.0]
+            records = history.get_records(limit=2)
+            assert [r.identifier for r in records] == ['pkgA', 'pkgC']
+
+            # only successful runs are considered
+            assert history.get_durations(verb_name='build') == {
+                'pkgA': 2.0, 'pkgC': 1.0}
+            # the most recent run is considered
+            assert history.get_durations() == {'pkgA': 5.0, 'pkgC': 1.0}
+            assert history.get_durations(['pkgC', 'pkgD']) == {'pkgC': 1.0}
+
+
+def test_build_history_retention():
+    with TemporaryDirectory(prefix='test_colcon_') as base_path:
+        path = Path(base_path) / HISTORY_FILENAME
+        with BuildHistory(path) as history, patch(
+            'colcon_core.history.MAX_RECORDS_PER_JOB', 3
+        ):
+            for i in range(5):
+                history.add_record(create_job_record(
+                    'pkgA', duration=float(i), returncode=0,
+                    verb_name='build'))
+                history.add_record(create_job_record(
+                    'pkgA', duration=float(i), returncode=0))
+            history.add_record(create_job_record(
+                'pkgB', duration=1.0, returncode=0, verb_name='build'))
+
+            # only the most recent records of each job and verb are kept
+            records = history.get_records('pkgA', verb_name='build')
+            assert [r.duration for r in records] == [2.0, 3.0, 4.0]
+            records = [
+                r for r in history.get_records('pkgA')
+                if r.verb_name is None]
+            assert [r.duration for r in records] == [2.0, 3.0, 4.0]
+            assert len(history.get_records('pkgB')) == 1
+
+
+def test_get_job_durations():
+    with TemporaryDirectory(prefix='test_colcon_') as base_path:
+        with patch(
+            'colcon_core.history.get_log_base_path',
+            return_value=Path(base_path)
+        ):
+            assert get_history_path() == Path(base_path) / HISTORY_FILENAME
+            # no history yet
+            assert get_job_durations() == {}
+
+            with BuildHistory(get_history_path()) as history:
+                history.add_record(create_job_record(
+                    'pkgA', duration=2.0, returncode=0))
+            assert get_job_durations() == {'pkgA': 2.0}
+
+            # a corrupted database is being ignored
+            get_history_path().write_text('not a database')
+            with patch('colcon_core.history.logger.warning') as warning:
+                assert get_job_durations() == {}
+            assert warning.call_count == 1
+
+    # logging is disabled
+    with patch(
+        'colcon_core.history.get_log_base_path', return_value=None
+    ):
+        assert get_history_path() is None
+        assert get_job_durations() == {}
@@ -0,0 +1,158 @@
+# Copyright 2016-2018 Dirk Thomas
+# Licensed under the Apache License, Version 2.0
+
+from collections import OrderedDict
+import os
+import sys
+from types import SimpleNamespace
+from unittest.mock import Mock
+
+from colcon_core.executor import Job
+from colcon_core.executor import OnError
+from colcon_core.executor.parallel import ParallelExecutor
+from colcon_core.jobserver import get_jobserver
+from colcon_core.jobserver import is_jobserver_supported
+from colcon_core.jobserver import JobServer
+from colcon_core.jobserver import set_jobserver
+from colcon_core.subprocess import new_event_loop
+from colcon_core.task import run
+import pytest
+
+pytestmark = pytest.mark.skipif(
+    not is_jobserver_supported(),
+    reason='The jobserver requires named pipes')
+
+
+def test_get_set_jobserver():
+    assert get_jobserver() is None
+    jobserver = Mock()
+    set_jobserver(jobserver)
+    try:
+        assert get_jobserver() is jobserver
+    finally:
+        set_jobserver(None)
+    assert get_jobserver() is None
+
+
+def test_tokens():
+    with JobServer(2) as jobserver:
+        assert os.path.exists(jobserver.path)
+        token1 = jobserver.try_acquire()
+        token2 = jobserver.try_acquire()
+        assert token1 == JobServer.TOKEN
+        assert token2 == JobServer.TOKEN
+        assert jobserver.try_acquire() is None
+        jobserver.release(token1)
+        assert jobserver.try_acquire() == token1
+        jobserver.release(token1)
+        jobserver.release(token2)
+    assert not os.path.exists(jobserver.path)
+
+
+def test_wait_for_token():
+    loop = new_event_loop()
+    try:
+        with JobServer(1) as jobserver:
+            token = jobserver.try_acquire()
+
+            async def _wait():
+                future = jobserver.wait_for_token()
+                loop.call_soon(jobserver.release, token)
+                await future
+
+            loop.run_until_complete(_wait())
+            assert jobserver.try_acquire() == token
+            jobserver.release(token)
+    finally:
+        loop.close()
+
+
+def test_get_makeflags():
+    with JobServer(1) as jobserver:
+        read_fd, write_fd = jobserver.client_fds
+        auth = f'{read_fd},{write_fd}'
+        expected = f'-j --jobserver-fds={auth} --jobserver-auth={auth}'
+        assert jobserver.get_makeflags() == expected
+        assert jobserver.get_makeflags(
+            'k -j8 --jobs=3 --jobserver-auth=3,4 -- FOO=bar'
+        ) == f'k -- FOO=bar {expected}'
+
+
+def test_update_popen_kwargs():
+    with JobServer(1) as jobserver:
+        kwargs = {'cwd': '/tmp', 'env': {'MAKEFLAGS': 'k', 'FOO': 'bar'}}
+        updated = jobserver.update_popen_kwargs(kwargs)
+        # the passed arguments are not being modified
+        assert kwargs['env'] == {'MAKEFLAGS': 'k', 'FOO': 'bar'}
+        assert 'pass_fds' not in kwargs
+        assert updated['cwd'] == '/tmp'
+        assert updated['env']['FOO'] == 'bar'
+        assert updated['env']['MAKEFLAGS'] == jobserver.get_makeflags('k')
+        assert updated['pass_fds'] == jobserver.client_fds
+
+        updated = jobserver.update_popen_kwargs({'pass_fds': (5, )})
+        assert updated['env']['PATH'] == os.environ['PATH']
+        assert updated['pass_fds'] == (5, ) + jobserver.client_fds
+
+
+# a client acquiring as many additional tokens as possible without blocking
+CLIENT = """
+import os, sys, time
+auth = [
+    f for f in os.environ['MAKEFLAGS'].split()
+    if f.startswith('--jobserver-auth=')][0]
+read_fd, write_fd = map(int, auth.split('=', 1)[1].split(','))
+os.set_blocking(read_fd, False)
+tokens = b''
+while len(tokens) < 3:
+    try:
+        token = os.read(read_fd, 1)
+    except BlockingIOError:
+        break
+    tokens += token
+start = time.monotonic()
+time.sleep(0.2)
+end = time.monotonic()
+with open(sys.argv[1], 'a') as h:
+    h.write(f'{start} {end} {1 + len(tokens)}\\n')
+os.write(write_fd, tokens)
+"""
+
+
+class ClientJob(Job):
+
+    def __init__(self, identifier, path):
+        super().__init__(
+            identifier=identifier, dependencies=set(), task=None,
+            task_context=None)
+        self.path = path
+
+    async def __call__(self, *args, **kwargs):
+        completed = await run(
+            Mock(), [sys.executable, '-c', CLIENT, str(self.path)])
+        return completed.returncode
+
+
+def test_parallel_executor_jobserver(tmp_path):
+    path = tmp_path / 'intervals'
+    jobs = OrderedDict(
+        (name, ClientJob(name, path)) for name in ('a', 'b', 'c', 'd', 'e'))
+    args = SimpleNamespace(
+        parallel_workers=3, jobserver=True, scheduling_policy='topological')
+    extension = ParallelExecutor()
+    rc = extension.execute(args, jobs, on_error=OnError.interrupt)
+    assert rc == 0
+    assert get_jobserver() is None
+
+    intervals = [
+        tuple(float(v) for v in line.split())
+        for line in path.read_text().splitlines()]
+    assert len(intervals) == len(jobs)
+    # the number of tokens used concurrently never exceeds the workers
+    timeline = sorted(
+        [(start, count) for start, _, count in intervals] +
+        [(end, -count) for _, end, count in intervals])
+    concurrent = 0
+    for _, delta in timeline:
+        concurrent += delta
+        assert concurrent <= args.parallel_workers
@@ -10,6 +10,7 @@ from colcon_core import location
 from colcon_core.location import _create_symlink
 from colcon_core.location import create_log_path
 from colcon_core.location import get_config_path
+from colcon_core.location import get_log_base_path
 from colcon_core.location import get_log_path
 from colcon_core.location import set_default_config_path
 from colcon_core.location import set_default_log_path
@@ -97,6 +98,20 @@ def test_log_path():
     assert get_log_path() == Path(log_base_path) / subdirectory
 
 
+def test_log_base_path():
+    # no default log path has been set
+    with patch('colcon_core.location._log_subdirectory', None):
+        assert get_log_base_path() is None
+
+    log_base_path = '/some/path'.replace('/', os.sep)
+    set_default_log_path(base_path=log_base_path, subdirectory='sub')
+    assert get_log_base_path() == Path(log_base_path)
+
+    # suppress logging when environment variable is set to devnull
+    set_default_log_path(base_path=os.devnull)
+    assert get_log_base_path() is None
+
+
 @pytest.fixture
 def reset_log_path_creation_global():
     yield
@@ -2,11 +2,24 @@
 # Licensed under the Apache License, Version 2.0
 
 import asyncio
+import os
+import platform
+import signal
+import subprocess
 import sys
+from threading import Thread
+import time
+from unittest.mock import patch
 
+from colcon_core.subprocess import _fd2callback
+from colcon_core.subprocess import _pipe2callback
+from colcon_core.subprocess import _RESOURCE_USAGE_WRAPPER
+from colcon_core.subprocess import CapturedOutput
 from colcon_core.subprocess import check_output
+from colcon_core.subprocess import is_resource_usage_reporting_enabled
 from colcon_core.subprocess import new_event_loop
 from colcon_core.subprocess import run
+from colcon_core.subprocess import set_resource_usage_reporting
 import pytest
 
 from .run_until_complete import run_until_complete
@@ -93,3 +106,288 @@ def test_run_cancel():
             loop.run_until_complete(task)
     finally:
         loop.close()
+
+
+def test_pipe2callback():
+    lines = []
+    flow_control_calls = []
+
+    async def flow_control():
+        flow_control_calls.append(len(lines))
+
+    loop = new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        stream = asyncio.StreamReader()
+        # a line spanning multiple chunks
+        stream.feed_data(b'first\nsec')
+        stream.feed_data(b'ond\r\n\nthi')
+        stream.feed_data(b'rd\nunterminated')
+        stream.feed_eof()
+        with patch('colcon_core.subprocess.READ_CHUNK_SIZE', 8):
+            loop.run_until_complete(_pipe2callback(
+                stream, lines.append, flow_control=flow_control))
+        assert lines == [
+            b'first\n', b'second\r\n', b'\n', b'third\n', b'unterminated']
+        assert flow_control_calls
+
+        # very long lines are being passed in pieces
+        lines.clear()
+        stream = asyncio.StreamReader()
+        stream.feed_data(b'x' * 10 + b'\n')
+        stream.feed_eof()
+        with patch('colcon_core.subprocess.READ_CHUNK_SIZE', 4), \
+                patch('colcon_core.subprocess.MAX_LINE_LENGTH', 6):
+            loop.run_until_complete(_pipe2callback(stream, lines.append))
+        assert b''.join(lines) == b'x' * 10 + b'\n'
+        assert lines[0] == b'x' * 8
+
+        # complete lines are being passed together in chunked mode
+        lines.clear()
+        stream = asyncio.StreamReader()
+        stream.feed_data(b'first\nsecond\nthi')
+        stream.feed_data(b'rd\nunterminated')
+        stream.feed_eof()
+        with patch('colcon_core.subprocess.READ_CHUNK_SIZE', 16):
+            loop.run_until_complete(
+                _pipe2callback(stream, lines.append, chunked=True))
+        assert lines == [b'first\nsecond\n', b'third\n', b'unterminated']
+    finally:
+        loop.close()
+        asyncio.set_event_loop(None)
+
+
+@pytest.mark.skipif(
+    platform.system() != 'Linux',
+    reason='Pseudo terminals are only used on Linux')
+def test_fd2callback():
+    import pty
+    lines = []
+    loop = new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        master, slave = pty.openpty()
+        reading = asyncio.ensure_future(_fd2callback(master, lines.append))
+
+        def write():
+            # the pseudo terminal translates LF to CR LF
+            os.write(
+                slave, b'first\nsecond\r\n' + b'x\n' * 10000 + b'last')
+            os.close(slave)
+
+        # the writing blocks until the event loop has read enough data
+        writer = Thread(target=write)
+        writer.start()
+        loop.run_until_complete(asyncio.wait_for(reading, timeout=5))
+        writer.join()
+    finally:
+        loop.close()
+        asyncio.set_event_loop(None)
+    assert lines[:3] == [b'first\n', b'second\n', b'\n']
+    assert lines[3:-1] == [b'x\n'] * 10000
+    assert lines[-1] == b'last'
+
+
+def test_run_throughput():
+    # the size of the output in MiB, a larger size like 1 GiB gives more
+    # accurate results
+    size = 64
+    line = b'x' * 39 + b'\n'
+    script = (
+        'import sys; '
+        f'block = {line!r} * {1024 * 1024 // len(line)}; '
+        f'[sys.stdout.buffer.write(block) for _ in range({size})]')
+    received = [0, 0]
+
+    def stdout_callback(line):
+        received[0] += 1
+        received[1] += len(line)
+
+    loop = new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        start = time.monotonic()
+        completed = loop.run_until_complete(run(
+            [sys.executable, '-c', script], stdout_callback, None,
+            use_pty=False))
+        duration = time.monotonic() - start
+    finally:
+        loop.close()
+        asyncio.set_event_loop(None)
+    assert completed.returncode == 0
+    assert received[1] == size * (1024 * 1024 // len(line)) * len(line)
+    assert received[0] == received[1] // len(line)
+    print(
+        f'Subprocess output throughput: {received[1] / duration / 1e6:.1f} '
+        f'MB/s, {received[0] / duration:.0f} lines/s')
+
+
+def test_captured_output():
+    with CapturedOutput(spill_threshold=8) as output:
+        output.write(b'first\n')
+        assert not output.spilled
+        with output.getbuffer() as buffer:
+            assert bytes(buffer) == b'first\n'
+        assert list(output.iter_chunks(size=4)) == [b'firs', b't\n']
+
+        # exceeding the threshold moves the output into a temporary file
+        output.write(b'second\n')
+        assert output.spilled
+        output.write(b'third\n')
+        assert len(output) == 19
+        assert output.getvalue() == b'first\nsecond\nthird\n'
+        buffer = output.getbuffer()
+        try:
+            assert buffer[:] == b'first\nsecond\nthird\n'
+        finally:
+            buffer.close()
+
+        # writing while streaming appends to the end
+        chunks = output.iter_chunks(size=13)
+        assert next(chunks) == b'first\nsecond\n'
+        output.write(b'last\n')
+        assert list(chunks) == [b'third\nlast\n']
+    assert len(output) == 0
+    assert not output.spilled
+
+
+def test_run_bounded_capture():
+    script = 'import sys; sys.stdout.write("x\\n" * 100)'
+    loop = new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        completed = loop.run_until_complete(run(
+            [sys.executable, '-c', script], None, None, use_pty=False,
+            capture_output=True))
+        assert completed.stdout == b'x\n' * 100
+        assert completed.stderr == b''
+
+        with patch('colcon_core.subprocess.CAPTURE_SPILL_THRESHOLD', 50):
+            completed = loop.run_until_complete(run(
+                [sys.executable, '-c', script], None, None, use_pty=False,
+                capture_output=True, bounded_capture=True))
+    finally:
+        loop.close()
+        asyncio.set_event_loop(None)
+    assert completed.returncode == 0
+    with completed.stdout as stdout, completed.stderr as stderr:
+        assert stdout.spilled
+        assert stdout.getvalue() == b'x\n' * 100
+        assert not stderr.spilled
+        assert len(stderr) == 0
+
+
+@pytest.fixture
+def resource_usage_reporting():
+    set_resource_usage_reporting(True)
+    try:
+        yield
+    finally:
+        set_resource_usage_reporting(False)
+
+
+def test_run_without_resource_usage():
+    # the resource usage is only being reported on request
+    assert not is_resource_usage_reporting_enabled()
+    completed = run_until_complete(run(
+        [sys.executable, '-c', 'pass'], None, None, use_pty=False))
+    assert completed.returncode == 0
+    assert completed.resource_usage is None
+
+
+@pytest.mark.skipif(
+    sys.platform == 'win32',
+    reason='The resource usage is not available on Windows')
+def test_run_resource_usage(resource_usage_reporting):
+    busy = 'data = bytearray(256 * 1024 * 1024); sum(range(10 ** 7))'
+    idle = 'import time; time.sleep(0.5)'
+
+    async def _run_concurrently():
+        return await asyncio.gather(
+            run([sys.executable, '-c', busy], None, None, use_pty=False),
+            run([sys.executable, '-c', idle], None, None, use_pty=False))
+
+    busy_completed, idle_completed = run_until_complete(_run_concurrently())
+    assert busy_completed.returncode == 0
+    assert idle_completed.returncode == 0
+    # the usage of concurrently ending commands is not being mixed up
+    busy_usage = busy_completed.resource_usage
+    idle_usage = idle_completed.resource_usage
+    assert busy_usage.user_time > idle_usage.user_time
+    assert busy_usage.max_rss >= 256 * 1024 * 1024
+    assert 0 < idle_usage.max_rss < 256 * 1024 * 1024
+    assert busy_usage.block_input >= 0
+
+
+@pytest.mark.skipif(
+    sys.platform == 'win32',
+    reason='The resource usage is not available on Windows')
+def test_run_resource_usage_wrapper(resource_usage_reporting):
+    # the return code and terminating signal of the command are preserved
+    completed = run_until_complete(run(
+        [sys.executable, '-c', 'import sys; sys.exit(3)'], None, None,
+        use_pty=False))
+    assert completed.returncode == 3
+    assert completed.resource_usage is not None
+    completed = run_until_complete(run(
+        [sys.executable, '-c', 'import os; os.kill(os.getpid(), 15)'],
+        None, None, use_pty=False))
+    assert completed.returncode == -15
+
+    # the command inherits the output and is invoked by a shell if requested
+    lines = []
+    completed = run_until_complete(run(
+        ['echo', 'line'], lines.append, None, shell=True))
+    assert completed.returncode == 0
+    assert lines == [b'line\n']
+    assert completed.resource_usage is not None
+
+    # a command which can't be started raises the same exception
+    with pytest.raises(FileNotFoundError):
+        run_until_complete(run(['does-not-exist'], None, None))
+
+
+# counts the received SIGTERMs and reports them when ending
+_COUNT_SIGTERM = """
+import signal, sys, time
+count = []
+signal.signal(signal.SIGTERM, lambda signum, frame: count.append(signum))
+print('ready', flush=True)
+start = time.monotonic()
+while not count and time.monotonic() - start < 10:
+    time.sleep(0.01)
+time.sleep(0.2)
+print(len(count), flush=True)
+"""
+
+
+@pytest.mark.skipif(
+    not hasattr(os, 'killpg'),
+    reason='The wrapper is only being used on POSIX platforms')
+@pytest.mark.parametrize('group', [False, True])
+def test_resource_usage_wrapper_signals(group):
+    read_fd, write_fd = os.pipe()
+    process = subprocess.Popen(
+        [
+            sys.executable, '-I', '-S', _RESOURCE_USAGE_WRAPPER,
+            str(write_fd), sys.executable, '-c', _COUNT_SIGTERM],
+        pass_fds=(write_fd, ), stdout=subprocess.PIPE,
+        start_new_session=True)
+    os.close(write_fd)
+    try:
+        assert process.stdout.readline() == b'ready\n'
+        if group:
+            # the invoking process signals the whole process group
+            os.killpg(process.pid, signal.SIGTERM)
+        else:
+            # another process only signals the wrapper
+            subprocess.run(['kill', '-TERM', str(process.pid)], check=True)
+        # the command has received the signal exactly once
+        assert process.stdout.readline() == b'1\n'
+        assert process.wait(timeout=10) == 0
+        assert os.read(read_fd, 1024).startswith(b'usage ')
+    finally:
+        os.close(read_fd)
+        if process.poll() is None:
+            os.killpg(process.pid, signal.SIGKILL)
+        process.stdout.close()
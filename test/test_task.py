@@ -31,6 +31,8 @@ def test_context_interface():
     context = TaskContext(pkg=None, args=None, dependencies=None)
     with pytest.raises(NotImplementedError):
         context.put_event_into_queue(None)
+    # without an event queue there is no need to wait
+    run_until_complete(context.wait_for_event_queue_capacity())
 
 
 class Extension(TaskExtensionPoint):
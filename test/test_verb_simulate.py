@@ -0,0 +1,99 @@
+# Copyright 2016-2018 Dirk Thomas
+# Licensed under the Apache License, Version 2.0
+
+from argparse import ArgumentParser
+from unittest.mock import patch
+
+from colcon_core.command import CommandContext
+from colcon_core.package_decorator import get_decorators
+from colcon_core.package_descriptor import PackageDescriptor
+from colcon_core.verb.simulate import SimulateVerb
+import pytest
+
+
+def _get_decorators(**dependencies):
+    descriptors = []
+    for name in dependencies.keys():
+        desc = PackageDescriptor(name)
+        desc.type = 'type'
+        desc.name = name
+        descriptors.append(desc)
+    decorators = get_decorators(descriptors)
+    for decorator in decorators:
+        decorator.recursive_dependencies = \
+            dependencies[decorator.descriptor.name]
+    return decorators
+
+
+def _main(argv, decorators, durations):
+    parser = ArgumentParser()
+    extension = SimulateVerb()
+    with patch('colcon_core.verb.simulate.add_packages_arguments'):
+        extension.add_arguments(parser=parser)
+    context = CommandContext(
+        command_name='colcon', args=parser.parse_args(argv))
+    with patch(
+        'colcon_core.verb.simulate.get_packages', return_value=decorators
+    ), patch(
+        'colcon_core.verb.simulate.get_job_durations',
+        return_value=durations
+    ) as get_job_durations:
+        rc = extension.main(context=context)
+    return rc, get_job_durations
+
+
+def test_main(capsys):
+    decorators = _get_decorators(a=[], b=['a'], c=['a'], d=[])
+    decorators[-1].selected = False
+    rc, get_job_durations = _main(
+        ['--parallel-workers', '1', '2', '0',
+         '--scheduling-policies', 'critical-path'],
+        decorators, {'a': 2.0, 'b': 4.0})
+    assert rc == 0
+    assert list(get_job_durations.call_args[0][0]) == ['a', 'b', 'c']
+    assert get_job_durations.call_args[1]['verb_name'] == 'build'
+
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[0] == 'Packages: 3 (1 without a recorded duration)'
+    assert lines[1] == 'Total duration: 9.00s'
+    assert lines[2] == 'Critical path: 6.00s (a -> b)'
+    assert lines[4].split() == [
+        'policy', 'workers', 'makespan', 'utilization', 'speedup']
+    assert lines[5].split() == [
+        'critical-path', '1', '9.00s', '100.0%', '1.00x']
+    assert lines[6].split() == [
+        'critical-path', '2', '6.00s', '75.0%', '1.50x']
+    assert lines[7].split() == [
+        'critical-path', 'unlimited', '6.00s', '75.0%', '1.50x']
+
+
+def test_main_without_history(capsys):
+    decorators = _get_decorators(a=[], b=['a'])
+    with patch('colcon_core.verb.simulate.logger.warning') as warning:
+        rc, _ = _main(
+            ['--default-duration', '2', '--history-verb', 'test'],
+            decorators, {})
+    assert rc == 0
+    assert warning.call_count == 1
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[1] == 'Total duration: 4.00s'
+    # all policies and the default worker counts
+    assert len(lines) == 5 + 2 * 5
+
+
+def test_main_cycle():
+    decorators = _get_decorators(a=['b'], b=['a'])
+    rc, _ = _main([], decorators, {})
+    assert rc == \
+        'Unable to simulate jobs with circular dependencies: a -> b -> a'
+
+
+def test_add_arguments_negative_workers():
+    parser = ArgumentParser()
+    extension = SimulateVerb()
+    with patch('colcon_core.verb.simulate.add_packages_arguments'):
+        extension.add_arguments(parser=parser)
+    args = parser.parse_args(['--parallel-workers', '0', '2'])
+    assert args.parallel_workers == [0, 2]
+    with pytest.raises(SystemExit):
+        parser.parse_args(['--parallel-workers', '-1'])